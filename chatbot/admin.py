@@ -4,13 +4,15 @@ from django.contrib import admin
 from .models import (
     UserProfile, 
     Mentor, 
+    Domain,
     MentorSchedule,  # Existing model - retained
     SessionBooking,   # Existing model - retained
     MentorAvailability, 
     BlockedDate, 
     TimeSlot, 
     EnhancedSessionBooking,
-    ChatHistory
+    ChatHistory,
+    AuditLog
 )
 
 # Existing model admins - retained but not used in new implementation
@@ -40,6 +42,13 @@ class MentorAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'expertise', 'created_at']
     search_fields = ['user__username', 'user__email', 'expertise']
 
+@admin.register(Domain)
+class DomainAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'priority', 'is_active']
+    list_filter = ['is_active']
+    search_fields = ['name', 'slug']
+    prepopulated_fields = {'slug': ('name',)}
+
 @admin.register(MentorAvailability)
 class MentorAvailabilityAdmin(admin.ModelAdmin):
     list_display = ['mentor', 'date', 'is_active', 'created_at']
@@ -132,4 +141,11 @@ class ChatHistoryAdmin(admin.ModelAdmin):
     list_display = ['user', 'message', 'response', 'created_at']
     list_filter = ['created_at', 'user']
     search_fields = ['user__username', 'message', 'response']
-    date_hierarchy = 'created_at'
\ No newline at end of file
+    date_hierarchy = 'created_at'
+
+@admin.register(AuditLog)
+class AuditLogAdmin(admin.ModelAdmin):
+    list_display = ['action', 'user', 'ip_address', 'created_at']
+    list_filter = ['action', 'created_at']
+    search_fields = ['user__username', 'user__email', 'ip_address']
+    date_hierarchy = 'created_at'
@@ -0,0 +1,22 @@
+# chatbot/audit.py
+"""Audit trail helpers - events are queued on the write-behind buffer, never written inline"""
+
+from .models import AuditLog
+from .write_behind import get_write_behind
+
+
+def client_ip(request):
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR")
+
+
+def audit(action: str, request=None, user=None, **detail):
+    """Record an audit event, e.g. audit("login", request, user)"""
+    get_write_behind().add(AuditLog(
+        user=user,
+        action=action,
+        detail=detail,
+        ip_address=client_ip(request) if request is not None else None,
+    ))
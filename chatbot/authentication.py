@@ -0,0 +1,263 @@
+# chatbot/authentication.py
+"""
+DRF token authentication with a per-process cache and token expiry.
+
+DRF's TokenAuthentication joins authtoken_token to auth_user on every request,
+and the views then query UserProfile again. CachedTokenAuthentication loads
+token, user and profile in one query (select_related) and keeps the rows in a
+bounded LRU for TTL seconds, so a warm request authenticates with no queries
+and `get_profile(request.user)` is free.
+
+Hits rebuild fresh model instances from the cached row values, so a view that
+modifies and saves request.user or its profile never touches another request's
+objects. Entries are dropped on logout, when the token is deleted and when the
+user or profile is saved in this process (see signals.py). Changes made in other
+processes or through queryset.update() show up after at most TTL seconds.
+
+Revocations can't wait that long: logging out, deleting a token and deleting
+or deactivating a user also bump a version stamp (version_stamp.py) in the
+CACHE_ALIAS cache, and each process empties its cache when it sees the stamp
+change (checked at most every CHECK_INTERVAL seconds). Without VERSION_STAMP,
+or when CACHE_ALIAS is a per-process cache (locmem), get_token_cache() turns
+caching off: a revoked token must not stay valid in the other workers.
+
+Tokens older than settings.TOKEN_EXPIRY_TIME seconds are rejected; login hands
+out a new key via `issue_token()`.
+
+Configured through settings.TOKEN_AUTH_CACHE:
+    MAX_ENTRIES     LRU bound (tokens)
+    TTL             seconds a cached token/user/profile is trusted (0 disables the cache)
+    VERSION_STAMP   share revocations across processes through the cache
+    CACHE_ALIAS     Django cache alias holding the version number
+    CHECK_INTERVAL  seconds between version checks
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from . import version_stamp
+from .models import UserProfile
+
+DEFAULT_CONFIG = {
+    "MAX_ENTRIES": 10000,
+    "TTL": 60,
+    "VERSION_STAMP": True,
+    "CACHE_ALIAS": "shared",
+    "CHECK_INTERVAL": 1.0,
+}
+
+VERSION_KEY = "chatbot:token_cache:version"
+
+logger = logging.getLogger(__name__)
+
+
+def token_expiry() -> Optional[int]:
+    """settings.TOKEN_EXPIRY_TIME in seconds, or None when tokens never expire"""
+    return getattr(settings, 'TOKEN_EXPIRY_TIME', None) or None
+
+
+def is_token_expired(token: Token) -> bool:
+    expiry = token_expiry()
+    return expiry is not None and (timezone.now() - token.created).total_seconds() >= expiry
+
+
+def issue_token(user: User) -> Token:
+    """The user's current token, replaced with a fresh key once it has expired"""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and is_token_expired(token):
+        forget_token(token.key)
+        token.delete()
+        token = Token.objects.create(user=user)
+    return token
+
+
+def get_profile(user) -> Optional[UserProfile]:
+    """The user's profile, from the authentication prefetch when there was one"""
+    try:
+        return user.userprofile
+    except UserProfile.DoesNotExist:
+        return None
+
+
+def _row(instance):
+    return tuple(getattr(instance, f.attname) for f in instance._meta.concrete_fields)
+
+
+def _rebuild(model, row):
+    return model.from_db("default", [f.attname for f in model._meta.concrete_fields], row)
+
+
+class TokenCache:
+    """Thread-safe LRU of token key -> (expires_at, token row, user row, profile row or None)"""
+
+    def __init__(self, max_entries: int, ttl: float, version_stamp: bool = False, cache_alias: str = "shared",
+                 check_interval: float = 1.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_stamp = version_stamp
+        self.cache_alias = cache_alias
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Token]:
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        _, token_row, user_row, profile_row = entry
+
+        user = _rebuild(User, user_row)
+        profile = _rebuild(UserProfile, profile_row) if profile_row is not None else None
+        if profile is not None:
+            profile._state.fields_cache["user"] = user
+        user._state.fields_cache["userprofile"] = profile  # None: get_profile() sees no profile
+        token = _rebuild(Token, token_row)
+        token._state.fields_cache["user"] = user
+        return token
+
+    def set(self, token: Token):
+        if self.ttl <= 0:
+            return
+        self._check_version()
+        profile = get_profile(token.user)
+        entry = (
+            time.monotonic() + self.ttl,
+            _row(token),
+            _row(token.user),
+            _row(profile) if profile is not None else None,
+        )
+        with self._lock:
+            self._entries[token.key] = entry
+            self._entries.move_to_end(token.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str, revoke: bool = True):
+        """Drop a token; revoke=True (logout, token deleted) reaches every process with VERSION_STAMP"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if revoke:
+            self._bump_version()
+
+    def invalidate_user(self, user_id: int, revoke: bool = False):
+        """Drop the user's tokens; revoke=True (user deleted or deactivated) reaches every process"""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[2][0] == user_id]:
+                del self._entries[key]
+        if revoke:
+            self._bump_version()
+
+    def _bump_version(self):
+        if self.version_stamp:
+            version_stamp.bump(self.cache_alias, VERSION_KEY)
+
+    def _check_version(self):
+        """Empty the cache when another process revoked something since the last check"""
+        if not self.version_stamp or time.monotonic() - self._checked_at < self.check_interval:
+            return
+        self._checked_at = time.monotonic()
+        version = version_stamp.read(self.cache_alias, VERSION_KEY)
+        if version != self._version:
+            with self._lock:
+                self._entries.clear()
+                self._version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def load_config() -> dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_token_cache() -> TokenCache:
+    """Process-wide cache built from settings.TOKEN_AUTH_CACHE"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = load_config()
+                ttl = config["TTL"]
+                if ttl > 0 and not (config["VERSION_STAMP"] and version_stamp.is_shared(config["CACHE_ALIAS"])):
+                    logger.warning("🔐 Token cache off: revocations need VERSION_STAMP and a cache shared "
+                                   "by all workers (CACHE_ALIAS %r)", config["CACHE_ALIAS"])
+                    ttl = 0
+                _cache = TokenCache(config["MAX_ENTRIES"], ttl, config["VERSION_STAMP"],
+                                    config["CACHE_ALIAS"], config["CHECK_INTERVAL"])
+    return _cache
+
+
+def forget_token(key: str, revoke: bool = True):
+    get_token_cache().invalidate(key, revoke)
+
+
+def forget_user(user_id: int, revoke: bool = False):
+    get_token_cache().invalidate_user(user_id, revoke)
+
+
+def _fetch_token(key: str) -> Optional[Token]:
+    token = Token.objects.select_related("user", "user__userprofile").filter(key=key).first()
+    if token is not None:
+        get_token_cache().set(token)
+    return token
+
+
+def load_token(key: str) -> Optional[Token]:
+    """Token with user and profile from the cache, else one query; None for an unknown key"""
+    return get_token_cache().get(key) or _fetch_token(key)
+
+
+async def aload_token(key: str) -> Optional[Token]:
+    """load_token() for async views; only a cache miss leaves the event loop"""
+    return get_token_cache().get(key) or await sync_to_async(_fetch_token)(key)
+
+
+def check_token(token: Optional[Token]) -> User:
+    """The token's user, or AuthenticationFailed like DRF's TokenAuthentication"""
+    if token is None:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+    if is_token_expired(token):
+        forget_token(token.key, revoke=False)  # every process checks expiry itself
+        raise exceptions.AuthenticationFailed(_('Token has expired.'))
+    return token.user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in for TokenAuthentication ('Authorization: Token <key>') with caching and expiry"""
+
+    def authenticate_credentials(self, key):
+        token = load_token(key)
+        return check_token(token), token
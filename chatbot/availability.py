@@ -0,0 +1,166 @@
+# chatbot/availability.py
+"""
+Busy time for mentor calendars over a whole search window, in one Calendar
+API round trip.
+
+The slot searches used to call get_busy_slots() (a full events.list) once per
+day scanned: up to 30 sequential requests for one lookup, times the number of
+mentors. query_free_busy() sends a single freebusy.query for the whole window
+and every calendar asked for, split only where Google's per-query limits
+require it, and returns each calendar's busy periods as BusyIntervals.
+
+BusyIntervals normalises the periods once into sorted, merged UTC epoch
+arrays. One slot is checked with bisect; whole days or months of candidate
+slots (slot_grid()) are checked in a single vectorised sweep with
+np.searchsorted, where has_overlap() rescanned every busy range per slot and
+re-normalised time zones on every comparison.
+
+freeBusy applies Google's own rules: events marked "free" (transparent) don't
+block a slot, all-day events do. events.list parsing skipped all-day events.
+
+calendar_client.get_busy_intervals() queries each calendar on its own, in parallel.
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+Interval = Tuple[datetime, datetime]
+
+MAX_CALENDARS_PER_QUERY = 50  # freebusy.query "items" limit
+MAX_DAYS_PER_QUERY = 60  # longer windows are split into several queries
+
+# freeBusy error reasons that asking again won't fix (calendar deleted, not shared with us)
+PERMANENT_REASONS = frozenset({"notFound", "forbidden"})
+
+
+class FreeBusyError(Exception):
+    """Google returned no busy data for a calendar (not found, no access, ...)"""
+
+    def __init__(self, calendar_id: str, reasons: Sequence[str]):
+        super().__init__(f"freebusy failed for {calendar_id}: {', '.join(reasons)}")
+        self.calendar_id = calendar_id
+        self.reasons = list(reasons)
+
+    @property
+    def permanent(self) -> bool:
+        return bool(self.reasons) and PERMANENT_REASONS.issuperset(self.reasons)
+
+
+def merge_intervals(periods: Iterable[Interval]) -> List[Interval]:
+    """Sorted, non-overlapping intervals covering the same time; touching ones are joined"""
+    merged: List[Interval] = []
+    for start, end in sorted(p for p in periods if p[0] < p[1]):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class BusyIntervals:
+    """
+    One calendar's busy time, normalised once into sorted, merged UTC epoch
+    arrays (seconds). Checks take aware datetimes or epoch arrays.
+    """
+
+    def __init__(self, periods: Iterable[Interval] = ()):
+        pairs = np.array([(s.timestamp(), e.timestamp()) for s, e in periods], dtype=np.float64).reshape(-1, 2)
+        self.starts, self.ends = _merge_epochs(pairs[:, 0], pairs[:, 1])
+        self._start_list = self.starts.tolist()  # bisect on lists beats numpy for one lookup
+        self._end_list = self.ends.tolist()
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        # intervals are disjoint and sorted, so their ends are sorted too:
+        # the first one ending after `start` is the only candidate
+        i = bisect_right(self._end_list, start.timestamp())
+        return i < len(self._end_list) and self._start_list[i] < end.timestamp()
+
+    def free_mask(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """True where [starts, ends) (epoch arrays of any shape) touches no busy interval"""
+        if not len(self.starts):
+            return np.ones(np.shape(starts), dtype=bool)
+        i = np.searchsorted(self.ends, starts, side="right")
+        candidate = self.starts[np.minimum(i, len(self.starts) - 1)]
+        return (i == len(self.starts)) | (candidate >= ends)
+
+    @property
+    def intervals(self) -> List[Interval]:
+        return [(datetime.fromtimestamp(s, timezone.utc), datetime.fromtimestamp(e, timezone.utc))
+                for s, e in zip(self._start_list, self._end_list)]
+
+    def __iter__(self):
+        return iter(self.intervals)
+
+    def __len__(self):
+        return len(self._start_list)
+
+    def __repr__(self):
+        return f"BusyIntervals({self.intervals!r})"
+
+
+def _merge_epochs(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """merge_intervals() on epoch arrays, without a Python loop"""
+    keep = starts < ends
+    starts, ends = starts[keep], ends[keep]
+    if not len(starts):
+        return starts, ends
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)  # furthest end so far
+    first = np.empty(len(starts), dtype=bool)
+    first[0] = True
+    first[1:] = starts[1:] > reach[:-1]  # a gap before this interval starts a new group
+    groups = np.flatnonzero(first)
+    return starts[groups], np.maximum.reduceat(ends, groups)
+
+
+def slot_grid(dates: Sequence[date], slots: Sequence[Tuple[int, int, int, int]], tz) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Epoch seconds of every (start hour, start minute, end hour, end minute) slot on
+    every date in `tz`: (starts, ends), each shaped (len(dates), len(slots)).
+    Slots are placed from local noon, so a DST change in the small hours doesn't shift them.
+    """
+    noons = np.array([datetime(d.year, d.month, d.day, 12, tzinfo=tz).timestamp() for d in dates],
+                     dtype=np.float64).reshape(-1, 1)
+    start_offsets = np.array([sh * 3600 + sm * 60 - 12 * 3600 for sh, sm, _, _ in slots], dtype=np.float64)
+    end_offsets = np.array([eh * 3600 + em * 60 - 12 * 3600 for _, _, eh, em in slots], dtype=np.float64)
+    return noons + start_offsets, noons + end_offsets
+
+
+def _parse(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _windows(start: datetime, end: datetime):
+    step = timedelta(days=MAX_DAYS_PER_QUERY)
+    while start < end:
+        yield start, min(start + step, end)
+        start += step
+
+
+def query_free_busy(service, calendar_ids: Sequence[str], start: datetime, end: datetime) -> Dict[str, BusyIntervals]:
+    """
+    Busy intervals per calendar id over [start, end). One freebusy.query unless
+    there are more than MAX_CALENDARS_PER_QUERY calendars or MAX_DAYS_PER_QUERY days.
+    Raises FreeBusyError for a calendar Google reports errors for.
+    """
+    periods: Dict[str, List[Interval]] = {calendar_id: [] for calendar_id in calendar_ids}
+    ids = list(periods)
+    for window_start, window_end in _windows(start, end):
+        for i in range(0, len(ids), MAX_CALENDARS_PER_QUERY):
+            body = {
+                "timeMin": window_start.isoformat(),
+                "timeMax": window_end.isoformat(),
+                "items": [{"id": calendar_id} for calendar_id in ids[i:i + MAX_CALENDARS_PER_QUERY]],
+            }
+            calendars = service.freebusy().query(body=body).execute().get("calendars", {})
+            for item in body["items"]:
+                result = calendars.get(item["id"], {})
+                if result.get("errors"):
+                    raise FreeBusyError(item["id"], [e.get("reason", "unknown") for e in result["errors"]])
+                periods[item["id"]].extend((_parse(p["start"]), _parse(p["end"])) for p in result.get("busy", []))
+    return {calendar_id: BusyIntervals(p) for calendar_id, p in periods.items()}
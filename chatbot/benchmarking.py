@@ -0,0 +1,138 @@
+# chatbot/benchmarking.py
+"""
+Shared helpers for the bench_* management commands.
+Nothing in here is imported on the request path.
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token estimate (~4 characters per token for English text)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def time_call(fn, repeat: int = 100, warmup: int = 3) -> dict:
+    """Run fn() `repeat` times and return latency stats in milliseconds"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        "runs": repeat,
+        "min_ms": samples[0],
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max_ms": samples[-1],
+    }
+
+
+def format_table(headers, rows) -> str:
+    """Plain-text table for command output"""
+    rendered = [[_format_cell(cell) for cell in row] for row in rows]
+    widths = [len(h) for h in headers]
+    for row in rendered:
+        for i, cell in enumerate(row):
+            widths[i] = max(widths[i], len(cell))
+
+    lines = [
+        "  ".join(h.ljust(widths[i]) for i, h in enumerate(headers)),
+        "  ".join("-" * w for w in widths),
+    ]
+    for row in rendered:
+        lines.append("  ".join(cell.ljust(widths[i]) for i, cell in enumerate(row)))
+    return "\n".join(lines)
+
+
+def _format_cell(cell) -> str:
+    if isinstance(cell, float):
+        return f"{cell:,.3f}"
+    if isinstance(cell, int):
+        return f"{cell:,}"
+    return str(cell)
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Stand-in for genai.GenerativeModel with a latency model of
+    base latency + input-processing time proportional to prompt tokens
+    + generation time proportional to reply tokens.
+    With stream=True the reply is yielded word by word as it is "generated".
+    """
+
+    def __init__(self, base_latency_ms: float = 300.0, ms_per_1k_input_tokens: float = 40.0,
+                 reply: str = "Here is some helpful advice for your UK job search.",
+                 ms_per_output_token: float = 0.0):
+        self.base_latency_ms = base_latency_ms
+        self.ms_per_1k_input_tokens = ms_per_1k_input_tokens
+        self.ms_per_output_token = ms_per_output_token
+        self.reply = reply
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _tracked(self):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def latency_for(self, prompt: str) -> float:
+        """Simulated time to first output token in seconds for a prompt"""
+        tokens = estimate_tokens(prompt)
+        return (self.base_latency_ms + self.ms_per_1k_input_tokens * tokens / 1000) / 1000
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self._tracked():
+            time.sleep(self.latency_for(prompt if isinstance(prompt, str) else str(prompt)))
+            if not stream:
+                time.sleep(estimate_tokens(self.reply) * self.ms_per_output_token / 1000)
+        if stream:
+            return self._stream()
+        return FakeResponse(self.reply)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        with self._tracked():
+            await asyncio.sleep(self.latency_for(prompt if isinstance(prompt, str) else str(prompt))
+                                + estimate_tokens(self.reply) * self.ms_per_output_token / 1000)
+        return FakeResponse(self.reply)
+
+    def _stream(self):
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            piece = word if i == len(words) - 1 else word + " "
+            time.sleep(estimate_tokens(piece) * self.ms_per_output_token / 1000)
+            yield FakeResponse(piece)
+
+
+class FakeGenAI:
+    """Stand-in for the configured google.generativeai module"""
+
+    def __init__(self, model: FakeGenerativeModel):
+        self.model = model
+
+    def GenerativeModel(self, *args, **kwargs):
+        return self.model
@@ -1,10 +1,9 @@
 from django.conf import settings
-from typing import List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 from pathlib import Path
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 import os
-import smtplib
 from email.mime.text import MIMEText
 from datetime import datetime, timedelta, timezone
 import datetime as dt
@@ -12,17 +11,27 @@ from django.core.mail import EmailMessage
 import ssl
 from urllib.parse import quote
 import json
+import logging
+from functools import partial
+import numpy as np
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from functools import lru_cache
 
 # Import models
 from .models import TimeSlot, EnhancedSessionBooking, Mentor, UserProfile
+from .metrics import TimedSMTP
+from .calendar_pool import TimedHttpRequest, get_service_pool
+from .availability import BusyIntervals, FreeBusyError, query_free_busy, slot_grid
+from . import calendar_mirror
+from .fanout import FanoutError, get_fanout
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 from zoneinfo import ZoneInfo
 UK_TZ = ZoneInfo("Europe/London")
 
+logger = logging.getLogger(__name__)
+
+
 # MENTOR CONFIGURATION - Using single credentials file for all mentors
 MENTOR_CONFIG = {
     "head": {
@@ -115,6 +124,8 @@ AVAILABLE_TIME_SLOTS = [
 
 # Minimum gap between sessions (7 days)
 MIN_SESSION_GAP_DAYS = 7
+# How far back get_user_last_session_date looks for a previous session
+SESSION_LOOKBACK_DAYS = 180
 
 def debug_service_account_info(credentials_file: str):
     """Debug service account email and permissions"""
@@ -124,7 +135,7 @@ def debug_service_account_info(credentials_file: str):
             str(credentials_path), 
             scopes=["https://www.googleapis.com/auth/calendar"]
         )
-        service = build("calendar", "v3", credentials=credentials)
+        service = build("calendar", "v3", credentials=credentials, requestBuilder=TimedHttpRequest)
         
         # Get service account email from credentials
         with open(credentials_path, 'r') as f:
@@ -165,11 +176,11 @@ def get_mentor_config(mentor_email: str) -> dict:
         "calendar_id": mentor_email  # Use the mentor's email as calendar_id
     }
 
-@lru_cache(maxsize=10)
 def get_calendar_service(mentor_email: str = None):
     """
-    Get Google Calendar service for specific mentor with caching.
+    Get Google Calendar service for specific mentor from the pool (see calendar_pool.py).
     If mentor_email is provided, use their specific credentials.
+    The service belongs to the calling thread; don't hand it to another one.
     """
     mentor_config = get_mentor_config(mentor_email) if mentor_email else DEFAULT_MENTOR_CONFIG
     
@@ -182,13 +193,9 @@ def get_calendar_service(mentor_email: str = None):
         if not os.path.exists(credentials_file):
             raise FileNotFoundError(f"No valid credentials file found")
     
-    print(f"🔑 Using credentials: {credentials_file}")
+    logger.debug("🔑 Using credentials: %s", credentials_file)
     
-    SCOPES = ["https://www.googleapis.com/auth/calendar"]
-    credentials = service_account.Credentials.from_service_account_file(
-        str(credentials_file), scopes=SCOPES
-    )
-    service = build("calendar", "v3", credentials=credentials)
+    service = get_service_pool().service(credentials_file, mentor_config["calendar_id"])
     return service, mentor_config
 
 def verify_calendar_access(mentor_email: str) -> bool:
@@ -222,10 +229,45 @@ def _ensure_tz(dt_obj: datetime) -> datetime:
         return dt_obj.replace(tzinfo=UK_TZ)
     return dt_obj
 
+def _session_ends_in_calendar(user_email: str, calendar_email: str) -> List[datetime]:
+    """End times of the last SESSION_LOOKBACK_DAYS of events in one calendar that user_email accepted"""
+    service, mentor_config = get_calendar_service(calendar_email)
+    calendar_id = mentor_config["calendar_id"]
+
+    # Search for past events where this user was an attendee
+    now = datetime.now(UK_TZ)
+    start_search = now - timedelta(days=SESSION_LOOKBACK_DAYS)
+
+    events = service.events().list(
+        calendarId=calendar_id,
+        timeMin=start_search.isoformat(),
+        timeMax=now.isoformat(),
+        singleEvents=True,
+        orderBy="startTime",
+        q=user_email
+    ).execute().get("items", [])
+
+    ends = []
+    for event in events:
+        attendees = event.get('attendees', [])
+        if any(att.get('email') == user_email and att.get('responseStatus') == 'accepted'
+               for att in attendees):
+
+            end_time_str = event.get("end", {}).get("dateTime")
+            if end_time_str:
+                end_time = dt.datetime.fromisoformat(
+                    end_time_str.replace("Z", "+00:00")
+                ).astimezone(UK_TZ)
+                ends.append(end_time)
+                logger.debug("📅 Found session in %s: %s", calendar_email, end_time)
+    return ends
+
 def get_user_last_session_date(user_email: str, mentor_email: str = None) -> Optional[datetime]:
     """
     Get the most recent confirmed session date for a user.
     Now checks ALL mentor calendars or specific mentor if provided.
+    Calendars the local mirror has synced recently are answered from it (see calendar_mirror.py);
+    the rest are searched in parallel (see fanout.py), skipping any that fail or time out.
     """
     try:
         all_sessions = []
@@ -233,53 +275,40 @@ def get_user_last_session_date(user_email: str, mentor_email: str = None) -> Opt
         # If specific mentor provided, check only their calendar
         if mentor_email:
             calendars_to_check = [mentor_email]
-            print(f"📅 Checking last session for {user_email} with mentor {mentor_email}")
+            logger.debug("📅 Checking last session for %s with mentor %s", user_email, mentor_email)
         else:
             # Check all mentor calendars
             calendars_to_check = [config["email"] for config in MENTOR_CONFIG.values()]
-            print(f"📅 Checking last session for {user_email} in all calendars: {calendars_to_check}")
-        
-        for calendar_email in calendars_to_check:
-            try:
-                service, mentor_config = get_calendar_service(calendar_email)
-                calendar_id = mentor_config["calendar_id"]
-                
-                # Search for past events where this user was an attendee
+            logger.debug("📅 Checking last session for %s in all calendars: %s", user_email, calendars_to_check)
+
+        mirror = calendar_mirror.load_config()
+        if mirror["ENABLED"]:
+            calendar_ids = {get_mentor_config(email)["calendar_id"]: email for email in calendars_to_check}
+            mirrored = calendar_mirror.fresh_calendars(calendar_ids, mirror["MAX_AGE"])
+            if mirrored:
                 now = datetime.now(UK_TZ)
-                start_search = now - timedelta(days=180)
-                
-                events = service.events().list(
-                    calendarId=calendar_id,
-                    timeMin=start_search.isoformat(),
-                    timeMax=now.isoformat(),
-                    singleEvents=True,
-                    orderBy="startTime",
-                    q=user_email
-                ).execute().get("items", [])
-                
-                for event in events:
-                    attendees = event.get('attendees', [])
-                    if any(att.get('email') == user_email and att.get('responseStatus') == 'accepted' 
-                           for att in attendees):
-                        
-                        end_time_str = event.get("end", {}).get("dateTime")
-                        if end_time_str:
-                            end_time = dt.datetime.fromisoformat(
-                                end_time_str.replace("Z", "+00:00")
-                            ).astimezone(UK_TZ)
-                            all_sessions.append(end_time)
-                            print(f"📅 Found session in {calendar_email}: {end_time}")
-                            
-            except Exception as e:
-                print(f"⚠️ Error checking calendar {calendar_email}: {e}")
-                continue
+                last = calendar_mirror.last_session_end(user_email, mirrored,
+                                                        now - timedelta(days=SESSION_LOOKBACK_DAYS), now)
+                if last:
+                    all_sessions.append(last.astimezone(UK_TZ))
+                logger.debug("📅 Mirror answered for %s: %s", sorted(mirrored), last)
+            calendars_to_check = [email for calendar_id, email in calendar_ids.items() if calendar_id not in mirrored]
+        
+        searches = get_fanout().run({
+            calendar_email: partial(_session_ends_in_calendar, user_email, calendar_email)
+            for calendar_email in calendars_to_check
+        })
+        for ends in searches.results.values():
+            all_sessions.extend(ends)
+        for calendar_email, e in searches.errors.items():
+            print(f"⚠️ Error checking calendar {calendar_email}: {e}")
         
         if all_sessions:
             last_session = max(all_sessions)
-            print(f"📅 Latest session for {user_email}: {last_session}")
+            logger.debug("📅 Latest session for %s: %s", user_email, last_session)
             return last_session
         else:
-            print(f"📅 No previous sessions found for {user_email}")
+            logger.debug("📅 No previous sessions found for %s", user_email)
             return None
             
     except Exception as e:
@@ -295,7 +324,7 @@ def calculate_earliest_next_session(user_email: str, mentor_email: str = None) -
     now = datetime.now(UK_TZ)
     
     if last_session_end is None:
-        print(f"📅 {user_email} - No previous sessions found")
+        logger.debug("📅 %s - No previous sessions found", user_email)
         return now
     
     earliest_next = last_session_end + timedelta(days=MIN_SESSION_GAP_DAYS)
@@ -303,7 +332,8 @@ def calculate_earliest_next_session(user_email: str, mentor_email: str = None) -
     if earliest_next < now:
         return now
     
-    print(f"📅 7-day gap enforcement: earliest next session for {user_email} is {earliest_next}")
+    logger.info("📅 7-day gap enforcement: earliest next session for %s is %s", user_email, earliest_next,
+                extra={"user_email": user_email, "earliest_next": earliest_next})
     return earliest_next
 
 def get_busy_slots(start_ist: datetime, end_ist: datetime, mentor_email: str = None) -> List[Tuple[datetime, datetime]]:
@@ -333,6 +363,66 @@ def get_busy_slots(start_ist: datetime, end_ist: datetime, mentor_email: str = N
         busy.append((sdt, edt))
     return busy
 
+def get_busy_intervals(mentor_emails: Iterable[Optional[str]], start: datetime,
+                       end: datetime) -> Dict[Optional[str], BusyIntervals]:
+    """
+    Busy periods of each mentor's calendar over [start, end), keyed by the emails passed
+    (None = default calendar). One freebusy.query per calendar covers the whole window,
+    instead of an events.list per day (see availability.py).
+    """
+    start, end = _ensure_tz(start), _ensure_tz(end)
+    calendars = {}  # calendar id -> (an email using it, [mentor emails])
+    for email in dict.fromkeys(mentor_emails):
+        mentor_config = get_mentor_config(email) if email else DEFAULT_MENTOR_CONFIG
+        _, emails = calendars.setdefault(mentor_config["calendar_id"], (email, []))
+        emails.append(email)
+
+    def query(email, calendar_id):
+        service, _ = get_calendar_service(email)  # on the fan-out thread: clients are per thread
+        return query_free_busy(service, [calendar_id], start, end)[calendar_id]
+
+    # Calendars are queried in parallel, each behind its own circuit breaker, so a broken calendar
+    # only fails the lookups that include it. A missing answer fails the lookup, since an unknown
+    # calendar can't be shown as free
+    queries = get_fanout().run({
+        calendar_id: partial(query, email, calendar_id) for calendar_id, (email, _) in calendars.items()
+    }, is_failure=_is_calendar_outage)
+    if not queries.complete:
+        errors = list(queries.errors.values())
+        raise errors[0] if len(errors) == 1 and len(calendars) == 1 else FanoutError(queries)
+
+    return {email: queries.results[calendar_id] for calendar_id, (_, emails) in calendars.items() for email in emails}
+
+def _is_calendar_outage(error: BaseException) -> bool:
+    """Should the error count against the calendar's breaker? Not a calendar Google can't find or let us read"""
+    return not (isinstance(error, FreeBusyError) and error.permanent)
+
+def sync_event_mirror(mentor_emails: Iterable[str] = None, full: bool = False) -> Dict[str, dict]:
+    """
+    Bring the local event mirror (calendar_mirror.py) up to date for each mentor's calendar
+    (all of MENTOR_CONFIG by default). Returns sync counts, or {"error": ...}, per calendar id.
+    """
+    config = calendar_mirror.load_config()
+    emails = mentor_emails or [mentor["email"] for mentor in MENTOR_CONFIG.values()]
+    results = {}
+    for email in dict.fromkeys(emails):
+        try:
+            service, mentor_config = get_calendar_service(email)
+            calendar_id = mentor_config["calendar_id"]
+            if calendar_id not in results:
+                results[calendar_id] = calendar_mirror.sync_calendar(
+                    service, calendar_id, config["WINDOW_DAYS"], config["PAGE_SIZE"], full)
+        except Exception as e:
+            logger.warning("⚠️ Calendar mirror sync failed for %s: %s", email, e, extra={"mentor": email})
+            results[email] = {"error": str(e)}
+    return results
+
+def slot_bounds(day, slot: Tuple[int, int, int, int]) -> Tuple[datetime, datetime]:
+    """(start, end) in UK time of an AVAILABLE_TIME_SLOTS entry on `day`"""
+    start_hour, start_min, end_hour, end_min = slot
+    return (datetime(day.year, day.month, day.day, start_hour, start_min, tzinfo=UK_TZ),
+            datetime(day.year, day.month, day.day, end_hour, end_min, tzinfo=UK_TZ))
+
 def has_overlap(start_a: datetime, end_a: datetime, ranges: List[Tuple[datetime, datetime]]) -> bool:
     """Check if a time slot overlaps with busy periods"""
     start_a = _ensure_tz(start_a)
@@ -347,58 +437,48 @@ def has_overlap(start_a: datetime, end_a: datetime, ranges: List[Tuple[datetime,
 def find_next_available_15min_slot(mentor_email: str = None, after: datetime = None) -> Tuple[datetime, datetime]:
     """Find next available 15-minute slot for specific mentor after given datetime."""
     now = after or datetime.now(UK_TZ)
+    mentor = mentor_email or 'default'
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
+    # Busy time for the whole 4-day window in one request
+    window_start = datetime.combine(now.date(), dt.time(9, 0), tzinfo=UK_TZ)
+    window_end = datetime.combine(now.date() + timedelta(days=3), dt.time(17, 0), tzinfo=UK_TZ)
+    busy = get_busy_intervals([mentor_email], window_start, window_end)[mentor_email]
+    
+    # Every slot of the 4 days checked against it in one sweep
+    scan_dates = [(now + timedelta(days=day_offset)).date() for day_offset in range(0, 4)]
+    starts, ends = slot_grid(scan_dates, AVAILABLE_TIME_SLOTS, UK_TZ)
+    upcoming = starts > _ensure_tz(now).timestamp()  # skip slots in the past
+    free = busy.free_mask(starts, ends) & upcoming
     
     # Scan today and next 3 days
-    for day_offset in range(0, 4):
-        scan_date = (now + timedelta(days=day_offset)).date()
-        
+    for day_offset, scan_date in enumerate(scan_dates):
         # Skip if it's today but current time is past 4:45 PM (last slot start)
         if day_offset == 0 and now.hour >= 16 and now.minute >= 45:
             continue
             
-        print(f"🔍 Scanning {scan_date} for {mentor_email or 'default'} available slots...")
+        if debug:
+            logger.debug("🔍 Scanning %s for %s available slots...", scan_date, mentor)
         
-        # Get busy slots for the entire day for this mentor
-        day_start = datetime.combine(scan_date, dt.time(9, 0), tzinfo=UK_TZ)
-        day_end = datetime.combine(scan_date, dt.time(17, 0), tzinfo=UK_TZ)
-        busy_slots = get_busy_slots(day_start, day_end, mentor_email)
+        hits = np.flatnonzero(free[day_offset])
+        first = hits[0] if len(hits) else len(AVAILABLE_TIME_SLOTS)
+        if debug:
+            for j in np.flatnonzero(upcoming[day_offset, :first]):
+                logger.debug("❌ Slot busy for %s: %s - %s", mentor, *slot_bounds(scan_date, AVAILABLE_TIME_SLOTS[j]))
         
-        # Check each 15-minute slot
-        for start_hour, start_min, end_hour, end_min in AVAILABLE_TIME_SLOTS:
-            slot_start = datetime(
-                year=scan_date.year, 
-                month=scan_date.month, 
-                day=scan_date.day,
-                hour=start_hour, 
-                minute=start_min, 
-                tzinfo=UK_TZ
-            )
-            slot_end = datetime(
-                year=scan_date.year, 
-                month=scan_date.month, 
-                day=scan_date.day,
-                hour=end_hour, 
-                minute=end_min, 
-                tzinfo=UK_TZ
-            )
-            
-            # Skip if slot is in the past
-            if slot_start <= now:
-                continue
-                
-            # Check if slot is free for this mentor
-            if not has_overlap(slot_start, slot_end, busy_slots):
-                print(f"✅ Found free slot for {mentor_email or 'default'}: {slot_start.strftime('%Y-%m-%d %I:%M %p')} - {slot_end.strftime('%I:%M %p')}")
-                return slot_start, slot_end
-            else:
-                print(f"❌ Slot busy for {mentor_email or 'default'}: {slot_start.strftime('%Y-%m-%d %I:%M %p')} - {slot_end.strftime('%I:%M %p')}")
+        if len(hits):
+            slot_start, slot_end = slot_bounds(scan_date, AVAILABLE_TIME_SLOTS[first])
+            logger.info("✅ Found free slot for %s: %s - %s", mentor, slot_start, slot_end,
+                        extra={"mentor": mentor, "slot_start": slot_start})
+            return slot_start, slot_end
     
     # Fallback - schedule for next week Monday 9 AM
     next_monday = now + timedelta(days=(7 - now.weekday()))
     fallback_start = datetime.combine(next_monday.date(), dt.time(9, 0), tzinfo=UK_TZ)
     fallback_end = fallback_start + timedelta(minutes=15)
     
-    print(f"⚠️ No slots available this week for {mentor_email or 'default'}. Fallback: {fallback_start}")
+    logger.warning("⚠️ No slots available this week for %s. Fallback: %s", mentor, fallback_start,
+                   extra={"mentor": mentor, "slot_start": fallback_start})
     return fallback_start, fallback_end
 
 def get_next_available_slots_for_user(user_email: str, count: int = 5, mentor_email: str = None) -> List[dict]:
@@ -417,8 +497,21 @@ def get_next_available_slots_for_user(user_email: str, count: int = 5, mentor_em
     current_date = earliest_allowed.date()
     days_checked = 0
     max_days_to_check = 30
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
+    logger.info("📅 Finding %d slots for %s with mentor %s starting from %s", count, user_email, mentor_email,
+                current_date, extra={"user_email": user_email, "mentor": mentor_email})
     
-    print(f"📅 Finding {count} slots for {user_email} with mentor {mentor_email} starting from {current_date}")
+    # Busy time for every day that may be scanned, in one request
+    window_start = datetime.combine(current_date, dt.time(9, 0), tzinfo=UK_TZ)
+    window_end = datetime.combine(current_date + timedelta(days=max_days_to_check - 1), dt.time(17, 0), tzinfo=UK_TZ)
+    busy = get_busy_intervals([mentor_email], window_start, window_end)[mentor_email]
+    
+    # ...and every slot of those days checked against it in one sweep
+    dates = [current_date + timedelta(days=offset) for offset in range(max_days_to_check)]
+    starts, ends = slot_grid(dates, AVAILABLE_TIME_SLOTS, UK_TZ)
+    eligible = starts >= _ensure_tz(earliest_allowed).timestamp()  # respects the session gap
+    free = busy.free_mask(starts, ends) & eligible
     
     while len(slots) < count and days_checked < max_days_to_check:
         check_date = current_date + timedelta(days=days_checked)
@@ -428,46 +521,23 @@ def get_next_available_slots_for_user(user_email: str, count: int = 5, mentor_em
             days_checked += 1
             continue
         
-        print(f"🔍 Checking {check_date} for available slots...")
-        
-        # Get busy slots for this entire day for the specific mentor
-        day_start = datetime.combine(check_date, dt.time(9, 0), tzinfo=UK_TZ)
-        day_end = datetime.combine(check_date, dt.time(17, 0), tzinfo=UK_TZ)
-        busy_slots = get_busy_slots(day_start, day_end, mentor_email)
+        if debug:
+            logger.debug("🔍 Checking %s for available slots...", check_date)
         
         # Track slots found for this day
         day_slots_found = 0
         max_slots_per_day = 8  # Max 8 slots per day (2 hours)
         
-        # Check each time slot for this day
-        for start_hour, start_min, end_hour, end_min in AVAILABLE_TIME_SLOTS:
+        # Check each time slot for this day that isn't before the earliest allowed time
+        for j in np.flatnonzero(eligible[days_checked]):
             if len(slots) >= count or day_slots_found >= max_slots_per_day:
                 break
-                
-            slot_start = datetime(
-                year=check_date.year,
-                month=check_date.month,
-                day=check_date.day,
-                hour=start_hour,
-                minute=start_min,
-                tzinfo=UK_TZ
-            )
-            slot_end = datetime(
-                year=check_date.year,
-                month=check_date.month,
-                day=check_date.day,
-                hour=end_hour,
-                minute=end_min,
-                tzinfo=UK_TZ
-            )
-            
-            # Skip if before earliest allowed time
-            if slot_start < earliest_allowed:
-                continue
             
             # Check if slot is available for this mentor
-            if not has_overlap(slot_start, slot_end, busy_slots):
-                print(f"✅ Found available slot: {slot_start.strftime('%Y-%m-%d %I:%M %p')} - {slot_end.strftime('%I:%M %p')}")
+            if free[days_checked, j]:
+                slot_start, slot_end = slot_bounds(check_date, AVAILABLE_TIME_SLOTS[j])
+                if debug:
+                    logger.debug("✅ Found available slot: %s - %s", slot_start, slot_end)
                 
                 slots.append({
                     "start_time": slot_start,
@@ -481,12 +551,13 @@ def get_next_available_slots_for_user(user_email: str, count: int = 5, mentor_em
                 })
                 
                 day_slots_found += 1
-            else:
-                print(f"❌ Slot busy: {slot_start.strftime('%Y-%m-%d %I:%M %p')} - {slot_end.strftime('%I:%M %p')}")
+            elif debug:
+                logger.debug("❌ Slot busy: %s - %s", *slot_bounds(check_date, AVAILABLE_TIME_SLOTS[j]))
         
         days_checked += 1
     
-    print(f"📅 Found {len(slots)} available slots for {user_email} with mentor {mentor_email}")
+    logger.info("📅 Found %d available slots for %s with mentor %s", len(slots), user_email, mentor_email,
+                extra={"user_email": user_email, "mentor": mentor_email, "slots": len(slots)})
     return slots
 
 def cancel_calendar_event(event_id, mentor_email: str = None):
@@ -500,6 +571,7 @@ def cancel_calendar_event(event_id, mentor_email: str = None):
         calendar_id = mentor_config["calendar_id"]
         
         service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
+        calendar_mirror.record_event(calendar_id, {"id": event_id, "status": "cancelled"})
         print(f"✅ Successfully cancelled calendar event: {event_id}")
         return True
         
@@ -590,6 +662,7 @@ def create_enhanced_event(
             body=event_body,
             sendUpdates="none"
         ).execute()
+        calendar_mirror.record_event(calendar_id, created)
 
         print(f"✅ Event created in {mentor_email or 'default'}'s calendar: {created.get('htmlLink')}")
         return {
@@ -680,7 +753,6 @@ def send_enhanced_manual_invitations(attendees, meet_link, start_time, end_time,
     """
     from email.mime.multipart import MIMEMultipart
     from email.mime.text import MIMEText
-    import smtplib
     import ssl
 
     def generate_google_calendar_url(summary, start_time, end_time, description, location=None):
@@ -770,7 +842,7 @@ Thank you for booking!
     # Send email using SMTP
     try:
         # Create SMTP connection - FIXED: removed context parameter from starttls()
-        server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
+        server = TimedSMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
         server.ehlo()
         server.starttls()  # No context parameter needed
         server.ehlo()  # Re-identify after starttls
@@ -820,12 +892,11 @@ def send_via_fallback_smtp(subject, html_body, text_body, recipients, sender_ema
     """
     from email.mime.multipart import MIMEMultipart
     from email.mime.text import MIMEText
-    import smtplib
     import ssl
     
     try:
         # Connect to Gmail's SMTP server using TLS
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
+        with TimedSMTP("smtp.gmail.com", 587) as server:
             server.starttls()  # Remove the context parameter
             server.login(sender_email, sender_password)
             
@@ -863,6 +934,11 @@ def get_available_days_for_user(user_email: str, mentor_email: str = None, max_d
     current_date = earliest_allowed.date()
     days_checked = 0
     
+    # One busy-time request for the 14 days that may be scanned
+    window_start = datetime.combine(current_date, dt.time(9, 0), tzinfo=UK_TZ)
+    window_end = datetime.combine(current_date + timedelta(days=13), dt.time(17, 0), tzinfo=UK_TZ)
+    busy = get_busy_intervals([mentor_email], window_start, window_end)[mentor_email]
+    
     while len(available_days) < max_days and days_checked < 14:
         check_date = current_date + timedelta(days=days_checked)
         
@@ -870,7 +946,8 @@ def get_available_days_for_user(user_email: str, mentor_email: str = None, max_d
             days_checked += 1
             continue
         
-        day_slots = get_slots_for_specific_day_helper(user_email, check_date, mentor_email)
+        day_slots = get_slots_for_specific_day_helper(user_email, check_date, mentor_email,
+                                                      earliest_allowed=earliest_allowed, busy=busy)
         if day_slots:
             available_days.append({
                 "day": check_date.strftime('%A'),
@@ -883,8 +960,11 @@ def get_available_days_for_user(user_email: str, mentor_email: str = None, max_d
     
     return available_days
 
-def get_slots_for_specific_day_helper(student_email: str, target_date, mentor_email: str):
-    earliest_allowed = calculate_earliest_next_session(student_email, mentor_email)
+def get_slots_for_specific_day_helper(student_email: str, target_date, mentor_email: str,
+                                      earliest_allowed: datetime = None, busy: BusyIntervals = None):
+    """Free slots on one day; callers scanning several days pass earliest_allowed and busy for the whole range"""
+    if earliest_allowed is None:
+        earliest_allowed = calculate_earliest_next_session(student_email, mentor_email)
 
     if not mentor_email:
         mentor_email = "sunilramtri000@gmail.com"
@@ -907,32 +987,26 @@ def get_slots_for_specific_day_helper(student_email: str, target_date, mentor_em
     if isinstance(target_date, datetime):
         target_date = target_date.date()
     
-    print(f"🔍 Checking slots for {target_date} with mentor {mentor_email}")
+    logger.debug("🔍 Checking slots for %s with mentor %s", target_date, mentor_email)
     
-    day_start = datetime.combine(target_date, dt.time(9, 0), tzinfo=UK_TZ)
-    day_end = datetime.combine(target_date, dt.time(17, 0), tzinfo=UK_TZ)
-    busy_slots = get_busy_slots(day_start, day_end, mentor_email)
+    if busy is None:
+        day_start = datetime.combine(target_date, dt.time(9, 0), tzinfo=UK_TZ)
+        day_end = datetime.combine(target_date, dt.time(17, 0), tzinfo=UK_TZ)
+        busy = get_busy_intervals([mentor_email], day_start, day_end)[mentor_email]
     
     available_slots = []
     
-    # Loop through fixed available slots
-    for start_hour, start_min, end_hour, end_min in AVAILABLE_TIME_SLOTS:
-        slot_start = datetime(target_date.year, target_date.month, target_date.day,
-                              start_hour, start_min, tzinfo=UK_TZ)
-        slot_end = datetime(target_date.year, target_date.month, target_date.day,
-                            end_hour, end_min, tzinfo=UK_TZ)
-        
-        # Respect earliest allowed session
-        if slot_start < earliest_allowed:
-            continue
-        
-        if not has_overlap(slot_start, slot_end, busy_slots):
-            available_slots.append({
+    # The day's fixed slots, checked in one sweep; respect earliest allowed session
+    starts, ends = slot_grid([target_date], AVAILABLE_TIME_SLOTS, UK_TZ)
+    free = busy.free_mask(starts[0], ends[0]) & (starts[0] >= _ensure_tz(earliest_allowed).timestamp())
+    for j in np.flatnonzero(free):
+        slot_start, slot_end = slot_bounds(target_date, AVAILABLE_TIME_SLOTS[j])
+        available_slots.append({
                 "start_time": slot_start,
-                "end_time": slot_end,
-                "formatted_date": slot_start.strftime('%A, %B %d'),
-                "formatted_time": f"{slot_start.strftime('%I:%M %p')} - {slot_end.strftime('%I:%M %p')} UK time",
-            })
+            "end_time": slot_end,
+            "formatted_date": slot_start.strftime('%A, %B %d'),
+            "formatted_time": f"{slot_start.strftime('%I:%M %p')} - {slot_end.strftime('%I:%M %p')} UK time",
+        })
     
     return available_slots
 
@@ -1118,7 +1192,7 @@ def send_booking_emails(booking, user_profile, mentor):
         attendees = [student_email, mentor_email]
         
         # Connect to SMTP
-        server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
+        server = TimedSMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
         server.ehlo()
         server.starttls()
         server.ehlo()
@@ -1319,7 +1393,6 @@ def send_booking_emails(booking, user_profile, mentor):
         traceback.print_exc()
         return False
 
-import smtplib
 import ssl
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -1327,7 +1400,7 @@ from django.conf import settings
 
 def send_booking_emails_smtp(booking, user_profile, mentor):
     """
-    Send confirmation emails to student and mentor using smtplib.
+    Send confirmation emails to student and mentor over SMTP.
     Fully compatible with Python 3.11+ (no keyfile error).
     """
     try:
@@ -1373,7 +1446,7 @@ def send_booking_emails_smtp(booking, user_profile, mentor):
 
         # Setup SMTP with TLS context (Python 3.11+ safe)
         context = ssl.create_default_context()
-        with smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT) as server:
+        with TimedSMTP(settings.EMAIL_HOST, settings.EMAIL_PORT) as server:
             server.starttls(context=context)  # ✅ TLS without keyfile
             server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
             server.send_message(msg)
@@ -1395,7 +1468,6 @@ def send_cancellation_notifications(attendees, student_name, mentor_name, format
     Uses the same SMTP setup as send_enhanced_manual_invitations
     """
     try:
-        import smtplib
         from email.mime.multipart import MIMEMultipart
         from email.mime.text import MIMEText
         from django.conf import settings
@@ -1403,7 +1475,7 @@ def send_cancellation_notifications(attendees, student_name, mentor_name, format
         print(f"📧 [CANCEL EMAIL] Sending to: {attendees}")
         
         # Connect to SMTP server (same as booking emails)
-        server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
+        server = TimedSMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
         server.starttls()
         server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
         
@@ -0,0 +1,194 @@
+# chatbot/calendar_mirror.py
+"""
+A local copy of mentor calendar events, kept fresh with Google's incremental
+sync, so the 7-day gap rule is a database query instead of a calendar scan.
+
+calendar_client.get_user_last_session_date() listed 180 days of events in
+every mentor calendar, one calendar after another, with a full-text q= search,
+each time calculate_earliest_next_session() ran during booking. With the
+mirror enabled it asks the CalendarEventAttendee (email, response status)
+index instead, for every calendar synced within MAX_AGE; calendars that
+aren't fall back to the live scan.
+
+sync_calendar() lists a calendar's events once (from WINDOW_DAYS back) and
+stores Google's nextSyncToken in CalendarSyncState. Each later run sends that
+token and gets back only what changed since, deleted events as "cancelled".
+A token Google no longer accepts (410) triggers a fresh full sync. Events
+the app itself creates or cancels are written through with record_event(), so
+a booking counts before the next sync runs.
+
+Run `manage.py sync_calendar_mirror --interval=60` as a worker (or from cron).
+
+Configured through settings.CALENDAR_MIRROR:
+    ENABLED      answer last-session lookups from the mirror
+    MAX_AGE      seconds since a calendar's last sync before lookups go back to the API
+    WINDOW_DAYS  how far back a full sync reaches (at least the 180-day session lookback)
+    PAGE_SIZE    events per events.list page
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Max
+from django.utils import timezone
+from googleapiclient.errors import HttpError
+
+from .models import CalendarEvent, CalendarEventAttendee, CalendarSyncState
+
+DEFAULT_CONFIG = {
+    "ENABLED": False,
+    "MAX_AGE": 900,
+    "WINDOW_DAYS": 180,
+    "PAGE_SIZE": 250,
+}
+
+CHUNK_SIZE = 500  # event ids per IN (...) query
+
+logger = logging.getLogger(__name__)
+
+
+def load_config() -> dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'CALENDAR_MIRROR', {})}
+
+
+def _parse_time(value: dict) -> Optional[datetime]:
+    """An event's start/end; None for all-day events (date only)"""
+    if not value or "dateTime" not in value:
+        return None
+    return datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+
+
+def _chunks(items: List, size: int = CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _fetch(service, calendar_id: str, sync_token: str, window_days: int, page_size: int):
+    """All pages of one events.list: (events, nextSyncToken). Without a token, a full listing"""
+    params = {"calendarId": calendar_id, "singleEvents": True, "maxResults": page_size}
+    if sync_token:
+        params["syncToken"] = sync_token
+    else:
+        params["timeMin"] = (timezone.now() - timedelta(days=window_days)).isoformat()
+
+    events = []
+    while True:
+        response = service.events().list(**params).execute()
+        events.extend(response.get("items", []))
+        if not response.get("nextPageToken"):
+            return events, response.get("nextSyncToken", "")
+        params["pageToken"] = response["nextPageToken"]
+
+
+def _apply(calendar_id: str, events: Iterable[dict], replace_all: bool = False) -> Dict[str, int]:
+    """Store changed events and drop cancelled ones; replace_all first empties the calendar"""
+    latest = {}
+    for event in events:  # a sync can list an event more than once; the last version wins
+        latest[event["id"]] = event
+    live = [event for event in latest.values() if event.get("status") != "cancelled"]
+
+    with transaction.atomic():
+        existing = CalendarEvent.objects.filter(calendar_id=calendar_id)
+        if replace_all:
+            existing.delete()
+        else:
+            for ids in _chunks(list(latest)):
+                existing.filter(event_id__in=ids).delete()
+
+        rows = CalendarEvent.objects.bulk_create([
+            CalendarEvent(
+                calendar_id=calendar_id,
+                event_id=event["id"],
+                summary=(event.get("summary") or "")[:500],
+                start=_parse_time(event.get("start")),
+                end=_parse_time(event.get("end")),
+                updated=_parse_time({"dateTime": event["updated"]}) if event.get("updated") else None,
+            )
+            for event in live
+        ], batch_size=CHUNK_SIZE)
+        if rows and rows[0].pk is None:  # backends that can't return ids from a bulk insert
+            pks = {}
+            for ids in _chunks([row.event_id for row in rows]):
+                pks.update(existing.filter(event_id__in=ids).values_list("event_id", "pk"))
+            for row in rows:
+                row.pk = pks[row.event_id]
+
+        CalendarEventAttendee.objects.bulk_create([
+            CalendarEventAttendee(event=row, email=attendee["email"].lower(),
+                                  response_status=attendee.get("responseStatus", ""))
+            for row, event in zip(rows, live)
+            for attendee in event.get("attendees", [])
+            if attendee.get("email")
+        ], batch_size=CHUNK_SIZE)
+
+    return {"changed": len(live), "deleted": len(latest) - len(live)}
+
+
+def sync_calendar(service, calendar_id: str, window_days: int = 180, page_size: int = 250,
+                  full: bool = False) -> dict:
+    """
+    Bring one calendar's mirror up to date: incrementally from the stored sync token,
+    or with a full listing when there is none, full=True, or Google rejects the token.
+    """
+    state, _ = CalendarSyncState.objects.get_or_create(calendar_id=calendar_id)
+    full = full or not state.sync_token
+    try:
+        events, sync_token = _fetch(service, calendar_id, None if full else state.sync_token,
+                                    window_days, page_size)
+    except HttpError as e:
+        if full or e.resp.status != 410:
+            raise
+        logger.info("🔄 Sync token for %s expired, running a full sync", calendar_id,
+                    extra={"calendar_id": calendar_id})
+        return sync_calendar(service, calendar_id, window_days, page_size, full=True)
+
+    with transaction.atomic():
+        counts = _apply(calendar_id, events, replace_all=full)
+        state.sync_token = sync_token
+        state.synced_at = timezone.now()
+        if full:
+            state.full_sync_at = state.synced_at
+        state.save()
+
+    logger.info("🔄 Synced %s: %d changed, %d deleted%s", calendar_id, counts["changed"], counts["deleted"],
+                " (full)" if full else "", extra={"calendar_id": calendar_id, "full": full, **counts})
+    return {**counts, "full": full}
+
+
+def record_event(calendar_id: str, event: dict):
+    """
+    Write an event the app just created (or {"id": ..., "status": "cancelled"}) through to
+    the mirror, so it counts before the next sync. Never fails the caller.
+    """
+    if not load_config()["ENABLED"] or not event.get("id"):
+        return
+    try:
+        _apply(calendar_id, [event])
+    except DatabaseError as e:
+        logger.warning("⚠️ Could not record event %s in the calendar mirror: %s", event["id"], e,
+                       extra={"calendar_id": calendar_id})
+
+
+def fresh_calendars(calendar_ids: Iterable[str], max_age: float) -> Set[str]:
+    """The calendars among calendar_ids synced within the last max_age seconds"""
+    since = timezone.now() - timedelta(seconds=max_age)
+    return set(CalendarSyncState.objects.filter(calendar_id__in=list(calendar_ids), synced_at__gte=since)
+               .values_list("calendar_id", flat=True))
+
+
+def last_session_end(user_email: str, calendar_ids: Iterable[str], since: datetime,
+                     until: datetime) -> Optional[datetime]:
+    """
+    Latest end of an event in calendar_ids overlapping [since, until) that user_email
+    accepted, from the attendee index; None if there is none.
+    """
+    return CalendarEvent.objects.filter(
+        calendar_id__in=list(calendar_ids),
+        attendees__email=user_email.lower(),
+        attendees__response_status="accepted",
+        start__lt=until,
+        end__gt=since,
+    ).aggregate(last=Max("end"))["last"]
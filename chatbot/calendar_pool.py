@@ -0,0 +1,149 @@
+# chatbot/calendar_pool.py
+"""
+Google Calendar API clients, built once and reused.
+
+Building a client used to mean reading the service-account JSON, creating
+credentials (and so fetching a fresh OAuth token on the first call), and
+parsing the ~130 KB Calendar discovery document. get_calendar_service() did
+that per mentor and then shared one client between all threads, although its
+httplib2 transport is not thread-safe.
+
+CalendarServicePool keeps, per process:
+    credentials          one per credentials file, so OAuth tokens are fetched once
+                         and refreshed in place when they expire
+    discovery document   the one bundled with google-api-python-client (static_discovery), read once
+and, per thread, one authorised HTTP transport per credentials file and one
+client per (credentials file, calendar id). A thread keeps its connection to
+Google open between calls, and no two threads ever share a transport.
+
+Configured through settings.CALENDAR_SERVICE:
+    API_ENDPOINT  Calendar API base URL ("" = Google; fake_calendar.py for benchmarks)
+    TIMEOUT       socket timeout in seconds for API calls
+"""
+
+import threading
+from typing import Dict
+
+import google_auth_httplib2
+import httplib2
+from django.conf import settings
+from google.oauth2 import service_account
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import HttpRequest
+
+from .metrics import track_external
+
+DEFAULT_CONFIG = {
+    "API_ENDPOINT": "",
+    "TIMEOUT": 30,
+}
+
+SCOPES = ["https://www.googleapis.com/auth/calendar"]
+
+
+class TimedHttpRequest(HttpRequest):
+    """Calendar API request whose execute() counts as external "google_calendar" time (see metrics.py)"""
+
+    def execute(self, *args, **kwargs):
+        with track_external("google_calendar"):
+            return super().execute(*args, **kwargs)
+
+
+class CalendarServicePool:
+    """Shared credentials and discovery document; clients and transports per thread"""
+
+    def __init__(self, api_endpoint: str = "", timeout: float = 30):
+        self.api_endpoint = api_endpoint
+        self.timeout = timeout
+        self._credentials: Dict[str, service_account.Credentials] = {}
+        self._document = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def credentials(self, credentials_file: str) -> service_account.Credentials:
+        credentials_file = str(credentials_file)
+        credentials = self._credentials.get(credentials_file)
+        if credentials is None:
+            with self._lock:
+                credentials = self._credentials.get(credentials_file)
+                if credentials is None:
+                    credentials = service_account.Credentials.from_service_account_file(
+                        credentials_file, scopes=SCOPES
+                    )
+                    self._credentials[credentials_file] = credentials
+        return credentials
+
+    def discovery_document(self) -> str:
+        """The bundled discovery document, read from disk once (parsed per client: building one modifies it)"""
+        if self._document is None:
+            with self._lock:
+                if self._document is None:
+                    self._document = get_static_doc("calendar", "v3")
+        return self._document
+
+    def service(self, credentials_file: str, calendar_id: str):
+        """This thread's Calendar client for the credentials file"""
+        credentials_file = str(credentials_file)
+        services = self._thread_state("services")
+        key = (credentials_file, calendar_id)
+        service = services.get(key)
+        if service is None:
+            service = build_from_document(
+                self.discovery_document(),
+                http=self._http(credentials_file),
+                requestBuilder=TimedHttpRequest,
+                client_options={"api_endpoint": self.api_endpoint} if self.api_endpoint else None,
+            )
+            services[key] = service
+        return service
+
+    def _http(self, credentials_file: str) -> google_auth_httplib2.AuthorizedHttp:
+        """This thread's transport; refreshes the shared credentials' token when it expires"""
+        transports = self._thread_state("transports")
+        http = transports.get(credentials_file)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials(credentials_file), http=httplib2.Http(timeout=self.timeout)
+            )
+            transports[credentials_file] = http
+        return http
+
+    def _thread_state(self, name: str) -> dict:
+        state = getattr(self._local, name, None)
+        if state is None:
+            state = {}
+            setattr(self._local, name, state)
+        return state
+
+    def clear(self):
+        """Forget credentials (e.g. after rotating a key file); threads rebuild their clients"""
+        with self._lock:
+            self._credentials.clear()
+            self._local = threading.local()
+
+
+def load_config() -> dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'CALENDAR_SERVICE', {})}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_service_pool() -> CalendarServicePool:
+    """Process-wide pool built from settings.CALENDAR_SERVICE"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = load_config()
+                _pool = CalendarServicePool(config["API_ENDPOINT"], config["TIMEOUT"])
+    return _pool
+
+
+def reset_service_pool():
+    """Drop the process-wide pool so the next call rebuilds it from settings"""
+    global _pool
+    with _pool_lock:
+        _pool = None
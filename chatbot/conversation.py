@@ -0,0 +1,134 @@
+# chatbot/conversation.py
+"""
+Per-user conversation memory for the AI chat.
+
+Every AI turn is stored in ChatHistory through the write-behind buffer
+(chatbot/write_behind.py), so the request never waits on the database write lock.
+
+Follow-up messages ("tell me more", "what about the second one?") are answered
+with the user's recent turns, newest first, within a token budget. Older turns
+that no longer fit verbatim are condensed to a short excerpt.
+A follow-up is either a bare continuation ("more", "why?", "go on") or a short
+message that refers back to something ("is it remote?", "what about those
+roles?"). Anything else is a standalone question, answered without history so
+the reply caches stay valid; so is a follow-up without a turn in the last
+CHAT_HISTORY_MAX_AGE seconds.
+
+Settings:
+    CHAT_HISTORY_TURNS         turns loaded per follow-up (default 6)
+    CHAT_HISTORY_TOKEN_BUDGET  approx. tokens of history sent to Gemini (default 600)
+    CHAT_HISTORY_MAX_AGE       seconds a turn stays usable as context (default 1800)
+"""
+
+import re
+from datetime import timedelta
+from typing import List, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ChatHistory
+from .write_behind import get_write_behind
+
+HISTORY_TURNS = getattr(settings, 'CHAT_HISTORY_TURNS', 6)
+HISTORY_TOKEN_BUDGET = getattr(settings, 'CHAT_HISTORY_TOKEN_BUDGET', 600)
+HISTORY_MAX_AGE = getattr(settings, 'CHAT_HISTORY_MAX_AGE', 30 * 60)
+
+# Longer messages carry their own context even when they use a pronoun
+FOLLOW_UP_MAX_WORDS = 12
+
+# Condensed form of turns that don't fit the budget verbatim
+EXCERPT_WORDS = {"message": 25, "response": 35}
+
+# Words that point back at an earlier turn
+_ANAPHORA = re.compile(
+    r"\b(it|its|they|them|their|those|these|he|she|him|her|that one|this one|the above|"
+    r"previous|earlier|the same|instead|(first|second|third|last|other) one|"
+    r"what about|how about|and then)\b",
+    re.IGNORECASE,
+)
+# Whole messages that only make sense as a continuation
+_CONTINUATION = re.compile(
+    r"(tell me )?more( please)?|why|how|and|go on|continue|elaborate|explain( that| further)?|"
+    r"such as|for example|examples?|again|anything else|what else|really|ok(ay)? and",
+    re.IGNORECASE,
+)
+_TAGS = re.compile(r"<[^>]+>")
+
+Turn = Tuple[str, str]  # (user message, assistant reply)
+
+
+def is_follow_up(message: str) -> bool:
+    """Is the message a bare continuation, or a short one that refers back to an earlier turn?"""
+    stripped = message.strip().rstrip("?!. ")
+    if _CONTINUATION.fullmatch(stripped):
+        return True
+    return len(stripped.split()) <= FOLLOW_UP_MAX_WORDS and bool(_ANAPHORA.search(stripped))
+
+
+def _recent_turns_query(user_id: int, limit: int):
+    # Served by the chat_history_user_recent index
+    return (
+        ChatHistory.objects.filter(user_id=user_id,
+                                   created_at__gte=timezone.now() - timedelta(seconds=HISTORY_MAX_AGE))
+        .order_by("-created_at")
+        .values_list("message", "response")[:limit]
+    )
+
+
+def recent_turns(user_id: int, limit: int = None) -> List[Turn]:
+    """The user's last `limit` turns, oldest first"""
+    turns = list(_recent_turns_query(user_id, limit or HISTORY_TURNS))
+    turns.reverse()
+    return turns
+
+
+async def arecent_turns(user_id: int, limit: int = None) -> List[Turn]:
+    """recent_turns() for async views"""
+    turns = [turn async for turn in _recent_turns_query(user_id, limit or HISTORY_TURNS)]
+    turns.reverse()
+    return turns
+
+
+def _tokens(text: str) -> int:
+    # ~4 characters per token for English text
+    return len(text) // 4 + 1
+
+
+def _excerpt(text: str, words: int) -> str:
+    parts = text.split()
+    return " ".join(parts[:words]) + (" ..." if len(parts) > words else "")
+
+
+def build_history_context(turns: List[Turn], budget: int = None) -> str:
+    """
+    Render turns (oldest first) for the prompt.
+    The newest turns are kept verbatim while they fit `budget`; older ones are
+    condensed to an excerpt, and whatever still doesn't fit is dropped.
+    """
+    budget = budget or HISTORY_TOKEN_BUDGET
+    rendered = []
+    used = 0
+    for message, response in reversed(turns):
+        response = _TAGS.sub("", response)
+        entry = f"User: {message}\nAssistant: {response}"
+        if used + _tokens(entry) > budget:
+            entry = (f"User: {_excerpt(message, EXCERPT_WORDS['message'])}\n"
+                     f"Assistant: {_excerpt(response, EXCERPT_WORDS['response'])}")
+            if used + _tokens(entry) > budget:
+                break
+        rendered.append(entry)
+        used += _tokens(entry)
+
+    rendered.reverse()
+    return "\n\n".join(rendered)
+
+
+def record_turn(user_id: int, message: str, response: str):
+    """Queue a chat turn for saving; waits at most WRITE_BEHIND's BLOCK_TIMEOUT_MS for room"""
+    get_write_behind().add(ChatHistory(user_id=user_id, message=message, response=response))
+
+
+async def arecord_turn(user_id: int, message: str, response: str):
+    """record_turn() for async views: never waits, the turn is dropped if the buffer is full"""
+    get_write_behind().add(ChatHistory(user_id=user_id, message=message, response=response), block=False)
@@ -1,10 +1,10 @@
 # chatbot/emails.py
 from django.core.mail import send_mail
 import logging
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from django.conf import settings
+from .metrics import TimedSMTP
 from .utils import cancel_calendar_event
 import pytz
 UK_TIMEZONE = pytz.timezone('Europe/London')
@@ -145,7 +145,7 @@ def send_via_direct_smtp(subject_attendee, attendee_msg, attendee_email,
         # Create secure connection
         context = ssl.create_default_context()
         
-        with smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT) as server:
+        with TimedSMTP(settings.EMAIL_HOST, settings.EMAIL_PORT) as server:
             server.ehlo()
             server.starttls(context=context)  # Use context parameter only
             server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
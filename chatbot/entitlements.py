@@ -0,0 +1,252 @@
+# chatbot/entitlements.py
+"""
+Who may sign up, and on which plan, by email.
+
+The allow-list lives in CSV files next to manage.py. Instead of re-reading
+them on every signup and login, the "file" backend keeps them in a dict keyed
+by lower-cased email. Before a lookup (at most every CHECK_INTERVAL seconds)
+it stats the files. When a file's mtime or size has changed and its content
+hash differs, the files are parsed again on a background thread while
+lookups keep answering from the previous data (only the first load blocks).
+A file that is missing, unreadable or not valid UTF-8 also keeps the previous
+data in place, and is tried again at the next check. On the very first load
+a missing file counts as empty.
+
+The "db" backend answers from the Entitlement table (unique email index),
+filled by `manage.py import_entitlements`.
+
+File formats (first match per email wins, files in the order listed):
+    email,type      users.csv: an optional header row, type in the "type"
+                    column or else the second column (premium / standard)
+    email           one email per line; every row gets the file's TYPE
+
+Configured through settings.ENTITLEMENTS:
+    BACKEND         "file" or "db"
+    FILES           [{"PATH": ..., "TYPE": None or a type for every row}, ...]
+    CHECK_INTERVAL  seconds between file change checks
+"""
+
+import csv
+import hashlib
+import io
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+DEFAULT_CONFIG = {
+    "BACKEND": "file",
+    "FILES": [{"PATH": settings.BASE_DIR / "users.csv", "TYPE": None}],
+    "CHECK_INTERVAL": 2.0,
+}
+
+Record = Tuple[str, str]  # (email as written in the file, lower-cased type)
+
+
+def parse_entitlements(text: str, default_type: Optional[str] = None) -> Dict[str, Record]:
+    """{lower-cased email: (email, type)} from CSV text; the first row for an email wins"""
+    records = {}
+    reader = csv.reader(io.StringIO(text))
+    type_column = 1
+    for line, row in enumerate(reader):
+        if not row:
+            continue
+        email = row[0].strip()
+        if line == 0 and email.lower() == "email":
+            header = [h.strip().lower() for h in row]
+            if "type" in header:
+                type_column = header.index("type")
+            continue
+        if not email:
+            continue
+        if default_type is not None:
+            kind = default_type
+        else:
+            kind = row[type_column].strip().lower() if len(row) > type_column else ""
+        records.setdefault(email.lower(), (email, kind))
+    return records
+
+
+class FileEntitlementStore:
+    """In-memory index of the entitlement CSV files, reloaded when they change"""
+
+    def __init__(self, files, check_interval: float = 2.0):
+        self.files = [(Path(f["PATH"]), f.get("TYPE")) for f in files]
+        self.check_interval = check_interval
+        self.loads = 0
+        self._records = {}
+        self._signature = None  # (mtime_ns, size) per file
+        self._digest = None
+        self._checked_at = None
+        self._reload_lock = threading.Lock()
+
+    def lookup(self, email: str) -> Optional[dict]:
+        self._maybe_reload()
+        record = self._records.get(email.strip().lower())
+        if record is None:
+            return None
+        return {"email": record[0], "type": record[1]}
+
+    def __len__(self):
+        return len(self._records)
+
+    def types(self) -> Dict[str, str]:
+        """{lower-cased email: type} for every entitlement"""
+        self._maybe_reload()
+        return {key: record[1] for key, record in self._records.items()}
+
+    def _stat(self):
+        signature = []
+        for path, _ in self.files:
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        loaded = self._signature is not None
+        # One thread checks; the rest keep using the current dict (or wait for the very first load)
+        if not self._reload_lock.acquire(blocking=not loaded):
+            return
+        self._checked_at = time.monotonic()
+        signature = self._stat()
+        if signature == self._signature:
+            self._reload_lock.release()
+        elif not loaded:
+            self._load(signature)
+        else:
+            # Requests keep being answered from the old data while a large file is parsed
+            threading.Thread(target=self._load, args=(signature,), name="entitlements-reload", daemon=True).start()
+
+    def _load(self, signature):
+        """Parse the files if their content changed; releases the reload lock"""
+        try:
+            contents = [self._read(path) for path, _ in self.files]
+            if None in contents:
+                if self._digest is not None:
+                    return  # keep the current data; the signature stays old, so the next check retries
+                contents = [content or b"" for content in contents]
+            digest = hashlib.sha256(b"\0".join(contents)).hexdigest()
+            if digest != self._digest:
+                records = {}
+                for (path, default_type), content in zip(self.files, contents):
+                    for key, record in parse_entitlements(content.decode("utf-8-sig"), default_type).items():
+                        records.setdefault(key, record)
+                self._records = records  # swapped in one assignment
+                self._digest = digest
+                self.loads += 1
+                print(f"✅ Entitlements loaded: {len(records)} emails")
+            self._signature = signature
+        except Exception as e:
+            print(f"❌ Error loading entitlements: {e}")
+        finally:
+            self._reload_lock.release()
+
+    def _read(self, path) -> Optional[bytes]:
+        try:
+            return path.read_bytes()
+        except OSError as e:
+            print(f"❌ Error reading {path.name}: {e}")
+            return None
+
+
+class DatabaseEntitlementStore:
+    """Entitlement table lookups (see `manage.py import_entitlements`)"""
+
+    def lookup(self, email: str) -> Optional[dict]:
+        from .models import Entitlement
+
+        row = Entitlement.objects.filter(email=email.strip().lower()).values_list("email", "type").first()
+        if row is None:
+            return None
+        return {"email": row[0], "type": row[1]}
+
+    def types(self) -> Dict[str, str]:
+        from .models import Entitlement
+
+        return dict(Entitlement.objects.values_list("email", "type").iterator(chunk_size=10000))
+
+
+def load_config() -> dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'ENTITLEMENTS', {})}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_entitlement_store():
+    """Process-wide store built from settings.ENTITLEMENTS"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = load_config()
+                if config["BACKEND"] == "db":
+                    _store = DatabaseEntitlementStore()
+                else:
+                    _store = FileEntitlementStore(config["FILES"], config["CHECK_INTERVAL"])
+    return _store
+
+
+def get_entitlement(email: str) -> Optional[dict]:
+    """{"email": ..., "type": ...} for an allowed email, else None"""
+    if not email:
+        return None
+    return get_entitlement_store().lookup(email)
+
+
+def is_premium_type(entitlement_type: Optional[str]) -> bool:
+    return entitlement_type == "premium"
+
+
+def sync_premium_status(batch_size: int = 2000, dry_run: bool = False, store=None) -> dict:
+    """
+    Bring UserProfile.is_premium in line with the entitlement source, in bulk.
+    Users without a profile get one. Returns counts per outcome.
+    """
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from django.utils import timezone
+
+    from .models import UserProfile
+
+    types = (store if store is not None else get_entitlement_store()).types()
+    counts = {"checked": 0, "promoted": 0, "demoted": 0, "unchanged": 0, "created": 0}
+    changed = {True: [], False: []}  # new is_premium -> profile ids
+    for profile_id, email, is_premium in (
+        UserProfile.objects.values_list("id", "user__email", "is_premium").iterator(chunk_size=10000)
+    ):
+        counts["checked"] += 1
+        premium = is_premium_type(types.get((email or "").strip().lower()))
+        if premium == is_premium:
+            counts["unchanged"] += 1
+            continue
+        counts["promoted" if premium else "demoted"] += 1
+        changed[premium].append(profile_id)
+
+    missing = [
+        UserProfile(user_id=user_id, is_premium=is_premium_type(types.get((email or "").strip().lower())))
+        for user_id, email in User.objects.filter(userprofile__isnull=True).values_list("id", "email")
+    ]
+    counts["created"] = len(missing)
+
+    if not dry_run:
+        # One UPDATE ... WHERE id IN (...) per chunk and direction; cheaper than bulk_update's CASE on SQLite
+        now = timezone.now()
+        for premium, ids in changed.items():
+            for start in range(0, len(ids), batch_size):
+                with transaction.atomic():
+                    UserProfile.objects.filter(id__in=ids[start:start + batch_size]).update(
+                        is_premium=premium, updated_at=now
+                    )
+        UserProfile.objects.bulk_create(missing, batch_size=batch_size)
+    return counts
@@ -0,0 +1,350 @@
+# chatbot/fake_calendar.py
+"""
+In-process stand-in for the Google Calendar API and Google's OAuth token
+endpoint, for the bench_* commands and tests. Not used on the request path.
+
+FakeCalendarServer speaks just enough of Calendar v3 for calendar_client:
+events list / get / insert / patch / delete, freeBusy and calendarList.get,
+with HTTP/1.1 keep-alive so connection reuse is visible, an optional
+per-request latency, and per-path request counters. API calls without a
+Bearer token are rejected with 401, so clients have to go through the token
+endpoint like they do against Google.
+
+events.list follows Google's incremental sync rules: results are paged
+(maxResults / pageToken), the last page carries a nextSyncToken, and a list
+with syncToken returns only events changed since, deleted ones as
+status "cancelled" tombstones. updatedMin, showDeleted and q work too.
+expire_sync_tokens() makes every token handed out so far fail with 410, as
+Google does when a token gets too old.
+
+calendar_latency[calendar_id] adds a delay to requests for one calendar, and
+calendars in failing get 503, to stand in for a slow or broken calendar.
+
+    with FakeCalendarServer(latency=0.02) as server:
+        key_file = server.write_service_account(path)   # credentials whose token_uri is the fake
+        event = server.add_event("mentor@example.com", start, end)
+        server.update_event("mentor@example.com", event["id"], summary="Moved")
+        server.delete_event("mentor@example.com", event["id"])
+        with server.patch_calendar_client(key_file):    # calendar_client now talks to the fake
+            get_next_available_slots_for_user(...)
+"""
+
+import itertools
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, unquote, urlsplit
+
+API_PREFIX = "/calendar/v3/"
+PAGE_SIZE = 250  # Google's default maxResults
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _event_time(event: dict, key: str) -> datetime:
+    """Start or end of an event; all-day events ("date") count from UTC midnight"""
+    value = event.get(key, {})
+    if "dateTime" in value:
+        return _parse_time(value["dateTime"])
+    return datetime.fromisoformat(value["date"]).replace(tzinfo=timezone.utc)
+
+
+def _error(code: int, message: str, reason: str = None):
+    error = {"code": code, "message": message}
+    if reason:
+        error["errors"] = [{"reason": reason, "message": message}]
+    return code, {"error": error}
+
+
+class FakeCalendarServer:
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1"):
+        self.latency = latency
+        self.calendars = {}  # calendar id -> {event id: event}; deleted events stay as "cancelled"
+        self.requests = Counter()  # "POST token", "GET events", "DELETE event", "POST freeBusy", ...
+        self.connections = 0  # TCP connections accepted
+        self.calendar_latency = {}  # calendar id -> extra seconds per request touching it
+        self.failing = set()  # calendar ids answered with 503
+        self.missing = set()  # calendar ids freeBusy reports as notFound (deleted, never shared)
+        self._ids = itertools.count(1)
+        self._version = 0  # bumped on every event change; sync tokens are versions
+        self._versions = {}  # (calendar id, event id) -> version of its last change
+        self._oldest_sync_token = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, 0), _handler_for(self))
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_endpoint(self) -> str:
+        return self.url + API_PREFIX
+
+    @property
+    def token_uri(self) -> str:
+        return self.url + "/token"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-calendar", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def write_service_account(self, path) -> str:
+        """Write a service-account JSON (fresh RSA key) that gets its tokens from this server"""
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption()).decode()
+        with open(path, "w") as f:
+            json.dump({
+                "type": "service_account",
+                "project_id": "fake",
+                "private_key_id": "fake",
+                "private_key": pem,
+                "client_email": "bench@fake.iam.gserviceaccount.com",
+                "client_id": "1",
+                "token_uri": self.token_uri,
+            }, f)
+        return str(path)
+
+    @contextmanager
+    def patch_calendar_client(self, key_file: str):
+        """
+        Route calendar_client.get_calendar_service() here, through a CalendarServicePool
+        using key_file. Every mentor email is its own calendar; None is the default one.
+        """
+        from . import calendar_client
+        from .calendar_pool import CalendarServicePool
+
+        pool = CalendarServicePool(api_endpoint=self.api_endpoint)
+
+        def get_calendar_service(mentor_email: str = None):
+            calendar_id = mentor_email or calendar_client.DEFAULT_MENTOR_CONFIG["calendar_id"]
+            config = {**calendar_client.DEFAULT_MENTOR_CONFIG, "email": calendar_id, "calendar_id": calendar_id,
+                      "credentials_file": key_file}
+            return pool.service(key_file, calendar_id), config
+
+        with mock.patch.object(calendar_client, "get_calendar_service", get_calendar_service):
+            yield pool
+
+    def add_event(self, calendar_id: str, start: datetime, end: datetime, **fields) -> dict:
+        event = {
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": end.isoformat()},
+            "status": "confirmed",
+            **fields,
+        }
+        return self._insert(calendar_id, event)
+
+    def update_event(self, calendar_id: str, event_id: str, **fields) -> dict:
+        with self._lock:
+            event = {**self.calendars[calendar_id][event_id], **fields}
+            return self._store(calendar_id, event)
+
+    def delete_event(self, calendar_id: str, event_id: str) -> bool:
+        """Leave a "cancelled" tombstone, like Google; False if there was no live event"""
+        with self._lock:
+            event = self.calendars.get(calendar_id, {}).get(event_id)
+            if event is None or event.get("status") == "cancelled":
+                return False
+            self._store(calendar_id, {**event, "status": "cancelled"})
+            return True
+
+    def expire_sync_tokens(self):
+        """Every sync token handed out so far now gets 410 fullSyncRequired"""
+        with self._lock:
+            self._oldest_sync_token = self._version + 1
+
+    def _insert(self, calendar_id: str, event: dict) -> dict:
+        with self._lock:
+            return self._store(calendar_id, {**event, "id": event.get("id") or f"evt{next(self._ids)}"})
+
+    def _store(self, calendar_id: str, event: dict) -> dict:
+        """Save a new version of the event; caller holds the lock"""
+        self._version += 1
+        event = {**event, "updated": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")}
+        self.calendars.setdefault(calendar_id, {})[event["id"]] = event
+        self._versions[calendar_id, event["id"]] = self._version
+        return event
+
+    def _events_between(self, calendar_id: str, time_min, time_max, show_deleted: bool = False) -> list:
+        with self._lock:
+            events = list(self.calendars.get(calendar_id, {}).values())
+        low = _parse_time(time_min) if time_min else None
+        high = _parse_time(time_max) if time_max else None
+        selected = []
+        for event in events:
+            if event.get("status") == "cancelled" and not show_deleted:
+                continue
+            start, end = _event_time(event, "start"), _event_time(event, "end")
+            if (high is None or start < high) and (low is None or end > low):
+                selected.append((start, event))
+        return [event for _, event in sorted(selected, key=lambda pair: pair[0])]
+
+    def _list_events(self, calendar_id: str, query: dict):
+        """events.list: a time range or a sync token, then updatedMin / q filters, then one page"""
+        offset, version = 0, None
+        if query.get("pageToken"):
+            offset, version = (int(part) for part in query["pageToken"].split(":"))
+        with self._lock:
+            version = self._version if version is None else version  # the token the last page will hand out
+            oldest = self._oldest_sync_token
+
+        if "syncToken" in query:
+            if any(key in query for key in ("timeMin", "timeMax", "updatedMin", "q", "orderBy")):
+                return _error(400, "syncToken cannot be combined with these filters", "invalid")
+            since = int(query["syncToken"].split("-")[-1])
+            if since < oldest:
+                return _error(410, "Sync token is no longer valid, a full sync is required.", "fullSyncRequired")
+            with self._lock:
+                items = [event for (cal, event_id), changed in sorted(self._versions.items(), key=lambda kv: kv[1])
+                         if cal == calendar_id and since < changed <= version
+                         for event in [self.calendars[cal][event_id]]]
+        else:
+            updated_min = _parse_time(query["updatedMin"]) if query.get("updatedMin") else None
+            # with updatedMin, Google includes deletions whatever showDeleted says
+            show_deleted = query.get("showDeleted") == "true" or updated_min is not None
+            items = self._events_between(calendar_id, query.get("timeMin"), query.get("timeMax"), show_deleted)
+            if updated_min is not None:
+                items = [event for event in items if _parse_time(event["updated"]) >= updated_min]
+            if query.get("q"):
+                needle = query["q"].lower()
+                items = [event for event in items if needle in json.dumps(event).lower()]
+
+        size = int(query.get("maxResults") or PAGE_SIZE)
+        response = {"kind": "calendar#events", "items": items[offset:offset + size]}
+        if offset + size < len(items):
+            response["nextPageToken"] = f"{offset + size}:{version}"
+        else:
+            response["nextSyncToken"] = f"sync-{version}"
+        return 200, response
+
+    # Request handling; each returns (status, body or None)
+
+    def handle(self, method: str, path: str, query: dict, body: dict):
+        if path == "/token":
+            return 200, {"access_token": f"fake-token-{next(self._ids)}", "expires_in": 3600, "token_type": "Bearer"}
+        if not path.startswith(API_PREFIX):
+            return _error(404, "Not Found")
+        parts = [unquote(p) for p in path[len(API_PREFIX):].split("/") if p]
+
+        calendar_ids = [item.get("id") for item in body.get("items", [])] if parts == ["freeBusy"] else parts[1:2]
+        time.sleep(max([self.calendar_latency.get(c, 0) for c in calendar_ids], default=0))
+        if self.failing.intersection(calendar_ids):
+            return _error(503, "Backend Error", "backendError")
+
+        if parts == ["freeBusy"] and method == "POST":
+            return 200, self._free_busy(body)
+        if parts[:3] == ["users", "me", "calendarList"] and len(parts) == 4:
+            return 200, {"id": parts[3], "accessRole": "owner"}
+        if len(parts) >= 3 and parts[0] == "calendars" and parts[2] == "events":
+            calendar_id = parts[1]
+            if len(parts) == 3 and method == "GET":
+                return self._list_events(calendar_id, query)
+            if len(parts) == 3 and method == "POST":
+                return 200, self._insert(calendar_id, body)
+            if len(parts) == 4:
+                with self._lock:
+                    event = self.calendars.get(calendar_id, {}).get(parts[3])
+                    if event is None:
+                        return _error(404, "Not Found")
+                    if method == "GET":
+                        return 200, event
+                    if event.get("status") == "cancelled":
+                        return _error(410, "Resource has been deleted", "deleted")
+                    if method == "DELETE":
+                        self._store(calendar_id, {**event, "status": "cancelled"})
+                        return 204, None
+                    if method in ("PATCH", "PUT"):
+                        base = event if method == "PATCH" else {"id": event["id"]}
+                        return 200, self._store(calendar_id, {**base, **body, "id": event["id"]})
+        return _error(404, "Not Found")
+
+    def _free_busy(self, body: dict) -> dict:
+        calendars = {}
+        for item in body.get("items", []):
+            if item["id"] in self.missing:
+                calendars[item["id"]] = {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+                continue
+            busy = [{"start": e["start"]["dateTime"], "end": e["end"]["dateTime"]}
+                    for e in self._events_between(item["id"], body.get("timeMin"), body.get("timeMax"))
+                    if e.get("transparency") != "transparent"]
+            calendars[item["id"]] = {"busy": busy}
+        return {"kind": "calendar#freeBusy", "timeMin": body.get("timeMin"), "timeMax": body.get("timeMax"),
+                "calendars": calendars}
+
+
+def _kind(path: str) -> str:
+    if path == "/token":
+        return "token"
+    parts = [p for p in path[len(API_PREFIX):].split("/") if p]
+    if parts[:1] == ["calendars"] and len(parts) >= 3:
+        return "events" if len(parts) == 3 else "event"
+    if parts[:3] == ["users", "me", "calendarList"]:
+        return "calendarList"
+    return parts[0] if parts else "other"
+
+
+def _handler_for(server: FakeCalendarServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like Google's front end
+        disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+        def setup(self):
+            super().setup()
+            with server._lock:
+                server.connections += 1
+
+        def _serve(self):
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            server.requests[f"{self.command} {_kind(url.path)}"] += 1
+            if server.latency:
+                time.sleep(server.latency)
+
+            if url.path != "/token" and not (self.headers.get("Authorization") or "").startswith("Bearer "):
+                status, body = _error(401, "Login Required")
+            else:
+                try:
+                    payload = json.loads(raw) if raw and url.path != "/token" else {}
+                except ValueError:
+                    payload = {}
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                status, body = server.handle(self.command, url.path, query, payload)
+
+            data = json.dumps(body).encode() if body is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_DELETE = do_PATCH = do_PUT = _serve
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
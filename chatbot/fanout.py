@@ -0,0 +1,238 @@
+# chatbot/fanout.py
+"""
+Run independent external calls (one per mentor calendar, say) side by side,
+so a lookup takes about as long as its slowest call instead of the sum.
+
+Fanout.run({key: fn, ...}) starts every call on a shared thread pool and
+waits at most DEADLINE seconds overall, and CALL_TIMEOUT seconds for any one
+call once it has started. Whatever finished by then comes back in a
+FanoutResult next to the keys that failed, timed out or were skipped; callers
+decide whether a partial answer is good enough. Python can't stop a thread,
+so a call that overran keeps its worker until the client's own socket
+timeout (CALENDAR_SERVICE["TIMEOUT"]) ends it; its result is dropped.
+
+A CircuitBreaker per key stops calling a calendar that failed or timed out
+BREAKER_FAILURES times in a row. After BREAKER_COOLDOWN seconds one trial call
+goes through; success closes the breaker, failure opens it again.
+
+Calls run with a copy of the caller's context, so their time still counts
+towards the request in metrics.py. They run on pool threads, so they
+should get their Calendar client there (get_calendar_service() is per
+thread) and stay off the database.
+
+Configured through settings.CALENDAR_FANOUT:
+    MAX_WORKERS       pool threads shared by all fan-outs in the process
+    CALL_TIMEOUT      seconds one call may run
+    DEADLINE          seconds a whole fan-out may take
+    BREAKER_FAILURES  consecutive failures that open a key's breaker
+    BREAKER_COOLDOWN  seconds an open breaker waits before a trial call
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from django.conf import settings
+
+DEFAULT_CONFIG = {
+    "MAX_WORKERS": 8,
+    "CALL_TIMEOUT": 10.0,
+    "DEADLINE": 15.0,
+    "BREAKER_FAILURES": 3,
+    "BREAKER_COOLDOWN": 60.0,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def load_config() -> dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'CALENDAR_FANOUT', {})}
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker per key: closed -> open -> one trial call (half-open) -> closed"""
+
+    def __init__(self, failures: int = 3, cooldown: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.clock = clock
+        self._failures: Dict[Hashable, int] = {}
+        self._opened_at: Dict[Hashable, float] = {}
+        self._trial: set = set()  # keys with a trial call in flight
+        self._lock = threading.Lock()
+
+    def allow(self, key: Hashable) -> bool:
+        with self._lock:
+            opened_at = self._opened_at.get(key)
+            if opened_at is None:
+                return True
+            if key in self._trial or self.clock() - opened_at < self.cooldown:
+                return False
+            self._trial.add(key)
+            return True
+
+    def is_open(self, key: Hashable) -> bool:
+        return key in self._opened_at
+
+    def success(self, key: Hashable):
+        with self._lock:
+            self._failures.pop(key, None)
+            self._opened_at.pop(key, None)
+            self._trial.discard(key)
+
+    def failure(self, key: Hashable):
+        with self._lock:
+            count = self._failures.get(key, 0) + 1
+            self._failures[key] = count
+            if key in self._trial or count >= self.failures:  # a failed trial re-opens at once
+                if key not in self._opened_at:
+                    logger.warning("⚡ Circuit open for %s after %d failures", key, count,
+                                   extra={"key": str(key), "failures": count})
+                self._opened_at[key] = self.clock()
+            self._trial.discard(key)
+
+    def release(self, key: Hashable):
+        """The trial call handed out by allow() never ran; let the next allow() hand out another"""
+        with self._lock:
+            self._trial.discard(key)
+
+    def reset(self):
+        with self._lock:
+            self._failures.clear()
+            self._opened_at.clear()
+            self._trial.clear()
+
+
+@dataclass
+class FanoutResult:
+    results: Dict[Hashable, Any] = field(default_factory=dict)
+    errors: Dict[Hashable, BaseException] = field(default_factory=dict)
+    timed_out: List[Hashable] = field(default_factory=list)
+    skipped: List[Hashable] = field(default_factory=list)  # breaker open, never called
+    elapsed: float = 0.0
+
+    @property
+    def missing(self) -> List[Hashable]:
+        """Keys without a result, for whatever reason"""
+        return [*self.errors, *self.timed_out, *self.skipped]
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+
+class FanoutError(Exception):
+    """Raised by callers that can't use a partial FanoutResult"""
+
+    def __init__(self, result: FanoutResult):
+        reasons = [f"{key}: {error!r}" for key, error in result.errors.items()]
+        reasons += [f"{key}: timed out" for key in result.timed_out]
+        reasons += [f"{key}: circuit open" for key in result.skipped]
+        super().__init__("; ".join(reasons))
+        self.result = result
+
+
+class Fanout:
+    def __init__(self, max_workers: int = 8, call_timeout: float = 10.0, deadline: float = 15.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fanout")
+
+    def run(self, calls: Dict[Hashable, Callable[[], Any]], call_timeout: float = None,
+            deadline: float = None, is_failure: Callable[[BaseException], bool] = None) -> FanoutResult:
+        """
+        Call every fn at once; return what finished within the timeouts (see module docstring).
+        Errors for which is_failure() is False (the service answered, the request was wrong)
+        are reported in the result but don't count against the key's breaker.
+        """
+        call_timeout = self.call_timeout if call_timeout is None else call_timeout
+        begin = time.monotonic()
+        deadline_at = begin + (self.deadline if deadline is None else deadline)
+        result = FanoutResult()
+        started: Dict[Hashable, float] = {}
+
+        def invoke(key, fn):
+            started[key] = time.monotonic()
+            return fn()
+
+        futures = {}
+        for key, fn in calls.items():
+            if not self.breaker.allow(key):
+                result.skipped.append(key)
+                continue
+            context = contextvars.copy_context()
+            futures[self._executor.submit(context.run, invoke, key, fn)] = key
+
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            for future in list(pending):
+                key = futures[future]
+                overran = key in started and now - started[key] >= call_timeout
+                if overran or now >= deadline_at:
+                    pending.discard(future)
+                    result.timed_out.append(key)
+                    if future.cancel():  # still queued behind others: not the calendar's fault
+                        self.breaker.release(key)
+                    else:
+                        self.breaker.failure(key)
+            if not pending:
+                break
+            expiries = [started[futures[f]] + call_timeout for f in pending if futures[f] in started]
+            timeout = max(min(expiries + [deadline_at]) - now, 0)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures[future]
+                try:
+                    result.results[key] = future.result()
+                except Exception as e:
+                    result.errors[key] = e
+                    if is_failure is None or is_failure(e):
+                        self.breaker.failure(key)
+                    else:
+                        self.breaker.success(key)
+                else:
+                    self.breaker.success(key)
+
+        result.elapsed = time.monotonic() - begin
+        if result.timed_out or result.skipped:
+            logger.warning("⏱️ Fan-out finished without %d of %d calls", len(result.missing), len(calls),
+                           extra={"timed_out": [str(k) for k in result.timed_out],
+                                  "skipped": [str(k) for k in result.skipped], "elapsed": result.elapsed})
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_fanout = None
+_fanout_lock = threading.Lock()
+
+
+def get_fanout() -> Fanout:
+    """Process-wide Fanout built from settings.CALENDAR_FANOUT"""
+    global _fanout
+    if _fanout is None:
+        with _fanout_lock:
+            if _fanout is None:
+                config = load_config()
+                _fanout = Fanout(
+                    config["MAX_WORKERS"], config["CALL_TIMEOUT"], config["DEADLINE"],
+                    CircuitBreaker(config["BREAKER_FAILURES"], config["BREAKER_COOLDOWN"]),
+                )
+    return _fanout
+
+
+def reset_fanout():
+    """Drop the process-wide Fanout (and its breakers) so the next call rebuilds it from settings"""
+    global _fanout
+    with _fanout_lock:
+        if _fanout is not None:
+            _fanout.shutdown()
+        _fanout = None
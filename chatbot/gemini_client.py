@@ -1,79 +1,224 @@
 # chatbot/gemini_client.py
-import google.generativeai as genai
+import asyncio
 import os
+import threading
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader
 from django.conf import settings
+from .conversation import build_history_context
+from .knowledge_base import UNAVAILABLE_TEXT, load_knowledge_base
+from .metrics import track_external
+from .retrieval import BM25Index, merge_spans
 
 load_dotenv()
 
 # ✅ Fix: Use environment variable name, not the actual key
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") or getattr(settings, 'GEMINI_API_KEY', None)
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
-    print("ERROR: GEMINI_API_KEY not found in environment or settings!")
-
-# --- Load PDF instructions once ---
-PDF_PATH = os.path.join(os.path.dirname(__file__), "..", "ukjobs10.pdf")  # Better path handling
-
-def load_pdf_text(pdf_path):
-    try:
-        if not os.path.exists(pdf_path):
-            print(f"Warning: PDF not found at {pdf_path}")
-            return "UKJobsInsider training data not available."
-        
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        print(f"Error loading PDF: {str(e)}")
-        return "UKJobsInsider training data not available."
-
-# Load instructions on import
-INSTRUCTION_TEXT = load_pdf_text(PDF_PATH)
-
-def ask_gemini(user_message: str, is_premium: bool = False):
-    """Send user query + system instructions to Gemini"""
-    try:
-        if not GEMINI_API_KEY:
-            return "AI service is currently unavailable. Please contact support."
-        
-        model = genai.GenerativeModel("gemini-2.5-flash-lite")
-
-        # Free vs Premium rules
-        if is_premium:
-            role_instruction = "You are UKJobsInsider Premium Assistant. You have access to all features including session booking, detailed CV optimization, and comprehensive career guidance. Provide detailed, helpful responses."
-        else:
-            role_instruction = "You are UKJobsInsider Free Assistant. Provide helpful but concise responses (limit to 150 words). Do NOT allow session booking - suggest upgrading to Premium for 1-on-1 sessions."
-
-        prompt = f"""
+# Number of training-data chunks sent with each query (see chatbot/retrieval.py)
+RETRIEVAL_TOP_K = getattr(settings, 'GEMINI_RETRIEVAL_TOP_K', 3)
+
+GEMINI_MODEL = "gemini-2.5-flash-lite"
+
+# Seconds before an async Gemini call is abandoned
+GEMINI_TIMEOUT = getattr(settings, 'GEMINI_TIMEOUT', 30)
+
+# Fallback replies - never cached
+UNAVAILABLE_REPLY = "AI service is currently unavailable. Please contact support."
+ERROR_REPLY = "I'm experiencing technical difficulties. Please try again in a moment."
+FALLBACK_REPLIES = frozenset({UNAVAILABLE_REPLY, ERROR_REPLY})
+
+# Initialise on import instead of on first use (old behaviour; gunicorn.conf.py warms workers instead)
+GEMINI_EAGER_INIT = getattr(settings, 'GEMINI_EAGER_INIT', os.getenv("GEMINI_EAGER_INIT") == "1")
+
+# --- Lazy, once-per-process initialisation ---
+# Importing this module is cheap: the SDK import, genai.configure() and the
+# corpus/index load only happen on first use or when warm_up() is called.
+# The corpus is fork-safe (read-only mmap + plain dicts), so it may be built in a
+# preloading master; the SDK is configured per process because its gRPC
+# channels must not cross a fork.
+_init_lock = threading.Lock()
+_corpus = None          # (KnowledgeBase, BM25Index)
+_genai = None           # configured google.generativeai module
+_genai_pid = None
+_models = {}            # is_premium -> GenerativeModel (see get_model)
+_models_key = None      # (pid, id(genai)) the cached models belong to
+
+def get_corpus():
+    """Knowledge base and its BM25 index, loaded once"""
+    global _corpus
+    if _corpus is None:
+        with _init_lock:
+            if _corpus is None:
+                knowledge_base = load_knowledge_base()
+                _corpus = (knowledge_base, BM25Index(knowledge_base.iter_chunks()))
+    return _corpus
+
+def get_genai():
+    """google.generativeai configured for this process, or None without an API key"""
+    global _genai, _genai_pid
+    if _genai_pid != os.getpid():
+        with _init_lock:
+            if _genai_pid != os.getpid():
+                import google.generativeai as genai
+
+                if GEMINI_API_KEY:
+                    genai.configure(api_key=GEMINI_API_KEY)
+                    _genai = genai
+                else:
+                    print("ERROR: GEMINI_API_KEY not found in environment or settings!")
+                    _genai = None
+                _genai_pid = os.getpid()
+    return _genai
+
+def warm_corpus():
+    """Load the training corpus now (safe to call in a preloading parent before fork)"""
+    get_corpus()
+
+def warm_up():
+    """Fully initialise this process: corpus, index, Gemini SDK and per-tier models"""
+    get_corpus()
+    get_model(False)
+    get_model(True)
+
+def corpus_hash() -> str:
+    """Content hash of the training corpus (part of every response-cache key)"""
+    return get_corpus()[0].content_hash
+
+def get_relevant_context(user_message: str, top_k: int = None) -> str:
+    """Return only the training-data passages relevant to the user's message"""
+    knowledge_base, index = get_corpus()
+    if not len(index):
+        return UNAVAILABLE_TEXT
+    indices = index.top_indices(user_message, top_k or RETRIEVAL_TOP_K)
+    spans = merge_spans([knowledge_base.chunk_offsets[idx] for idx in indices])
+    return "\n...\n".join(knowledge_base.text(start, end) for start, end in spans)
+
+ROLE_INSTRUCTIONS = {
+    True: "You are UKJobsInsider Premium Assistant. You have access to all features including session booking, detailed CV optimization, and comprehensive career guidance. Provide detailed, helpful responses.",
+    False: "You are UKJobsInsider Free Assistant. Provide helpful but concise responses (limit to 150 words). Do NOT allow session booking - suggest upgrading to Premium for 1-on-1 sessions.",
+}
+
+def build_system_instruction(is_premium: bool) -> str:
+    """Static per-tier instructions, sent as the model's system instruction"""
+    return f"""
 You are the official UKJobsInsider chatbot assistant helping users with UK job search.
 
-TRAINING DATA & INSTRUCTIONS:
-{INSTRUCTION_TEXT}
-
 USER TYPE: {"Premium ✨" if is_premium else "Free"}
-ROLE: {role_instruction}
+ROLE: {ROLE_INSTRUCTIONS[is_premium]}
 
 IMPORTANT RULES:
-1. Answer based on the UKJobsInsider training data above
+1. Answer based on the UKJobsInsider training data provided with the query
 2. Be helpful and professional 
 3. For resources/PDFs, say "I can help you with that! The resource is available in your dashboard."
 4. For Premium users: Allow all features including session booking
 5. For Free users: Limit response length and suggest Premium for advanced features
 6. Never mention technical limitations or say "I cannot access PDFs"
+"""
+
+SYSTEM_INSTRUCTIONS = {tier: build_system_instruction(tier) for tier in (False, True)}
 
-USER QUERY: {user_message}
+def build_request(user_message: str, training_data: str, history: str = "") -> str:
+    """Per-query content: the retrieved training passages, earlier turns if any, and the user's message"""
+    conversation = f"CONVERSATION SO FAR:\n{history}\n\n" if history else ""
+    return f"""TRAINING DATA & INSTRUCTIONS:
+{training_data}
+
+{conversation}USER QUERY: {user_message}
 
 RESPONSE:"""
 
-        response = model.generate_content(prompt)
+def build_query_content(user_message: str, history=None) -> str:
+    """
+    Request content for a query. `history` is a list of earlier (message, reply)
+    turns, oldest first; for follow-ups, retrieval also uses the previous question.
+    """
+    if not history:
+        return build_request(user_message, get_relevant_context(user_message))
+    retrieval_query = f"{history[-1][0]} {user_message}"
+    return build_request(user_message, get_relevant_context(retrieval_query), build_history_context(history))
+
+def build_prompt(user_message: str, is_premium: bool, training_data: str) -> str:
+    """Everything the model reads for one query, as a single string (for size estimates)"""
+    return SYSTEM_INSTRUCTIONS[is_premium] + "\n" + build_request(user_message, training_data)
+
+def get_model(is_premium: bool):
+    """
+    Long-lived GenerativeModel for a tier, with its instructions as system_instruction.
+    Rebuilt after a fork or SDK re-configuration; None without an API key.
+    """
+    global _models_key
+    is_premium = bool(is_premium)
+    genai = get_genai()
+    if genai is None:
+        return None
+    key = (os.getpid(), id(genai))
+    if _models_key != key:
+        with _init_lock:
+            if _models_key != key:
+                _models.clear()
+                _models_key = key
+    model = _models.get(is_premium)
+    if model is None:
+        model = genai.GenerativeModel(GEMINI_MODEL, system_instruction=SYSTEM_INSTRUCTIONS[is_premium])
+        _models[is_premium] = model
+    return model
+
+def ask_gemini(user_message: str, is_premium: bool = False, history=None):
+    """Send user query + relevant training data (+ earlier turns) to Gemini"""
+    try:
+        model = get_model(is_premium)
+        if model is None:
+            return UNAVAILABLE_REPLY
+
+        with track_external("gemini"):
+            response = model.generate_content(build_query_content(user_message, history))
         return response.text.strip()
 
     except Exception as e:
         print(f"Gemini API Error: {str(e)}")
-        return "I'm experiencing technical difficulties. Please try again in a moment."
\ No newline at end of file
+        return ERROR_REPLY
+
+async def ask_gemini_async(user_message: str, is_premium: bool = False, history=None, timeout: float = None):
+    """ask_gemini() for async views: awaits the SDK's async call instead of blocking a thread"""
+    try:
+        model = get_model(is_premium)
+        if model is None:
+            return UNAVAILABLE_REPLY
+
+        with track_external("gemini"):
+            response = await asyncio.wait_for(
+                model.generate_content_async(build_query_content(user_message, history)),
+                timeout or GEMINI_TIMEOUT,
+            )
+        return response.text.strip()
+
+    except asyncio.TimeoutError:
+        print(f"Gemini API Error: no response within {timeout or GEMINI_TIMEOUT}s")
+        return ERROR_REPLY
+    except Exception as e:
+        print(f"Gemini API Error: {str(e)}")
+        return ERROR_REPLY
+
+def ask_gemini_stream(user_message: str, is_premium: bool = False, history=None):
+    """
+    Like ask_gemini(), but yields the raw reply text piece by piece as Gemini generates it.
+    On failure the fallback reply is yielded instead (after any text already sent).
+    """
+    try:
+        model = get_model(is_premium)
+        if model is None:
+            yield UNAVAILABLE_REPLY
+            return
+
+        # Timed until the last chunk; includes time the consumer spends between chunks
+        with track_external("gemini"):
+            for chunk in model.generate_content(build_query_content(user_message, history), stream=True):
+                if chunk.text:
+                    yield chunk.text
+
+    except Exception as e:
+        print(f"Gemini API Error (stream): {str(e)}")
+        yield ERROR_REPLY
+
+if GEMINI_EAGER_INIT:
+    warm_up()
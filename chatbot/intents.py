@@ -0,0 +1,168 @@
+# chatbot/intents.py
+"""
+Intent detection for chat messages, compiled once at import.
+
+classify() lowercases the message once and returns meeting intent, cancel
+intent, mentor domain and requested duration together: one combined regex for
+the meeting phrases, one for durations, and keyword tables pruned of redundant
+entries for cancel and domain detection. It gives the same answers as the
+original checks (utils.is_meeting_request, views.is_cancel_request,
+views.detect_domain_from_message, utils.extract_duration), which are now thin
+wrappers around it. The golden corpus in chatbot/tests.py pins that behaviour;
+`manage.py bench_intents` measures throughput.
+"""
+
+import re
+from dataclasses import dataclass
+
+MEETING_PATTERNS = [
+    # --- Generic booking phrases ---
+    r"\bbook( a)? (call|meeting|session|mentor|mentorship|chat)\b",
+    r"\bschedule( a)? (call|meeting|session|mentor|mentorship|chat)\b",
+    r"\b(reserve|arrange|setup|set up|fix|plan)( a)? (call|meeting|session|chat)\b",
+
+    # --- Mentorship-specific ---
+    r"\bbook( a)? mentor\b",
+    r"\bbook( a)? mentorship (call|session|meeting)?\b",
+    r"\bschedule( a)? mentorship (call|session|meeting)?\b",
+    r"\bconnect with (a )?mentor\b",
+    r"\btalk to (a )?mentor\b",
+    r"\bneed (a )?mentor\b",
+    r"\bwant (a )?mentor\b",
+
+    # --- 1-on-1 / 1:1 variants ---
+    r"\b1[\s:\-]?[oO]n[\s:\-]?1\b",         # 1on1 / 1:1 / 1-on-1
+    r"\bone[\s\-]?on[\s\-]?one\b",           # one on one
+    r"\bone to one\b",
+    r"\b1[\s:\-]?1[\s:\-]?\b",               # "1 1" or "1-1" or "1:1"
+    r"\bbook 1[\s:\-]?[1lI]\b",              # handles "book 1:11" typo too
+
+    # --- Common phrasing ---
+    r"\bmentor(ship)? (session|call|meeting|chat)\b",
+    r"\bjoin (a )?(mentor|mentorship) (session|call)\b",
+    r"\bget (a )?(mentor|guidance|session)\b",
+    r"\bstart (a )?1[\s:\-]?1\b",
+    r"\bhelp me (book|schedule) (a )?(mentor|call|session)\b"
+]
+
+CANCEL_KEYWORDS = [
+    'cancel', 'cancel my', 'cancel session', 'cancel call', 'cancel meeting',
+    'cancel appointment', 'cancel booking', 'dont want', 'don\'t want',
+    'remove session', 'delete session', 'cancel last session',
+    'cancel my session', 'cancel my last session', 'reschedule', 'reschedule my session',
+    'reschedule last session', 'reschedule my last session', 'reschedule the call', 'reschedule the session',
+]
+
+# Domain mappings for mentors - Based on your actual mentor expertise
+# Seed of the Domain table (chatbot/taxonomy.py), which the views use. Order matters: the first domain with a matching keyword wins ('recruitment' is design, via 'ui')
+DOMAIN_KEYWORDS = {
+    'marketing': ['marketing', 'digital marketing', 'seo', 'social media', 'content', 'campaigns', 'ads', 'promotion'],
+    'cv': ['cv', 'resume', 'curriculum vitae', 'profile', 'career document', 'job application'],
+    'linkedin': ['linkedin', 'professional network', 'social networking', 'profile optimization', 'connections'],
+    'testing': ['test', 'qa', 'quality assurance', 'automation', 'selenium', 'cypress'],
+    'data': ['data', 'analytics', 'data science', 'machine learning', 'statistics', 'python', 'sql'],
+    'development': ['developer', 'programming', 'coding', 'software', 'web development', 'frontend', 'backend'],
+    'design': ['design', 'ui', 'ux', 'graphic', 'visual', 'creative', 'figma', 'photoshop'],
+    'finance': ['finance', 'accounting', 'investment', 'banking', 'financial analysis'],
+    'hr': ['hr', 'human resources', 'recruitment', 'talent', 'people management']
+}
+
+DEFAULT_DOMAIN = 'general'
+DEFAULT_DURATION = 120  # minutes
+
+
+def _prune(keywords, earlier=()) -> tuple:
+    # A keyword that contains another one (of its own or an earlier domain) can never
+    # change the answer of a substring check: 'cancel my session' already hits 'cancel'
+    shorter = list(keywords) + list(earlier)
+    return tuple(k for k in keywords if not any(o != k and o in k for o in shorter))
+
+
+def build_domain_table(domain_keywords: dict) -> tuple:
+    """((domain, keywords), ...) in priority order, for classify(domains=...)"""
+    table = []
+    seen = []
+    for domain, keywords in domain_keywords.items():
+        keywords = [k.lower() for k in keywords]
+        table.append((domain, _prune(keywords, seen)))
+        seen.extend(keywords)
+    return tuple(table)
+
+
+# All meeting patterns as one regex instead of ~20 separate searches
+_MEETING = re.compile("|".join(f"(?:{p})" for p in MEETING_PATTERNS))
+
+# Keyword checks stay plain substring tests (CPython's `in` beats a regex alternation
+# here), over tables pruned once at import
+_CANCEL = _prune(CANCEL_KEYWORDS)
+DEFAULT_DOMAINS = build_domain_table(DOMAIN_KEYWORDS)
+
+# "30 min" / "45 minutes" / "2 hours"; any minutes figure wins over an hours one
+_DURATION = re.compile(r"(\d+)\s*(?:(min)|hour)")
+
+
+@dataclass(frozen=True)
+class Intent:
+    is_meeting: bool
+    is_cancel: bool
+    domain: str
+    duration: int  # minutes
+
+
+def _meeting(msg: str) -> bool:
+    return _MEETING.search(msg.strip()) is not None
+
+
+def _cancel(msg: str) -> bool:
+    for keyword in _CANCEL:
+        if keyword in msg:
+            return True
+    return False
+
+
+def _domain(msg: str, domains: tuple = None) -> str:
+    for domain, keywords in domains or DEFAULT_DOMAINS:
+        for keyword in keywords:
+            if keyword in msg:
+                return domain
+    return DEFAULT_DOMAIN
+
+
+def _duration(msg: str) -> int:
+    hours = None
+    for match in _DURATION.finditer(msg):
+        if match.group(2):
+            return int(match.group(1))
+        if hours is None:
+            hours = int(match.group(1)) * 60
+    return hours if hours is not None else DEFAULT_DURATION
+
+
+def classify(message: str, domains: tuple = None) -> Intent:
+    """
+    All intents of a chat message in one call.
+    `domains` is a build_domain_table() result (the Domain taxonomy); defaults to DOMAIN_KEYWORDS.
+    """
+    msg = message.lower()
+    return Intent(
+        is_meeting=_meeting(msg),
+        is_cancel=_cancel(msg),
+        domain=_domain(msg, domains),
+        duration=_duration(msg),
+    )
+
+
+def is_meeting_request(message: str) -> bool:
+    return _meeting(message.lower())
+
+
+def is_cancel_request(message: str) -> bool:
+    return _cancel(message.lower())
+
+
+def detect_domain(message: str, domains: tuple = None) -> str:
+    return _domain(message.lower(), domains)
+
+
+def extract_duration(message: str) -> int:
+    return _duration(message.lower())
@@ -0,0 +1,267 @@
+# chatbot/knowledge_base.py
+"""
+On-disk knowledge base built from the UKJobsInsider training PDFs.
+
+`python manage.py build_knowledge_base` extracts every ukjobs*.pdf once into:
+  - corpus.txt     UTF-8 text of all sources, back to back
+  - manifest.json  per-source SHA-256, byte offsets and chunk offsets
+
+Workers memory-map corpus.txt at boot instead of re-running PyPDF2, so the
+text lives once in the OS page cache and is shared by every process.
+A source is only re-extracted when its content hash changes.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+from .retrieval import chunk_spans
+
+MANIFEST_VERSION = 1
+CORPUS_FILE = "corpus.txt"
+MANIFEST_FILE = "manifest.json"
+
+KNOWLEDGE_BASE_DIR = Path(getattr(settings, 'KNOWLEDGE_BASE_DIR', settings.BASE_DIR / "knowledge_base"))
+KNOWLEDGE_BASE_SOURCES = getattr(settings, 'KNOWLEDGE_BASE_SOURCES', "ukjobs*.pdf")
+
+UNAVAILABLE_TEXT = "UKJobsInsider training data not available."
+
+
+def source_paths() -> List[Path]:
+    """Training PDFs in natural order (ukjobs.pdf, ukjobs1.pdf, ukjobs2.pdf ... ukjobs11.pdf)"""
+    def natural_key(path):
+        digits = "".join(ch for ch in path.stem if ch.isdigit())
+        return (int(digits) if digits else -1, path.name)
+    return sorted(Path(settings.BASE_DIR).glob(KNOWLEDGE_BASE_SOURCES), key=natural_key)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_pdf_text(pdf_path: Path) -> str:
+    """Extract text from a PDF with PyPDF2 (only needed while building)"""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(str(pdf_path))
+    return "".join((page.extract_text() or "") + "\n" for page in reader.pages)
+
+
+def read_manifest(directory: Path = None) -> Optional[dict]:
+    directory = Path(directory or KNOWLEDGE_BASE_DIR)
+    try:
+        with open(directory / MANIFEST_FILE, encoding="utf-8") as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION or not (directory / CORPUS_FILE).exists():
+        return None
+    return manifest
+
+
+def sources_changed(manifest: dict) -> bool:
+    """Cheap staleness check (size + mtime) used at worker boot; hashing happens in build"""
+    recorded = {s["name"]: (s["size"], s["mtime"]) for s in manifest.get("sources", [])}
+    current = {}
+    for path in source_paths():
+        stat = path.stat()
+        current[path.name] = (stat.st_size, int(stat.st_mtime))
+    return recorded != current
+
+
+def build_knowledge_base(directory: Path = None, force: bool = False, log=print) -> Tuple[dict, bool]:
+    """
+    Extract all training PDFs into corpus.txt + manifest.json.
+    Unchanged sources (same SHA-256) are copied from the previous corpus rather than re-parsed.
+    Returns (manifest, rebuilt).
+    """
+    directory = Path(directory or KNOWLEDGE_BASE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    previous = None if force else read_manifest(directory)
+
+    sources = []
+    for path in source_paths():
+        stat = path.stat()
+        sha = file_sha256(path)
+        sources.append({"name": path.name, "path": path, "sha256": sha,
+                        "size": stat.st_size, "mtime": int(stat.st_mtime)})
+
+    previous_text = _reusable_text(directory, previous, sources) if previous else {}
+
+    content_hash = hashlib.sha256("".join(s["sha256"] for s in sources).encode()).hexdigest()
+    if previous and previous.get("content_hash") == content_hash:
+        if sources_changed(previous):
+            # Only timestamps moved (e.g. fresh checkout): refresh stat info, keep the corpus
+            for old, new in zip(previous["sources"], sources):
+                old["size"], old["mtime"] = new["size"], new["mtime"]
+            _write_atomic(directory / MANIFEST_FILE, json.dumps(previous).encode("utf-8"))
+        log(f"📚 Knowledge base up to date ({len(sources)} sources, {len(previous['chunks'])} chunks)")
+        return previous, False
+
+    corpus = bytearray()
+    chunks = []
+    seen_text = {}
+    manifest_sources = []
+    for source in sources:
+        text = previous_text.get(source["sha256"])
+        if text is None:
+            try:
+                text = extract_pdf_text(source["path"])
+                log(f"📄 Extracted {source['name']} ({len(text):,} chars)")
+            except Exception as e:
+                log(f"❌ Error extracting {source['name']}: {e}")
+                text = ""
+        else:
+            log(f"♻️ Reused {source['name']} (unchanged)")
+
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        entry = {key: source[key] for key in ("name", "sha256", "size", "mtime")}
+        if text_hash in seen_text or not text.strip():
+            # Identical text already indexed under another file; keep the record, skip the text
+            entry["offset"] = [len(corpus), len(corpus)]
+            entry["duplicate_of"] = seen_text.get(text_hash)
+            manifest_sources.append(entry)
+            continue
+        seen_text[text_hash] = source["name"]
+
+        base = len(corpus)
+        spans = chunk_spans(text)
+        offsets = _byte_offsets(text, [position for span in spans for position in span])
+        for start, end in spans:
+            chunks.append([base + offsets[start], base + offsets[end]])
+        corpus.extend(text.encode("utf-8"))
+        entry["offset"] = [base, len(corpus)]
+        manifest_sources.append(entry)
+        corpus.extend(b"\n")
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "content_hash": content_hash,
+        "sources": manifest_sources,
+        "chunks": chunks,
+    }
+    # Corpus first: a reader that sees the new manifest must also see the new corpus
+    _write_atomic(directory / CORPUS_FILE, bytes(corpus))
+    _write_atomic(directory / MANIFEST_FILE, json.dumps(manifest).encode("utf-8"))
+    log(f"✅ Knowledge base built: {len(manifest_sources)} sources, {len(chunks)} chunks, {len(corpus):,} bytes")
+    return manifest, True
+
+
+def _byte_offsets(text: str, positions) -> dict:
+    """{character position: UTF-8 byte offset}, encoding each stretch of text once"""
+    offsets = {}
+    char = byte = 0
+    for position in sorted(set(positions)):
+        byte += len(text[char:position].encode("utf-8"))
+        offsets[position] = byte
+        char = position
+    return offsets
+
+
+def _reusable_text(directory: Path, previous: dict, sources: List[dict]) -> dict:
+    """
+    {sha256: text} for previous sources whose text is in the old corpus. Duplicates were stored
+    with an empty span; their text is the original's span, but only while the original is
+    unchanged (otherwise they are extracted again). Empty spans never count as text.
+    """
+    with open(directory / CORPUS_FILE, "rb") as fh:
+        data = fh.read()
+    current = {source["name"]: source["sha256"] for source in sources}
+    by_name = {source["name"]: source for source in previous["sources"]}
+
+    reusable = {}
+    for source in previous["sources"]:
+        span = source["offset"]
+        original = by_name.get(source.get("duplicate_of"))
+        if original is not None:
+            if current.get(original["name"]) != original["sha256"]:
+                continue
+            span = original["offset"]
+        start, end = span
+        if end > start and source["sha256"] not in reusable:
+            reusable[source["sha256"]] = data[start:end].decode("utf-8")
+    return reusable
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+
+class KnowledgeBase:
+    """Read-only, memory-mapped view of a built corpus"""
+
+    def __init__(self, manifest: dict, mapped=None):
+        self.manifest = manifest
+        self.chunk_offsets = [tuple(span) for span in manifest.get("chunks", [])]
+        self._mapped = mapped
+
+    @classmethod
+    def open(cls, directory: Path = None, manifest: dict = None):
+        directory = Path(directory or KNOWLEDGE_BASE_DIR)
+        manifest = manifest or read_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No knowledge base in {directory}")
+        with open(directory / CORPUS_FILE, "rb") as fh:
+            size = os.fstat(fh.fileno()).st_size
+            # mmap keeps its own handle, so the file object can be closed straight away
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        return cls(manifest, mapped)
+
+    @property
+    def content_hash(self) -> str:
+        return self.manifest.get("content_hash", "")
+
+    def __len__(self):
+        return len(self.chunk_offsets)
+
+    def text(self, start: int, end: int) -> str:
+        if self._mapped is None:
+            return ""
+        return self._mapped[start:end].decode("utf-8", errors="ignore")
+
+    def chunk(self, idx: int) -> str:
+        return self.text(*self.chunk_offsets[idx])
+
+    def iter_chunks(self):
+        for start, end in self.chunk_offsets:
+            yield self.text(start, end)
+
+    def full_text(self) -> str:
+        if self._mapped is None:
+            return UNAVAILABLE_TEXT
+        return self.text(0, len(self._mapped))
+
+
+def load_knowledge_base(directory: Path = None) -> KnowledgeBase:
+    """
+    Open the built corpus for this process.
+    Builds it in-process if it is missing or a source PDF changed since the last build.
+    """
+    directory = Path(directory or KNOWLEDGE_BASE_DIR)
+    manifest = read_manifest(directory)
+    try:
+        if manifest is None:
+            print("⚠️ Knowledge base not built yet - extracting PDFs (run `manage.py build_knowledge_base` at deploy)")
+            manifest, _ = build_knowledge_base(directory)
+        elif sources_changed(manifest):
+            print("⚠️ Training PDFs changed since the knowledge base was built - refreshing")
+            manifest, _ = build_knowledge_base(directory)
+        return KnowledgeBase.open(directory, manifest)
+    except Exception as e:
+        print(f"Error loading knowledge base: {str(e)}")
+        return KnowledgeBase({"chunks": [], "sources": []})
@@ -0,0 +1,48 @@
+# chatbot/logs.py
+"""
+Structured logging for the chatbot app.
+
+Modules log through `logging.getLogger(__name__)` with %-style arguments, so a
+message below the logger's level costs an isEnabledFor() check and nothing is
+formatted. Loops that would log once per item (the per-slot lines in the slot
+searches) check `logger.isEnabledFor(logging.DEBUG)` once before the loop and
+log at DEBUG.
+
+JsonFormatter writes one JSON object per line: time, level, logger, message,
+any fields passed with `extra=`, and the traceback when there is one.
+
+Configured through settings.LOGGING; the environment picks the level and format:
+    CHATBOT_LOG_LEVEL  level of the "chatbot" loggers (INFO by default, DEBUG for per-slot lines)
+    LOG_FORMAT         json (default) | text
+"""
+
+import json
+import logging
+from datetime import date, datetime
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with extra= fields at the top level"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=_default, ensure_ascii=False)
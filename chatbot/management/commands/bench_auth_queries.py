@@ -0,0 +1,86 @@
+# chatbot/management/commands/bench_auth_queries.py
+"""
+Queries and latency per authenticated request on /chat/ and /book-slot/, on a temporary test database,
+with DRF's TokenAuthentication (token+user join, then a profile query in the view) against
+CachedTokenAuthentication (one select_related query on a miss, none once cached).
+The /chat/ message is a booking request, so no Gemini call is made.
+Usage: python manage.py bench_auth_queries --repeat=200
+"""
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from chatbot.authentication import CachedTokenAuthentication, get_token_cache
+from chatbot.benchmarking import format_table, time_call
+from chatbot.models import Mentor, UserProfile
+from chatbot.views import ChatView, TimeSlotBookingView
+
+ENDPOINTS = [
+    ("/api/chat/", ChatView, {"message": "Can I book a meeting with a mentor?"}),
+    ("/api/book-slot/", TimeSlotBookingView, {}),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark queries per request: TokenAuthentication vs CachedTokenAuthentication'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            client = self._seed()
+            self._run(client, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _seed(self):
+        user = User.objects.create_user("bench", "bench@example.com", "pw")
+        UserProfile.objects.create(user=user, is_premium=True, session_count=1)
+        for i in range(5):
+            Mentor.objects.create(user=User.objects.create_user(f"mentor{i}", f"mentor{i}@example.com"),
+                                  expertise="Data Science")
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        return client
+
+    def _run(self, client, repeat):
+        rows = []
+        for path, view, body in ENDPOINTS:
+            original = view.authentication_classes
+            try:
+                for auth in (TokenAuthentication, CachedTokenAuthentication):
+                    view.authentication_classes = [auth]
+                    get_token_cache().clear()
+                    request = lambda: client.post(path, body, format="json")
+
+                    counts = []
+                    for _ in range(2):  # first request (cache miss), then warm
+                        reset_queries()  # the log is capped; migrations may have filled it
+                        with CaptureQueriesContext(connection) as queries:
+                            response = request()
+                        assert response.status_code == 200, response.content
+                        counts.append(list(queries))
+                    auth_queries = sum(
+                        1 for q in counts[1] if "authtoken_token" in q["sql"] or "user_profiles" in q["sql"]
+                    )
+                    stats = time_call(request, repeat=repeat)
+                    rows.append([path, auth.__name__, len(counts[0]), len(counts[1]), auth_queries,
+                                 stats["p50_ms"], stats["p95_ms"]])
+            finally:
+                view.authentication_classes = original
+
+        self.stdout.write(format_table(
+            ["endpoint", "authentication", "queries (first)", "queries (warm)", "token/profile queries",
+             "p50_ms", "p95_ms"],
+            rows,
+        ))
@@ -0,0 +1,93 @@
+# chatbot/management/commands/bench_availability.py
+"""
+Round trips and latency of a 30-day slot search, against a local fake Calendar API (fake_calendar.py)
+with --latency seconds added to every response.
+    events.list per day   what the searches did before: get_busy_slots() for each weekday, per mentor
+    freebusy window       get_busy_intervals(): one freebusy.query per mentor for the whole window, in parallel
+Each mentor's calendar has a few busy blocks per day; every weekday's 32 slots are checked.
+Usage: python manage.py bench_availability --latency=0.02 --mentors=1,6 --repeat=5
+"""
+
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from chatbot import calendar_client
+from chatbot.benchmarking import format_table
+from chatbot.calendar_client import AVAILABLE_TIME_SLOTS, UK_TZ
+from chatbot.fake_calendar import FakeCalendarServer
+
+DAYS = 30
+START = datetime(2025, 3, 3, 9, 0, tzinfo=UK_TZ)  # a Monday
+
+
+def weekdays():
+    for offset in range(DAYS):
+        day = (START + timedelta(days=offset)).date()
+        if day.weekday() < 5:
+            yield day
+
+
+def day_slots(day):
+    for sh, sm, eh, em in AVAILABLE_TIME_SLOTS:
+        yield (datetime(day.year, day.month, day.day, sh, sm, tzinfo=UK_TZ),
+               datetime(day.year, day.month, day.day, eh, em, tzinfo=UK_TZ))
+
+
+def search_per_day(mentors):
+    free = 0
+    for mentor in mentors:
+        for day in weekdays():
+            busy = calendar_client.get_busy_slots(datetime(day.year, day.month, day.day, 9, tzinfo=UK_TZ),
+                                                  datetime(day.year, day.month, day.day, 17, tzinfo=UK_TZ), mentor)
+            free += sum(not calendar_client.has_overlap(s, e, busy) for s, e in day_slots(day))
+    return free
+
+
+def search_window(mentors):
+    busy = calendar_client.get_busy_intervals(mentors, START, START + timedelta(days=DAYS - 1, hours=8))
+    return sum(not busy[mentor].overlaps(s, e) for mentor in mentors for day in weekdays() for s, e in day_slots(day))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark a 30-day availability search: events.list per day vs a freebusy.query per calendar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency', type=float, default=0.02, help='Seconds added to every fake response')
+        parser.add_argument('--mentors', default='1,6', help='Comma-separated mentor counts to try')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with FakeCalendarServer(latency=options['latency']) as server, tempfile.TemporaryDirectory() as tmp:
+            key_file = server.write_service_account(os.path.join(tmp, "service_account.json"))
+            counts = [int(n) for n in options['mentors'].split(',')]
+            mentors = [f"mentor{i}@example.com" for i in range(max(counts))]
+            for mentor in mentors:
+                for day in weekdays():
+                    for hour in (9, 11, 14):
+                        start = datetime(day.year, day.month, day.day, hour, 15 * (len(mentor) % 4), tzinfo=UK_TZ)
+                        server.add_event(mentor, start, start + timedelta(minutes=45))
+
+            rows = []
+            with server.patch_calendar_client(key_file):
+                for n in counts:
+                    expected = None
+                    for label, search in (("events.list per day", search_per_day), ("freebusy window", search_window)):
+                        search(mentors[:n])  # warm up: token, connection, client
+                        before = sum(server.requests.values())
+                        samples = []
+                        for _ in range(options['repeat']):
+                            start = time.perf_counter()
+                            free = search(mentors[:n])
+                            samples.append((time.perf_counter() - start) * 1000)
+                        expected = expected if expected is not None else free
+                        assert free == expected, (label, free, expected)
+                        round_trips = (sum(server.requests.values()) - before) / options['repeat']
+                        rows.append([n, label, round_trips, statistics.median(samples), free])
+
+        self.stdout.write(format_table(
+            ["mentors", "search", "round trips", "p50_ms", "free slots found"], rows))
@@ -0,0 +1,82 @@
+# chatbot/management/commands/bench_busy_index.py
+"""
+Overlap checks for one day and for a month of 15-minute slots (32 a day) against thousands of busy events,
+no Calendar API involved:
+    has_overlap, day's events     the old per-day loop: linear scan with _ensure_tz per comparison
+    has_overlap, all events       the same scan once a whole window is fetched in one request
+    BusyIntervals.overlaps        bisect on the epoch arrays, one slot at a time
+    BusyIntervals.free_mask       one np.searchsorted sweep over the slot grid
+Building the index (normalise + merge) is timed separately.
+Usage: python manage.py bench_busy_index --events=1000,5000 --repeat=20
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from chatbot.availability import BusyIntervals, slot_grid
+from chatbot.benchmarking import format_table, time_call
+from chatbot.calendar_client import AVAILABLE_TIME_SLOTS, UK_TZ, has_overlap, slot_bounds
+
+START = datetime(2025, 3, 3, 0, 0, tzinfo=UK_TZ)
+DAYS = 30
+
+
+def random_events(n, rng):
+    events = []
+    for _ in range(n):
+        start = START + timedelta(days=rng.randrange(DAYS), minutes=rng.randrange(0, 24 * 60))
+        events.append((start, start + timedelta(minutes=rng.randrange(1, 30))))
+    return events
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark has_overlap against BusyIntervals for a day and a month of slots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', default='1000,5000', help='Comma-separated busy event counts (per month)')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        dates = [(START + timedelta(days=i)).date() for i in range(DAYS)]
+        slots = {day: [slot_bounds(day, slot) for slot in AVAILABLE_TIME_SLOTS] for day in dates}
+        starts, ends = slot_grid(dates, AVAILABLE_TIME_SLOTS, UK_TZ)
+        repeat = options['repeat']
+
+        rows = []
+        for n in [int(x) for x in options['events'].split(',')]:
+            events = random_events(n, rng)
+            by_day = {}
+            for event in events:
+                by_day.setdefault(event[0].date(), []).append(event)
+            busy = BusyIntervals(events)
+            day = dates[0]
+
+            expected = [not has_overlap(s, e, events) for day_ in dates for s, e in slots[day_]]
+            assert busy.free_mask(starts, ends).ravel().tolist() == expected
+
+            build = time_call(lambda: BusyIntervals(events), repeat=repeat)
+            cases = [
+                ("has_overlap, day's events",
+                 lambda: [has_overlap(s, e, by_day.get(day, [])) for s, e in slots[day]],
+                 lambda: [has_overlap(s, e, by_day.get(d, [])) for d in dates for s, e in slots[d]]),
+                ("has_overlap, all events",
+                 lambda: [has_overlap(s, e, events) for s, e in slots[day]],
+                 None),  # a month of these takes minutes
+                ("BusyIntervals.overlaps",
+                 lambda: [busy.overlaps(s, e) for s, e in slots[day]],
+                 lambda: [busy.overlaps(s, e) for d in dates for s, e in slots[d]]),
+                ("BusyIntervals.free_mask",
+                 lambda: busy.free_mask(starts[0], ends[0]),
+                 lambda: busy.free_mask(starts, ends)),
+            ]
+            for label, one_day, month in cases:
+                day_stats = time_call(one_day, repeat=repeat)
+                month_ms = time_call(month, repeat=max(1, repeat // 4))["p50_ms"] if month else None
+                rows.append([n, label, day_stats["p50_ms"] * 1000,
+                             month_ms * 1000 if month_ms is not None else "-"])
+            rows.append([n, f"(build index: {len(busy)} merged intervals)", build["p50_ms"] * 1000, "-"])
+
+        self.stdout.write(format_table(["events", "check", "1 day (32 slots) us", "30 days (960 slots) us"], rows))
@@ -0,0 +1,90 @@
+# chatbot/management/commands/bench_calendar_fanout.py
+"""
+get_user_last_session_date across --calendars mentor calendars on a local fake Calendar API
+(fake_calendar.py), each answering after its own delay between --min-latency and --max-latency:
+    sequential      one calendar after another, as before (sum of the delays)
+    fanout          Fanout: all calendars at once (about the slowest delay)
+Then the same with one calendar hanging (--hang seconds): sequential waits for it, the fan-out gives
+up after CALL_TIMEOUT (--call-timeout) and answers from the others; after BREAKER_FAILURES such
+lookups the hanging calendar is skipped outright.
+Usage: python manage.py bench_calendar_fanout --calendars=12 --min-latency=0.05 --max-latency=0.3
+"""
+
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from chatbot import calendar_client
+from chatbot.benchmarking import format_table, time_call
+from chatbot.fake_calendar import FakeCalendarServer
+from chatbot.fanout import CircuitBreaker, Fanout
+
+STUDENT = "student@example.com"
+
+
+class Command(BaseCommand):
+    help = 'Benchmark cross-calendar lookups: sequential calls vs a parallel fan-out with deadlines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calendars', type=int, default=12)
+        parser.add_argument('--min-latency', type=float, default=0.05)
+        parser.add_argument('--max-latency', type=float, default=0.3)
+        parser.add_argument('--hang', type=float, default=3.0, help='Delay of the hanging calendar')
+        parser.add_argument('--call-timeout', type=float, default=0.5)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(11)
+        now = datetime.now(calendar_client.UK_TZ)
+        mentors = {f"m{i}": {"email": f"mentor{i}@example.com", "calendar_id": f"mentor{i}@example.com"}
+                   for i in range(options['calendars'])}
+        with FakeCalendarServer() as server, tempfile.TemporaryDirectory() as tmp:
+            key_file = server.write_service_account(os.path.join(tmp, "service_account.json"))
+            for mentor in mentors.values():
+                start = now - timedelta(days=rng.randrange(1, 170))
+                server.add_event(mentor["email"], start, start + timedelta(minutes=15),
+                                 attendees=[{"email": STUDENT, "responseStatus": "accepted"}])
+                server.calendar_latency[mentor["email"]] = rng.uniform(options['min_latency'],
+                                                                       options['max_latency'])
+            delays = list(server.calendar_latency.values())
+
+            fanout = Fanout(options['workers'], options['call_timeout'], deadline=options['call_timeout'] * 2,
+                            breaker=CircuitBreaker(failures=3, cooldown=60))
+            with server.patch_calendar_client(key_file), \
+                    mock.patch.dict(calendar_client.MENTOR_CONFIG, mentors, clear=True), \
+                    override_settings(CALENDAR_MIRROR={"ENABLED": False}):
+                rows = self._compare(fanout, mentors, options['repeat'], "all healthy")
+                hanging = next(iter(mentors.values()))["email"]
+                server.calendar_latency[hanging] = options['hang']
+                rows += self._compare(fanout, mentors, 1, f"1 hanging ({options['hang']:g}s)")
+                for _ in range(2):  # reach BREAKER_FAILURES
+                    self._fanout_lookup(fanout)
+                skipped = time_call(lambda: self._fanout_lookup(fanout), repeat=options['repeat'], warmup=0)
+                rows.append(["1 hanging, circuit open", "fanout", skipped["p50_ms"], skipped["p95_ms"]])
+            fanout.shutdown()
+
+        self.stdout.write(f"{len(mentors)} calendars, delay sum {sum(delays) * 1000:.0f} ms, "
+                          f"slowest {max(delays) * 1000:.0f} ms, call timeout {options['call_timeout'] * 1000:.0f} ms")
+        self.stdout.write(format_table(["case", "strategy", "p50_ms", "p95_ms"], rows))
+
+    def _compare(self, fanout, mentors, repeat, label):
+        def sequential():
+            ends = []
+            for mentor in mentors.values():
+                ends += calendar_client._session_ends_in_calendar(STUDENT, mentor["email"])
+            return max(ends, default=None)
+
+        seq = time_call(sequential, repeat=repeat, warmup=1)
+        fan = time_call(lambda: self._fanout_lookup(fanout), repeat=repeat, warmup=1)
+        return [[label, "sequential", seq["p50_ms"], seq["p95_ms"]],
+                [label, "fanout", fan["p50_ms"], fan["p95_ms"]]]
+
+    def _fanout_lookup(self, fanout):
+        with mock.patch.object(calendar_client, "get_fanout", return_value=fanout):
+            return calendar_client.get_user_last_session_date(STUDENT)
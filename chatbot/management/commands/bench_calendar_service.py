@@ -0,0 +1,112 @@
+# chatbot/management/commands/bench_calendar_service.py
+"""
+Per-call overhead of getting a Calendar client, against a local fake Calendar API (fake_calendar.py)
+that also plays Google's OAuth token endpoint.
+Each call gets a client and runs one events.list, the request get_busy_slots() makes per day scanned:
+    build per call       credentials from the key file + discovery build on every call (new token,
+                         new connection, discovery document parsed each time)
+    shared client        one client for everything, what get_calendar_service's lru_cache gave;
+                         fast, but its httplib2 transport is not thread-safe
+    pool                 CalendarServicePool: shared credentials, per-thread client and transport
+Then --threads threads make calls through the pool at the same time.
+--latency adds a fixed delay to every fake response (network + Google's own time).
+Usage: python manage.py bench_calendar_service --repeat=100 --latency=0.005 --threads=8
+"""
+
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+from chatbot.benchmarking import format_table, time_call
+from chatbot.calendar_client import UK_TZ
+from chatbot.calendar_pool import SCOPES, CalendarServicePool, TimedHttpRequest
+from chatbot.fake_calendar import FakeCalendarServer
+
+CALENDAR = "mentor@example.com"
+DAY = datetime(2025, 3, 3, 9, 0, tzinfo=UK_TZ)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark Calendar client construction: build per call vs CalendarServicePool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=100)
+        parser.add_argument('--latency', type=float, default=0.005, help='Seconds added to every fake response')
+        parser.add_argument('--threads', type=int, default=8)
+
+    def handle(self, *args, **options):
+        with FakeCalendarServer(latency=options['latency']) as server, tempfile.TemporaryDirectory() as tmp:
+            key_file = server.write_service_account(os.path.join(tmp, "service_account.json"))
+            for slot in range(0, 32, 3):
+                start = DAY + timedelta(minutes=15 * slot)
+                server.add_event(CALENDAR, start, start + timedelta(minutes=15), summary="Busy")
+
+            def build_per_call():
+                credentials = service_account.Credentials.from_service_account_file(key_file, scopes=SCOPES)
+                return build("calendar", "v3", credentials=credentials, requestBuilder=TimedHttpRequest,
+                             client_options={"api_endpoint": server.api_endpoint})
+
+            shared = build_per_call()
+            pool = CalendarServicePool(api_endpoint=server.api_endpoint)
+            clients = [
+                ("build per call", build_per_call),
+                ("shared client (lru_cache)", lambda: shared),
+                ("pool", lambda: pool.service(key_file, CALENDAR)),
+            ]
+
+            rows = []
+            for label, get_client in clients:
+                acquire = time_call(get_client, repeat=min(options['repeat'], 50) if label == "build per call"
+                                    else options['repeat'])
+                before = (server.requests["POST token"], server.connections)
+                call = time_call(lambda: self._list_events(get_client()), repeat=options['repeat'])
+                calls = options['repeat'] + 3  # time_call warmup
+                rows.append([label, acquire["p50_ms"], call["p50_ms"], call["p95_ms"],
+                             (server.requests["POST token"] - before[0]) / calls,
+                             (server.connections - before[1]) / calls])
+
+            self.stdout.write(format_table(
+                ["client", "get client p50_ms", "get + events.list p50_ms", "p95_ms",
+                 "token requests/call", "new connections/call"], rows))
+            self.stdout.write("")
+            self._threaded(server, pool, key_file, options['threads'], options['repeat'])
+
+    def _list_events(self, service):
+        return service.events().list(
+            calendarId=CALENDAR, timeMin=DAY.isoformat(), timeMax=(DAY + timedelta(hours=8)).isoformat(),
+            singleEvents=True, orderBy="startTime",
+        ).execute()["items"]
+
+    def _threaded(self, server, pool, key_file, threads, repeat):
+        errors, counts = [], []
+        before = (server.requests["POST token"], server.connections)
+
+        def worker():
+            done = 0
+            for _ in range(repeat):
+                try:
+                    if len(self._list_events(pool.service(key_file, CALENDAR))) != 11:
+                        errors.append("wrong result")
+                    done += 1
+                except Exception as e:  # a shared, non-thread-safe transport fails here
+                    errors.append(repr(e))
+            counts.append(done)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(format_table(
+            ["threads", "calls", "calls/s", "errors", "token requests", "new connections"],
+            [[threads, sum(counts), sum(counts) / elapsed, len(errors),
+              server.requests["POST token"] - before[0], server.connections - before[1]]],
+        ))
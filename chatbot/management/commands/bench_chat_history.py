@@ -0,0 +1,98 @@
+# chatbot/management/commands/bench_chat_history.py
+"""
+Conversation-memory cost for users with long chat histories, on a temporary test database:
+    - loading the last N turns with and without the (user, -created_at) index
+    - assembling the token-budgeted history context
+    - saving a turn synchronously vs queueing it for the background writer
+Usage: python manage.py bench_chat_history --rows=20000 --other-users=20
+"""
+
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from chatbot import conversation
+from chatbot.benchmarking import format_table, time_call
+from chatbot.models import ChatHistory
+from chatbot.write_behind import get_write_behind
+
+REPLY = ("A UK CV is usually two pages and opens with a short profile. "
+         'See <a href="https://ukjobsinsider.com/resources">resources</a>. ') * 4
+
+
+class Command(BaseCommand):
+    help = 'Benchmark conversation-memory reads and writes against large ChatHistory tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='History rows for the measured user')
+        parser.add_argument('--other-users', type=int, default=20, help='Other users with as many rows each')
+        parser.add_argument('--turns', type=int, default=conversation.HISTORY_TURNS)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = self._seed(options['rows'], options['other_users'])
+            self.stdout.write(f"chat_history rows: {ChatHistory.objects.count():,}\n")
+            self._run(user, options['turns'])
+        finally:
+            get_write_behind().flush()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _seed(self, rows, other_users):
+        users = [User.objects.create_user(f"history{i}") for i in range(other_users + 1)]
+        created_at = ChatHistory._meta.get_field("created_at")
+        created_at.auto_now_add = False  # seed realistic, spread-out timestamps
+        try:
+            start = timezone.now() - timedelta(days=365)
+            for user in users:
+                ChatHistory.objects.bulk_create(
+                    (ChatHistory(user=user, message=f"Question {n} about UK jobs", response=REPLY,
+                                 created_at=start + timedelta(minutes=n))
+                     for n in range(rows)),
+                    batch_size=2000,
+                )
+        finally:
+            created_at.auto_now_add = True
+        return users[0]
+
+    def _run(self, user, turns):
+        index = next(i for i in ChatHistory._meta.indexes if i.name == "chat_history_user_recent")
+        query = conversation._recent_turns_query(user.id, turns)
+
+        rows = []
+        with_index = time_call(lambda: conversation.recent_turns(user.id, turns), repeat=200)
+        plan_with = query.explain()
+        with connection.schema_editor() as editor:
+            editor.remove_index(ChatHistory, index)
+        try:
+            without_index = time_call(lambda: conversation.recent_turns(user.id, turns), repeat=20)
+            plan_without = query.explain()
+        finally:
+            with connection.schema_editor() as editor:
+                editor.add_index(ChatHistory, index)
+
+        history = conversation.recent_turns(user.id, turns)
+        context = conversation.build_history_context(history)
+        build = time_call(lambda: conversation.build_history_context(history), repeat=500)
+
+        sync_write = time_call(
+            lambda: ChatHistory.objects.create(user=user, message="hi", response=REPLY), repeat=200
+        )
+        deferred_write = time_call(lambda: conversation.record_turn(user.id, "hi", REPLY), repeat=200)
+
+        rows.append([f"last {turns} turns, no index", without_index["p50_ms"], without_index["p95_ms"]])
+        rows.append([f"last {turns} turns, (user, -created_at) index", with_index["p50_ms"], with_index["p95_ms"]])
+        rows.append([f"build context ({len(context)} chars)", build["p50_ms"], build["p95_ms"]])
+        rows.append(["save turn synchronously", sync_write["p50_ms"], sync_write["p95_ms"]])
+        rows.append(["queue turn (deferred write)", deferred_write["p50_ms"], deferred_write["p95_ms"]])
+
+        self.stdout.write(format_table(["operation", "p50_ms", "p95_ms"], rows))
+        self.stdout.write(f"\nQuery plan without index: {plan_without}")
+        self.stdout.write(f"Query plan with index:    {plan_with}")
@@ -0,0 +1,70 @@
+# chatbot/management/commands/bench_chat_stream.py
+"""
+Compare time-to-first-byte of the blocking chat reply against the SSE stream.
+Uses a stubbed Gemini model (no API calls) and bypasses the reply caches.
+Usage: python manage.py bench_chat_stream --ms-per-output-token=15 --runs=5
+"""
+
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from chatbot import gemini_client, views
+from chatbot.benchmarking import FakeGenAI, FakeGenerativeModel, format_table
+
+SAMPLE_REPLY = (
+    "Great question! A UK CV is usually two pages long and leads with a short personal "
+    "profile tailored to the role. List your experience in reverse chronological order, "
+    "quantify achievements where you can, and leave out photos, date of birth and marital "
+    "status. Keep formatting simple so applicant tracking systems can read it. You can find "
+    'our template in the <a href="https://ukjobsinsider.com/resources">resources section</a> '
+    "of your dashboard, and Premium members can book a CV review with a mentor for detailed, "
+    "line-by-line feedback before applying. Good luck with your applications!"
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark time-to-first-byte: blocking ChatView reply vs streamed reply'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-latency-ms', type=float, default=300.0)
+        parser.add_argument('--ms-per-output-token', type=float, default=15.0,
+                            help='Stubbed generation time per reply token')
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        model = FakeGenerativeModel(
+            base_latency_ms=options['base_latency_ms'],
+            ms_per_output_token=options['ms_per_output_token'],
+            reply=SAMPLE_REPLY,
+        )
+        gemini_client.get_corpus()  # one-off load, not part of the request
+
+        rows = []
+        with mock.patch.object(gemini_client, "get_genai", return_value=FakeGenAI(model)), \
+                mock.patch.object(views, "get_cached_reply", return_value=None), \
+                mock.patch.object(views, "store_reply"):
+            for label, run in (("blocking", self._blocking), ("stream (SSE)", self._stream)):
+                samples = [run() for _ in range(options['runs'])]
+                ttfb = sorted(s[0] for s in samples)[len(samples) // 2]
+                total = sorted(s[1] for s in samples)[len(samples) // 2]
+                rows.append([label, ttfb, total, samples[0][2]])
+
+        self.stdout.write(format_table(["variant", "ttfb_ms (median)", "total_ms (median)", "events"], rows))
+
+    def _blocking(self):
+        start = time.perf_counter()
+        views.get_ai_reply("How do I write a UK CV?", False)
+        elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, elapsed, 1
+
+    def _stream(self):
+        start = time.perf_counter()
+        ttfb = None
+        events = 0
+        for event in views.stream_ai_reply("How do I write a UK CV?", False):
+            if ttfb is None:
+                ttfb = (time.perf_counter() - start) * 1000
+            events += 1
+        return ttfb, (time.perf_counter() - start) * 1000, events
@@ -0,0 +1,135 @@
+# chatbot/management/commands/bench_entitlements.py
+"""
+Signup/login entitlement lookup against a large generated users.csv:
+    - the original get_user_data(): sniff + linear scan of the file per call
+    - the in-memory file store: cold load, warm lookup, reload after the file changes
+    - the Entitlement table ("db" backend) on a temporary test database
+Usage: python manage.py bench_entitlements --rows=500000
+"""
+
+import csv
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from chatbot.benchmarking import format_table, time_call
+from chatbot.entitlements import DatabaseEntitlementStore, FileEntitlementStore
+
+
+def legacy_get_user_data(csv_path, email):
+    """The original per-call CSV scan (views.get_user_data before the entitlement store)"""
+    try:
+        with open(csv_path, newline="") as csvfile:
+            sample = csvfile.read(1024)
+            csvfile.seek(0)
+            has_header = csv.Sniffer().has_header(sample)
+            if has_header:
+                reader = csv.DictReader(csvfile)
+                reader.fieldnames = [h.strip().lower() for h in reader.fieldnames]
+            else:
+                reader = csv.reader(csvfile)
+                for row in reader:
+                    if row[0].strip().lower() == email.strip().lower():
+                        return {"email": row[0].strip(), "type": row[1].strip().lower()}
+            for row in reader:
+                row = {k.strip().lower(): (v.strip() if v else v) for k, v in row.items()}
+                if row.get("email", "").lower() == email.strip().lower():
+                    return {"email": row["email"], "type": row.get("type", "").lower()}
+    except Exception as e:
+        print(f"❌ Error reading users.csv: {e}")
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark entitlement lookups: per-call CSV scan vs in-memory store vs indexed table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500000)
+        parser.add_argument('--legacy-repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "users.csv"
+            self._write(path, rows)
+            self.stdout.write(f"{rows:,} rows, {path.stat().st_size / 1e6:.1f} MB\n")
+
+            emails = {
+                "first row": "user0@example.com",
+                "last row": f"user{rows - 1}@example.com",
+                "not listed": "nobody@example.com",
+            }
+            results = []
+            for label, email in emails.items():
+                stats = time_call(lambda: legacy_get_user_data(path, email),
+                                  repeat=options['legacy_repeat'], warmup=1)
+                results.append([f"CSV scan per call, {label}", stats["p50_ms"], stats["p95_ms"]])
+
+            files = [{"PATH": path, "TYPE": None}]
+            store = FileEntitlementStore(files, check_interval=0)
+            start = time.perf_counter()
+            store.lookup("user0@example.com")
+            results.append(["file store, cold load", (time.perf_counter() - start) * 1000, ""])
+            for label, email in emails.items():
+                stats = time_call(lambda: store.lookup(email), repeat=2000)
+                results.append([f"file store, {label} (stat every call)", stats["p50_ms"], stats["p95_ms"]])
+
+            throttled = FileEntitlementStore(files, check_interval=2.0)
+            throttled.lookup("user0@example.com")
+            stats = time_call(lambda: throttled.lookup(emails["last row"]), repeat=2000)
+            results.append(["file store, last row (stat every 2 s)", stats["p50_ms"], stats["p95_ms"]])
+
+            os.utime(path)  # touched, same content: hash check only
+            results.append(["file store, touched file (rehash, background)", self._reload_ms(store), ""])
+
+            with open(path, "a") as f:
+                f.write("late@example.com,premium\n")
+            loads = store.loads
+            start = time.perf_counter()
+            stale = store.lookup("late@example.com")
+            results.append(["file store, lookup while reload starts", (time.perf_counter() - start) * 1000, ""])
+            results.append(["file store, changed file (background reload)", self._reload_ms(store), ""])
+            assert stale is None and store.loads == loads + 1
+            assert store.lookup("late@example.com")["type"] == "premium"
+
+            results.extend(self._database(files, emails))
+
+        self.stdout.write(format_table(["lookup", "p50_ms", "p95_ms"], results))
+
+    def _reload_ms(self, store):
+        """Time until a background reload kicked off by the next lookup has finished"""
+        start = time.perf_counter()
+        store.lookup("user0@example.com")
+        store._reload_lock.acquire()
+        store._reload_lock.release()
+        return (time.perf_counter() - start) * 1000
+
+    def _write(self, path, rows):
+        with open(path, "w", newline="") as f:
+            f.write("email,premium\n")
+            for i in range(rows):
+                f.write(f"user{i}@example.com,{'premium' if i % 3 == 0 else 'standard'}\n")
+
+    def _database(self, files, emails):
+        old_name = connection.settings_dict["NAME"]
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(ENTITLEMENTS={"FILES": files}):
+                start = time.perf_counter()
+                call_command("import_entitlements", stdout=open(os.devnull, "w"))
+                rows = [["import_entitlements", (time.perf_counter() - start) * 1000, ""]]
+            store = DatabaseEntitlementStore()
+            for label, email in emails.items():
+                stats = time_call(lambda: store.lookup(email), repeat=500)
+                rows.append([f"Entitlement table, {label}", stats["p50_ms"], stats["p95_ms"]])
+            return rows
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
@@ -0,0 +1,96 @@
+# chatbot/management/commands/bench_gemini_model.py
+"""
+Per-call client-side cost of a Gemini request: a new GenerativeModel and full prompt string
+on every call (old) vs the long-lived per-tier model with a system instruction (new).
+The real SDK builds and parses every request; only the network client is replaced by a stub.
+Usage: python manage.py bench_gemini_model --calls=2000
+"""
+
+import time
+import tracemalloc
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from chatbot import gemini_client
+from chatbot.benchmarking import format_table
+
+QUERY = "How do I write a UK CV?"
+
+
+class StubGenerativeClient:
+    """Answers generate_content requests locally with a canned response"""
+
+    def __init__(self, protos):
+        self.response = protos.GenerateContentResponse(candidates=[{
+            "content": {"role": "model", "parts": [{"text": "Here is some helpful advice."}]},
+            "finish_reason": 1,
+        }])
+
+    def generate_content(self, request, **kwargs):
+        return self.response
+
+
+class Command(BaseCommand):
+    help = 'Benchmark CPU time and allocations per Gemini call: per-call model vs per-tier model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=2000, help='Calls per round and variant')
+        parser.add_argument('--rounds', type=int, default=5, help='Alternating rounds (median CPU reported)')
+
+    def handle(self, *args, **options):
+        import google.generativeai as genai
+        from google.generativeai import client, protos
+
+        context = gemini_client.get_relevant_context(QUERY)
+        stub = StubGenerativeClient(protos)
+
+        def old_call():
+            model = genai.GenerativeModel(gemini_client.GEMINI_MODEL)
+            return model.generate_content(gemini_client.build_prompt(QUERY, False, context)).text
+
+        def new_call():
+            model = gemini_client.get_model(False)
+            return model.generate_content(gemini_client.build_request(QUERY, context)).text
+
+        variants = (("new model per call (old)", old_call), ("per-tier model (new)", new_call))
+        cpu = {label: [] for label, _ in variants}
+        rows = []
+        # Plain lambdas rather than Mocks, which would record (and retain) every call
+        with mock.patch.object(client, "get_default_generative_client", lambda: stub), \
+                mock.patch.object(gemini_client, "get_genai", lambda: genai):
+            for label, call in variants:
+                for _ in range(20):
+                    call()
+            # Alternate the variants so CPU frequency / cache drift hits both equally
+            for _ in range(options['rounds']):
+                for label, call in variants:
+                    cpu[label].append(self._cpu_per_call(call, options['calls']))
+            for label, call in variants:
+                samples = sorted(cpu[label])
+                rows.append([label, samples[len(samples) // 2]] + self._memory_per_call(call))
+
+        self.stdout.write(format_table(
+            ["variant", "cpu_us/call (median)", "peak_alloc_kb/call", "retained_bytes/call"], rows
+        ))
+
+    def _cpu_per_call(self, call, calls):
+        """Process CPU time per call in microseconds"""
+        start = time.process_time()
+        for _ in range(calls):
+            call()
+        return (time.process_time() - start) / calls * 1e6
+
+    def _memory_per_call(self, call, sample=200):
+        """[peak KB allocated during a call, bytes left allocated per call]"""
+        peaks = []
+        tracemalloc.start()
+        start_size, _ = tracemalloc.get_traced_memory()
+        for _ in range(sample):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        retained = tracemalloc.get_traced_memory()[0] - start_size
+        tracemalloc.stop()
+        return [sum(peaks) / sample / 1024, retained / sample]
@@ -0,0 +1,97 @@
+# chatbot/management/commands/bench_gemini_prompt.py
+"""
+Compare the full-document Gemini prompt against the retrieval-based prompt.
+Uses a stubbed model so no API calls are made.
+Usage: python manage.py bench_gemini_prompt --base-latency-ms=300 --ms-per-1k-tokens=40
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from chatbot import gemini_client
+from chatbot.benchmarking import FakeGenerativeModel, estimate_tokens, format_table, time_call
+from chatbot.retrieval import BM25Index
+
+SAMPLE_QUERIES = [
+    "How do I write a UK CV?",
+    "Can you help with visa sponsorship jobs?",
+    "Share the interview masterclass",
+    "How should I follow up after an interview?",
+    "What is the job tracker?",
+    "How do I improve my LinkedIn profile?",
+    "I want a cover letter template",
+    "How do I book a mentorship session?",
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark prompt size and latency: full training text vs retrieved chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-latency-ms', type=float, default=300.0,
+                            help='Fixed latency of the stubbed model per call')
+        parser.add_argument('--ms-per-1k-tokens', type=float, default=40.0,
+                            help='Extra stubbed latency per 1k input tokens')
+        parser.add_argument('--top-k', type=int, default=gemini_client.RETRIEVAL_TOP_K,
+                            help='Chunks retrieved per query')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='End-to-end runs per query and prompt style')
+
+    def handle(self, *args, **options):
+        model = FakeGenerativeModel(
+            base_latency_ms=options['base_latency_ms'],
+            ms_per_1k_input_tokens=options['ms_per_1k_tokens'],
+        )
+        top_k = options['top_k']
+        knowledge_base, index = gemini_client.get_corpus()
+        full_text = knowledge_base.full_text()
+
+        build_stats = time_call(lambda: BM25Index(knowledge_base.iter_chunks()), repeat=20)
+        self.stdout.write(
+            f"Training corpus: {len(full_text):,} chars, "
+            f"{len(index)} chunks, "
+            f"index build {build_stats['mean_ms']:.2f} ms (one-off per process)\n"
+        )
+
+        def full_prompt(query):
+            return gemini_client.build_prompt(query, False, full_text)
+
+        def rag_prompt(query):
+            return gemini_client.build_prompt(
+                query, False, gemini_client.get_relevant_context(query, top_k)
+            )
+
+        rows = []
+        totals = {"full": [0, 0.0], "rag": [0, 0.0]}
+        for query in SAMPLE_QUERIES:
+            for label, builder in (("full", full_prompt), ("rag", rag_prompt)):
+                prompt = builder(query)
+                tokens = estimate_tokens(prompt)
+                assembly = time_call(lambda: builder(query), repeat=200)['mean_ms']
+
+                elapsed = 0.0
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    model.generate_content(builder(query))
+                    elapsed += time.perf_counter() - start
+                e2e_ms = elapsed / options['repeat'] * 1000
+
+                totals[label][0] += tokens
+                totals[label][1] += e2e_ms
+                rows.append([query[:40], label, len(prompt), tokens, assembly, e2e_ms])
+
+        self.stdout.write(format_table(
+            ["query", "prompt", "chars", "~tokens", "assemble_ms", "end_to_end_ms"], rows
+        ))
+
+        n = len(SAMPLE_QUERIES)
+        full_tokens, full_ms = totals["full"][0] / n, totals["full"][1] / n
+        rag_tokens, rag_ms = totals["rag"][0] / n, totals["rag"][1] / n
+        self.stdout.write(self.style.SUCCESS(
+            f"\nAverage input tokens: {full_tokens:,.0f} -> {rag_tokens:,.0f} "
+            f"({100 * (1 - rag_tokens / full_tokens):.1f}% fewer)"
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Average end-to-end latency: {full_ms:,.1f} ms -> {rag_ms:,.1f} ms"
+        ))
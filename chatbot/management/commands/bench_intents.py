@@ -0,0 +1,105 @@
+# chatbot/management/commands/bench_intents.py
+"""
+Messages per second through intent detection: the original per-call keyword checks
+(meeting regexes re-looked-up on every call, cancel keyword loop, nested domain loop,
+duration regexes) vs the compiled classifier in chatbot/intents.py.
+Every message is also checked for identical results.
+Usage: python manage.py bench_intents --seconds=2
+"""
+
+import json
+import re
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from chatbot import intents
+from chatbot.benchmarking import format_table
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+
+# --- the original implementations, kept here as the baseline ---
+
+def legacy_is_meeting_request(message):
+    msg = message.lower().strip()
+    return any(re.search(p, msg) for p in intents.MEETING_PATTERNS)
+
+
+def legacy_is_cancel_request(message):
+    lower = message.lower()
+    return any(keyword in lower for keyword in intents.CANCEL_KEYWORDS)
+
+
+def legacy_detect_domain(message):
+    message_lower = message.lower()
+    for domain, keywords in intents.DOMAIN_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in message_lower:
+                return domain
+    return 'general'
+
+
+def legacy_extract_duration(message):
+    msg = message.lower()
+    match_min = re.search(r"(\d+)\s*(min|minutes?)", msg)
+    if match_min:
+        return int(match_min.group(1))
+    match_hr = re.search(r"(\d+)\s*(hour|hours?)", msg)
+    if match_hr:
+        return int(match_hr.group(1)) * 60
+    return 120
+
+
+def legacy_classify(message):
+    return intents.Intent(
+        is_meeting=legacy_is_meeting_request(message),
+        is_cancel=legacy_is_cancel_request(message),
+        domain=legacy_detect_domain(message),
+        duration=legacy_extract_duration(message),
+    )
+
+
+def load_messages():
+    messages = []
+    for name, field in (("intent_golden.jsonl", "message"), ("semantic_eval_questions.jsonl", "question")):
+        with open(DATA_DIR / name, encoding="utf-8") as f:
+            messages.extend(json.loads(line)[field] for line in f if line.strip())
+    return messages
+
+
+class Command(BaseCommand):
+    help = 'Benchmark intent detection throughput: original keyword checks vs compiled classifier'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=2.0, help='Measuring time per variant')
+
+    def handle(self, *args, **options):
+        messages = load_messages()
+        # Long messages (pasted CVs, job ads) dominate the cost of the keyword loops
+        messages += [" ".join(messages[i:i + 12]) for i in range(0, len(messages), 12)]
+
+        mismatches = [m for m in messages if legacy_classify(m) != intents.classify(m)]
+
+        rows = []
+        for label, fn in (("original checks", legacy_classify), ("compiled classifier", intents.classify)):
+            rate = self._rate(fn, messages, options['seconds'])
+            rows.append([label, rate, 1e6 / rate])
+        rows.append(["speed-up", rows[1][1] / rows[0][1], ""])
+
+        self.stdout.write(f"{len(messages)} messages, {len(mismatches)} with different results\n")
+        self.stdout.write(format_table(["variant", "messages/s", "us/message"], rows))
+        for message in mismatches[:10]:
+            self.stdout.write(f"  mismatch: {message!r}")
+
+    def _rate(self, fn, messages, seconds):
+        for message in messages:
+            fn(message)
+        done = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            for message in messages:
+                fn(message)
+            done += len(messages)
+        return done / (time.perf_counter() - start)
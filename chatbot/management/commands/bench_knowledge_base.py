@@ -0,0 +1,67 @@
+# chatbot/management/commands/bench_knowledge_base.py
+"""
+Compare worker boot cost of parsing the training PDFs against memory-mapping the built corpus.
+Each variant runs in a fresh interpreter so time and resident memory are measured in isolation (Linux /proc).
+Usage: python manage.py bench_knowledge_base --runs=5
+"""
+
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chatbot.benchmarking import format_table
+from chatbot.knowledge_base import build_knowledge_base
+
+PROBE = r"""
+import json, sys, time
+sys.path.insert(0, {base_dir!r})
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import django
+django.setup()
+def rss_kb():
+    with open("/proc/self/status") as fh:
+        return next(int(line.split()[1]) for line in fh if line.startswith("VmRSS"))
+rss_before = rss_kb()
+start = time.perf_counter()
+from chatbot.knowledge_base import extract_pdf_text, source_paths, KnowledgeBase
+from chatbot.retrieval import BM25Index, chunk_text
+if {mode!r} == "pdf":
+    text = "".join(extract_pdf_text(path) for path in source_paths())
+    index = BM25Index(chunk_text(text))
+else:
+    kb = KnowledgeBase.open()
+    index = BM25Index(kb.iter_chunks())
+elapsed = time.perf_counter() - start
+rss_after = rss_kb()
+print("RESULT " + json.dumps({{"seconds": elapsed, "rss_kb": rss_after - rss_before, "chunks": len(index)}}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark worker start-up: PyPDF2 extraction vs mmap corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters per variant')
+
+    def handle(self, *args, **options):
+        build_knowledge_base(log=lambda msg: None)
+
+        rows = []
+        for mode, label in (("pdf", "parse PDFs (old)"), ("mmap", "mmap corpus (new)")):
+            results = [self._probe(mode) for _ in range(options['runs'])]
+            seconds = sorted(r["seconds"] for r in results)[len(results) // 2]
+            rss_kb = sorted(r["rss_kb"] for r in results)[len(results) // 2]
+            rows.append([label, seconds * 1000, rss_kb / 1024, results[0]["chunks"]])
+
+        self.stdout.write(format_table(["variant", "load_ms (median)", "rss_growth_mb", "chunks"], rows))
+
+    def _probe(self, mode):
+        code = PROBE.format(base_dir=str(settings.BASE_DIR), mode=mode)
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                             cwd=str(settings.BASE_DIR), check=True).stdout
+        line = next(l for l in out.splitlines() if l.startswith("RESULT "))
+        return json.loads(line[len("RESULT "):])
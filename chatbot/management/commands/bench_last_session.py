@@ -0,0 +1,106 @@
+# chatbot/management/commands/bench_last_session.py
+"""
+The 7-day gap lookup (get_user_last_session_date, all mentors) against a local fake Calendar API
+(fake_calendar.py) with --mentors calendars of --events events each, on a temporary test database:
+    live scan        events.list with q= per mentor calendar, one after another
+    mirror           one indexed query on the local event mirror (calendar_mirror.py)
+plus the cost of keeping the mirror fresh: the first full sync, and an incremental sync
+after --changes events were edited.
+--latency adds a fixed delay to every fake response (network + Google's own time).
+Usage: python manage.py bench_last_session --mentors=6 --events=2000 --latency=0.05
+"""
+
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from chatbot import calendar_client
+from chatbot.benchmarking import format_table, time_call
+from chatbot.fake_calendar import FakeCalendarServer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the last-session lookup: live calendar scans vs the local event mirror'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mentors', type=int, default=6)
+        parser.add_argument('--events', type=int, default=2000, help='Events per mentor calendar (last 180 days)')
+        parser.add_argument('--changes', type=int, default=20, help='Events edited before the incremental sync')
+        parser.add_argument('--latency', type=float, default=0.05, help='Seconds added to every fake response')
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with FakeCalendarServer(latency=options['latency']) as server, tempfile.TemporaryDirectory() as tmp:
+                key_file = server.write_service_account(os.path.join(tmp, "service_account.json"))
+                mentors = {f"m{i}": {"email": f"mentor{i}@example.com", "calendar_id": f"mentor{i}@example.com"}
+                           for i in range(options['mentors'])}
+                self._seed(server, mentors, options['events'])
+                with server.patch_calendar_client(key_file), \
+                        mock.patch.dict(calendar_client.MENTOR_CONFIG, mentors, clear=True), \
+                        override_settings(CALENDAR_MIRROR={"ENABLED": True, "MAX_AGE": 900,
+                                                           "WINDOW_DAYS": 180, "PAGE_SIZE": 250}):
+                    self._run(server, mentors, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _seed(self, server, mentors, events):
+        rng = random.Random(3)
+        now = datetime.now(calendar_client.UK_TZ).replace(second=0, microsecond=0)
+        for mentor in mentors.values():
+            for _ in range(events):
+                start = now - timedelta(days=rng.randrange(1, 180), minutes=15 * rng.randrange(0, 32))
+                student = f"student{rng.randrange(500)}@example.com"
+                server.add_event(mentor["calendar_id"], start, start + timedelta(minutes=15), summary="Session",
+                                 attendees=[{"email": student, "responseStatus": "accepted"},
+                                            {"email": mentor["email"], "responseStatus": "accepted"}])
+
+    def _run(self, server, mentors, options):
+        def lookup():
+            return calendar_client.get_user_last_session_date("student7@example.com")
+
+        rows = []
+        before = server.requests["GET events"]
+        with override_settings(CALENDAR_MIRROR={"ENABLED": False}):
+            expected = lookup()
+            live = time_call(lookup, repeat=options['repeat'], warmup=0)
+        live_calls = (server.requests["GET events"] - before) / (options['repeat'] + 1)
+
+        start = time.perf_counter()
+        calendar_client.sync_event_mirror()
+        full_sync = time.perf_counter() - start
+        assert lookup() == expected, "mirror and live scan disagree"
+
+        before = server.requests["GET events"]
+        mirror = time_call(lookup, repeat=options['repeat'] * 10)
+        rows.append(["live scan", live["p50_ms"], live["p95_ms"], live_calls])
+        rows.append(["mirror", mirror["p50_ms"], mirror["p95_ms"], server.requests["GET events"] - before])
+        self.stdout.write(format_table(["lookup", "p50_ms", "p95_ms", "events.list calls/lookup"], rows))
+        self.stdout.write("")
+
+        rng = random.Random(5)
+        for mentor in mentors.values():
+            events = list(server.calendars[mentor["calendar_id"]])
+            for event_id in rng.sample(events, min(options['changes'], len(events))):
+                server.update_event(mentor["calendar_id"], event_id, summary="Moved")
+        before = server.requests["GET events"]
+        start = time.perf_counter()
+        results = calendar_client.sync_event_mirror()
+        incremental = time.perf_counter() - start
+        self.stdout.write(format_table(
+            ["sync", "seconds", "events.list calls", "events written"],
+            [["full (first run)", full_sync, "-", options['mentors'] * options['events']],
+             ["incremental", incremental, server.requests["GET events"] - before,
+              sum(r.get("changed", 0) for r in results.values())]],
+        ))
@@ -0,0 +1,114 @@
+# chatbot/management/commands/bench_mentor_domains.py
+"""
+Mentor lookup by domain on a temporary test database with many mentors and domains:
+    - picking a random mentor: chained icontains queries (old) vs the MentorDomain tags (new)
+    - listing a domain's mentors: Python substring loop over every mentor (old) vs the tags (new)
+    - the write-side cost: retagging one mentor on save, and everyone after a taxonomy edit
+Usage: python manage.py bench_mentor_domains --mentors=500 --domains=40
+"""
+
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from chatbot import taxonomy
+from chatbot.benchmarking import format_table, time_call
+from chatbot.models import Domain, Mentor
+
+
+# --- the original lookups, kept here as the baseline ---
+
+def legacy_random_mentor(domain, domain_keywords):
+    mentors = Mentor.objects.filter(is_active=True, expertise__iexact=domain).select_related('user')
+    if mentors.exists():
+        return random.choice(list(mentors))
+    mentors = Mentor.objects.filter(is_active=True, expertise__icontains=domain).select_related('user')
+    if mentors.exists():
+        return random.choice(list(mentors))
+    for keyword in domain_keywords.get(domain, []):
+        mentors = Mentor.objects.filter(is_active=True, expertise__icontains=keyword).select_related('user')
+        if mentors.exists():
+            return random.choice(list(mentors))
+    return any_mentor()
+
+
+def any_mentor():
+    return random.choice(list(Mentor.objects.filter(is_active=True).select_related('user')))
+
+
+def legacy_list_mentors(domain, domain_keywords):
+    keywords = domain_keywords.get(domain, [])
+    return [
+        m for m in Mentor.objects.filter(is_active=True).select_related("user")
+        if any(k in (m.expertise.lower() if m.expertise else "") for k in keywords)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark domain -> mentor lookups: icontains chains vs the precomputed tag table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mentors', type=int, default=500)
+        parser.add_argument('--domains', type=int, default=40, help='Synthetic domains added to the seeded ones')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._seed(options['mentors'], options['domains'])
+            self._run(options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _seed(self, mentors, domains):
+        rng = random.Random(42)
+        seeded = Domain.objects.count()
+        Domain.objects.bulk_create(
+            Domain(slug=f"field{i}", name=f"Field {i}", priority=seeded + i,
+                   keywords=[f"skill{i}-{k}" for k in range(8)])
+            for i in range(domains)
+        )
+        Domain.objects.create(slug="unstaffed", name="Unstaffed", priority=seeded + domains,
+                              keywords=[f"rare-{k}" for k in range(8)])
+        # field1 mentors only ever match its last keyword; nobody matches 'unstaffed'
+        phrases = [k for d in Domain.objects.exclude(slug="unstaffed") for k in d.keywords
+                   if not (d.slug == "field1" and k != d.keywords[-1])]
+        users = User.objects.bulk_create(User(username=f"mentor{i}", email=f"m{i}@example.com") for i in range(mentors))
+        Mentor.objects.bulk_create(
+            Mentor(user=u, expertise=", ".join(rng.sample(phrases, 2))) for u in users
+        )
+        taxonomy.retag_all()
+        self.stdout.write(f"{mentors} mentors, {Domain.objects.count()} domains\n")
+
+    def _run(self, repeat):
+        domain_keywords = dict(Domain.objects.values_list("slug", "keywords"))
+        # field1 is found by its last keyword only; unstaffed falls through every query
+        probes = ["marketing", "field0", "field1", "unstaffed"]
+        sample = Mentor.objects.first()
+
+        cases = []
+        for domain in probes:
+            cases.append((f"random mentor '{domain}', icontains chain",
+                          lambda d=domain: legacy_random_mentor(d, domain_keywords)))
+            cases.append((f"random mentor '{domain}', tags",
+                          lambda d=domain: taxonomy.random_mentor_for_domain(d) or any_mentor()))
+        for domain in probes[1:3]:
+            cases.append((f"list '{domain}', loop over all mentors",
+                          lambda d=domain: legacy_list_mentors(d, domain_keywords)))
+            cases.append((f"list '{domain}', tags", lambda d=domain: taxonomy.mentors_for_domain(d)))
+        cases.append(("retag one mentor (on save)", lambda: taxonomy.tag_mentor(sample)))
+        cases.append(("retag all (taxonomy edit)", taxonomy.retag_all))
+
+        rows = []
+        for label, fn in cases:
+            with CaptureQueriesContext(connection) as queries:
+                fn()
+            stats = time_call(fn, repeat=repeat if "retag all" not in label else 5)
+            rows.append([label, len(queries), stats["p50_ms"], stats["p95_ms"]])
+        self.stdout.write(format_table(["operation", "queries", "p50_ms", "p95_ms"], rows))
@@ -0,0 +1,145 @@
+# chatbot/management/commands/bench_metrics.py
+"""
+Overhead of MetricsMiddleware (and its per-query timer) on real endpoints, on a temporary test database.
+Rounds alternate with and without the middleware so drift on a busy machine hits both sides;
+the overhead is the median of the per-round p50 differences. Because that difference is close to
+the noise, the middleware and the query timer are also timed on their own, and their cost per
+request (middleware + queries x timer) is reported against the measured p50.
+Usage: python manage.py bench_metrics --rounds=10 --requests=200
+"""
+
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+
+from chatbot import metrics
+from chatbot.benchmarking import format_table, time_call
+from chatbot.models import Mentor, UserProfile
+
+ENDPOINTS = [
+    ("GET /api/test/", "get", "/api/test/", None),
+    ("POST /api/chat/ (booking)", "post", "/api/chat/", {"message": "Can I book a meeting?"}),
+    ("POST /api/book-slot/", "post", "/api/book-slot/", {}),
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure the request overhead of the /metrics instrumentation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per round and side')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            key = self._seed()
+            middleware_us, query_us = self._micro()
+            self._run(key, options['rounds'], options['requests'], middleware_us, query_us)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _seed(self):
+        user = User.objects.create_user("bench", "bench@example.com", "pw")
+        UserProfile.objects.create(user=user, is_premium=True)
+        for i in range(5):
+            Mentor.objects.create(user=User.objects.create_user(f"mentor{i}"), expertise="Data Science")
+        return Token.objects.create(user=user).key
+
+    def _client(self, key, instrumented):
+        middleware = [m for m in settings.MIDDLEWARE if m != "chatbot.metrics.MetricsMiddleware"]
+        if instrumented:
+            middleware.insert(0, "chatbot.metrics.MetricsMiddleware")
+        with override_settings(MIDDLEWARE=middleware):
+            client = Client(HTTP_AUTHORIZATION=f"Token {key}")
+            client.get("/api/test/")  # builds the middleware chain under these settings
+        return client
+
+    def _run(self, key, rounds, requests, middleware_us, query_us):
+        clients = {True: self._client(key, True), False: self._client(key, False)}
+        rows = []
+        for label, method, path, body in ENDPOINTS:
+            samples = {True: [], False: []}
+            queries = self._count_queries(clients[True], method, path, body)
+            for _ in range(rounds):
+                for instrumented in (False, True):
+                    self._query_timer(instrumented)
+                    client = clients[instrumented]
+                    call = getattr(client, method)
+                    stats = time_call(lambda: call(path, body, content_type="application/json"),
+                                      repeat=requests, warmup=5)
+                    samples[instrumented].append(stats["p50_ms"])
+            base = statistics.median(samples[False])
+            diffs = [with_ - without for with_, without in zip(samples[True], samples[False])]
+            overhead = statistics.median(diffs)
+            estimate_us = middleware_us + queries * query_us
+            rows.append([label, queries, base, statistics.median(samples[True]), overhead * 1000,
+                         overhead / base * 100, estimate_us, estimate_us / 1000 / base * 100])
+        self._query_timer(True)
+        self.stdout.write("\n" + format_table(
+            ["request", "queries", "p50_ms without", "p50_ms with", "measured_us", "measured_%",
+             "isolated_us", "isolated_%"], rows))
+
+    def _count_queries(self, client, method, path, body):
+        metrics.registry.reset()
+        getattr(client, method)(path, body, content_type="application/json")
+        return int(sum(h.sum for (family, _), h in metrics.registry._histograms.items()
+                       if family == "chatbot_db_queries_per_request"))
+
+    def _query_timer(self, enabled):
+        if enabled:
+            metrics.install_query_timer(connection)
+        elif metrics._time_query in connection.execute_wrappers:
+            connection.execute_wrappers.remove(metrics._time_query)
+
+    def _micro(self):
+        """(middleware us per request around a trivial view, timer us per query)"""
+        response = HttpResponse("ok")
+        request = RequestFactory().get("/api/test/")
+        request.resolver_match = resolve("/api/test/")
+        view = lambda r: response
+        middleware = metrics.MetricsMiddleware(view)
+        bare = time_call(lambda: view(request), repeat=20000)
+        wrapped = time_call(lambda: middleware(request), repeat=20000)
+
+        execute = lambda sql, params, many, context: None
+        request_metrics = metrics.RequestMetrics()
+        token = metrics._current.set(request_metrics)
+        try:
+            timed = time_call(lambda: metrics._time_query(execute, "SELECT 1", (), False, {}), repeat=20000)
+        finally:
+            metrics._current.reset(token)
+        direct = time_call(lambda: execute("SELECT 1", (), False, {}), repeat=20000)
+
+        registry = metrics.MetricsRegistry()
+        request_metrics.queries, request_metrics.db_time = 4, 0.0012
+        record = time_call(lambda: registry.record_request("chat", "POST", 200, request_metrics, 0.0042),
+                           repeat=20000)
+        for route in ("chat", "book_slot", "mentors", "schedule", "test"):
+            for _ in range(100):
+                registry.record_request(route, "POST", 200, request_metrics, 0.0042)
+        start = time.perf_counter()
+        text = registry.render()
+        render_ms = (time.perf_counter() - start) * 1000
+
+        middleware_us = (wrapped["p50_ms"] - bare["p50_ms"]) * 1000
+        query_us = (timed["p50_ms"] - direct["p50_ms"]) * 1000
+        self.stdout.write(format_table(["operation", "us"], [
+            ["middleware around a trivial view", middleware_us],
+            ["  of which record_request", record["p50_ms"] * 1000],
+            ["query timer, per query", query_us],
+            [f"render /metrics, 5 routes ({len(text.splitlines())} lines)", render_ms * 1000],
+        ]))
+        return middleware_us, query_us
@@ -0,0 +1,97 @@
+# chatbot/management/commands/bench_premium_sync.py
+"""
+Premium-status sync at scale, on a temporary test database:
+N users with profiles, an entitlement CSV for all of them, and --changed of them out of date.
+Times `sync_premium_status` (bulk) against saving the out-of-date profiles one by one,
+as the login path used to.
+Usage: python manage.py bench_premium_sync --users=100000 --changed=0.1
+"""
+
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from chatbot.benchmarking import format_table
+from chatbot.entitlements import FileEntitlementStore, sync_premium_status
+from chatbot.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the bulk premium-status sync against per-profile saves'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--changed', type=float, default=0.1, help='Share of profiles out of date')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / "users.csv"
+                self._seed(path, options['users'], options['changed'])
+                store = FileEntitlementStore([{"PATH": path, "TYPE": None}])
+                store.types()  # load outside the timings
+                self._run(store, options['batch_size'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _seed(self, path, users, changed):
+        rng = random.Random(7)
+        premium = [rng.random() < 0.3 for _ in range(users)]
+        with open(path, "w") as f:
+            f.write("email,type\n")
+            for i, is_premium in enumerate(premium):
+                f.write(f"user{i}@example.com,{'premium' if is_premium else 'standard'}\n")
+
+        created = User.objects.bulk_create(
+            (User(username=f"user{i}", email=f"user{i}@example.com") for i in range(users)), batch_size=5000
+        )
+        UserProfile.objects.bulk_create(
+            (UserProfile(user=u, is_premium=p if rng.random() >= changed else not p)
+             for u, p in zip(created, premium)),
+            batch_size=5000,
+        )
+        self.stdout.write(f"{users:,} users, ~{changed:.0%} out of date\n")
+
+    def _run(self, store, batch_size):
+        rows = []
+
+        start = time.perf_counter()
+        counts = sync_premium_status(batch_size, dry_run=True, store=store)
+        rows.append(["diff only (--dry-run)", time.perf_counter() - start, counts["promoted"] + counts["demoted"]])
+
+        # The old way: one SELECT + save() per out-of-date profile (sampled, then extrapolated)
+        types = store.types()
+        stale = [
+            p for p in UserProfile.objects.select_related("user").iterator(chunk_size=5000)
+            if p.is_premium != (types.get(p.user.email) == "premium")
+        ]
+        sample = stale[:1000]
+        start = time.perf_counter()
+        for profile in sample:
+            fresh = UserProfile.objects.get(user_id=profile.user_id)
+            fresh.save()  # same write, value left stale for the bulk run below
+        per_row = (time.perf_counter() - start) / max(1, len(sample))
+        rows.append([f"save() per profile (extrapolated from {len(sample)})", per_row * len(stale), len(stale)])
+
+        start = time.perf_counter()
+        counts = sync_premium_status(batch_size, store=store)
+        rows.append([f"bulk sync (batch {batch_size})", time.perf_counter() - start,
+                     counts["promoted"] + counts["demoted"]])
+
+        start = time.perf_counter()
+        counts = sync_premium_status(batch_size, store=store)
+        rows.append(["second sync (nothing to do)", time.perf_counter() - start,
+                     counts["promoted"] + counts["demoted"]])
+
+        self.stdout.write(format_table(["run", "seconds", "profiles changed"], rows))
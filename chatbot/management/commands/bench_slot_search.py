@@ -0,0 +1,102 @@
+# chatbot/management/commands/bench_slot_search.py
+"""
+Slot-search throughput at each logging level.
+find_next_available_15min_slot() and get_next_available_slots_for_user() run against a synthetic
+calendar (get_busy_intervals / calculate_earliest_next_session patched, so no Google calls) where
+almost every slot is busy, which is the case that used to print a line per slot.
+"DEBUG" writes every per-slot line, like the old print() calls did; "INFO" is the default and
+writes the one-line summaries; "off" is the chatbot logger above CRITICAL.
+Lines go to /dev/null, so the numbers leave out the cost of a real stdout/stderr pipe under gunicorn.
+Usage: python manage.py bench_slot_search --repeat=300
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from chatbot import calendar_client
+from chatbot.availability import BusyIntervals
+from chatbot.benchmarking import format_table, time_call
+from chatbot.logs import JsonFormatter
+
+START = datetime(2025, 3, 3, 8, 0, tzinfo=calendar_client.UK_TZ)  # a Monday, before the first slot
+
+LEVELS = [
+    ("DEBUG (json)", logging.DEBUG, JsonFormatter()),
+    ("DEBUG (text)", logging.DEBUG, logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")),
+    ("INFO (json)", logging.INFO, JsonFormatter()),
+    ("off", logging.CRITICAL + 1, JsonFormatter()),
+]
+
+
+def busy_all_day(mentor_emails, start, end):
+    return {email: BusyIntervals([(start, end)]) for email in mentor_emails}
+
+
+def busy_but_last_slot(mentor_emails, start, end):
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    return {email: BusyIntervals([(day, day + timedelta(hours=7, minutes=45)) for day in days])
+            for email in mentor_emails}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark slot-search throughput with per-slot DEBUG logging on and off'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=300)
+
+    def handle(self, *args, **options):
+        searches = [
+            ("find_next_available_15min_slot (4 busy days)", busy_all_day,
+             lambda: calendar_client.find_next_available_15min_slot("mentor@example.com", after=START)),
+            ("get_next_available_slots_for_user (5 slots)", busy_but_last_slot,
+             lambda: calendar_client.get_next_available_slots_for_user("student@example.com", 5,
+                                                                        "mentor@example.com")),
+        ]
+        chatbot_logger = logging.getLogger("chatbot")
+        saved_handlers, saved_level = chatbot_logger.handlers[:], chatbot_logger.level
+        rows = []
+        with open(os.devnull, "w") as sink, \
+                mock.patch.object(calendar_client, "calculate_earliest_next_session", return_value=START):
+            handler = logging.StreamHandler(sink)
+            chatbot_logger.handlers = [handler]
+            try:
+                for label, busy, search in searches:
+                    baseline = None
+                    with mock.patch.object(calendar_client, "get_busy_intervals", busy):
+                        for level_name, level, formatter in LEVELS:
+                            handler.setFormatter(formatter)
+                            chatbot_logger.setLevel(level)
+                            lines = self._count_lines(chatbot_logger, search)
+                            stats = time_call(search, repeat=options['repeat'], warmup=10)
+                            per_second = 1000 / stats["mean_ms"]
+                            baseline = baseline or per_second
+                            rows.append([label, level_name, lines, stats["p50_ms"] * 1000, per_second,
+                                         per_second / baseline])
+            finally:
+                chatbot_logger.handlers = saved_handlers
+                chatbot_logger.setLevel(saved_level)
+
+        self.stdout.write(format_table(
+            ["search", "logging", "lines/search", "p50_us", "searches/s", "vs DEBUG (json)"], rows))
+
+    def _count_lines(self, chatbot_logger, search):
+        counter = _Counter()
+        chatbot_logger.addHandler(counter)
+        try:
+            search()
+        finally:
+            chatbot_logger.removeHandler(counter)
+        return counter.count
+
+
+class _Counter(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
@@ -0,0 +1,54 @@
+# chatbot/management/commands/bench_startup.py
+"""
+Measure process start-up cost of `import chatbot.views` and `manage.py check`
+with eager (GEMINI_EAGER_INIT=1, the old import-time behaviour) and lazy initialisation.
+Usage: python manage.py bench_startup --runs=5
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chatbot.benchmarking import format_table
+
+IMPORT_VIEWS = (
+    "import os, django; "
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings'); "
+    "django.setup(); import chatbot.views"
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark import/check start-up time with eager vs lazy Gemini initialisation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh processes per measurement')
+
+    def handle(self, *args, **options):
+        targets = [
+            ("import chatbot.views", [sys.executable, "-c", IMPORT_VIEWS]),
+            ("manage.py check", [sys.executable, "manage.py", "check"]),
+        ]
+
+        rows = []
+        for label, cmd in targets:
+            eager = self._median(cmd, options['runs'], eager=True)
+            lazy = self._median(cmd, options['runs'], eager=False)
+            rows.append([label, eager, lazy, eager - lazy])
+
+        self.stdout.write(format_table(["command", "eager_ms", "lazy_ms", "saved_ms"], rows))
+
+    def _median(self, cmd, runs, eager):
+        env = dict(os.environ, GEMINI_EAGER_INIT="1" if eager else "0")
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(cmd, cwd=str(settings.BASE_DIR), env=env, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        return samples[len(samples) // 2]
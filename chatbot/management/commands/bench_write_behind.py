@@ -0,0 +1,104 @@
+# chatbot/management/commands/bench_write_behind.py
+"""
+Insert throughput of chat-history rows: one synchronous INSERT per turn vs the
+write-behind buffer, with several request threads writing at once.
+Runs against a temporary file-backed SQLite database so commit/lock costs are real.
+Usage: python manage.py bench_write_behind --threads=8 --rows=2000
+"""
+
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from chatbot.benchmarking import format_table
+from chatbot.models import ChatHistory
+from chatbot.write_behind import WriteBehindBuffer
+
+REPLY = "A UK CV is usually two pages and opens with a short personal profile. " * 6
+
+
+class Command(BaseCommand):
+    help = 'Benchmark synchronous ChatHistory inserts against batched write-behind inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent request threads')
+        parser.add_argument('--rows', type=int, default=2000, help='Rows written per thread')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--flush-interval-ms', type=float, default=200)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        tmp_dir = tempfile.mkdtemp(prefix="bench_write_behind_")
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tmp_dir, "bench.sqlite3")
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = User.objects.create_user("bench-writer")
+            rows = []
+
+            def sync_insert(n):
+                ChatHistory.objects.create(user=user, message=f"q{n}", response=REPLY)
+
+            rows.append(["synchronous INSERT"] + self._run(sync_insert, None, options))
+
+            buffer = WriteBehindBuffer(
+                batch_size=options['batch_size'],
+                flush_interval_ms=options['flush_interval_ms'],
+                max_pending=options['threads'] * options['rows'],
+            )
+
+            def buffered_insert(n):
+                buffer.add(ChatHistory(user=user, message=f"q{n}", response=REPLY))
+
+            rows.append([f"write-behind (batch {options['batch_size']})"] + self._run(buffered_insert, buffer, options))
+            buffer.close()
+
+            self.stdout.write(format_table(
+                ["variant", "rows", "rows/s (until durable)", "call_p50_ms", "call_p95_ms"], rows
+            ))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _run(self, insert, buffer, options):
+        latencies = []
+        lock = threading.Lock()
+
+        def worker(offset):
+            local = []
+            for n in range(options['rows']):
+                start = time.perf_counter()
+                insert(offset + n)
+                local.append((time.perf_counter() - start) * 1000)
+            with lock:
+                latencies.extend(local)
+            connections.close_all()
+
+        before = ChatHistory.objects.count()
+        threads = [threading.Thread(target=worker, args=(i * options['rows'],)) for i in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if buffer is not None:
+            buffer.flush()
+        elapsed = time.perf_counter() - start
+
+        written = ChatHistory.objects.count() - before
+        latencies.sort()
+        return [
+            written,
+            written / elapsed,
+            statistics.median(latencies),
+            latencies[int(len(latencies) * 0.95)],
+        ]
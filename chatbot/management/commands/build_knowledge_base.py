@@ -0,0 +1,34 @@
+# chatbot/management/commands/build_knowledge_base.py
+"""
+Extract all training PDFs (ukjobs*.pdf) into the memory-mapped knowledge base.
+Only sources whose content hash changed are re-extracted.
+Usage: python manage.py build_knowledge_base [--force]
+"""
+
+from django.core.management.base import BaseCommand
+
+from chatbot.knowledge_base import KNOWLEDGE_BASE_DIR, build_knowledge_base
+
+
+class Command(BaseCommand):
+    help = 'Build the on-disk training corpus used by the chatbot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-extract every PDF even if unchanged')
+        parser.add_argument('--dir', type=str, default=None,
+                            help=f'Output directory (default: {KNOWLEDGE_BASE_DIR})')
+
+    def handle(self, *args, **options):
+        manifest, rebuilt = build_knowledge_base(
+            options['dir'], force=options['force'], log=self.stdout.write
+        )
+
+        for source in manifest['sources']:
+            start, end = source['offset']
+            note = f" (duplicate of {source['duplicate_of']})" if source.get('duplicate_of') else ""
+            self.stdout.write(f"  {source['name']:<14} {source['sha256'][:12]}  {end - start:>8,} bytes{note}")
+
+        if rebuilt:
+            self.stdout.write(self.style.SUCCESS(f"Corpus rebuilt: {manifest['content_hash'][:12]}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('No source changes - corpus left as is'))
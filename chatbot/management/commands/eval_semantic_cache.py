@@ -0,0 +1,97 @@
+# chatbot/management/commands/eval_semantic_cache.py
+"""
+Offline evaluation of the semantic reply cache.
+Replays a labelled question log (JSON lines: {"question": ..., "intent": ...}) in order
+through a fresh cache for each threshold, with plain TF and with corpus-fitted TF-IDF
+weighting, and reports:
+    hit rate        share of questions answered from the cache
+    false reuse     share of hits whose cached question had a different intent
+    missed reuse    questions whose intent had been answered before but did not hit
+    latency saved   hits x Gemini latency, minus the time spent on lookups
+Usage: python manage.py eval_semantic_cache --threshold 0.7 0.8 0.9 [--log questions.jsonl]
+"""
+
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.benchmarking import format_table
+from chatbot.gemini_client import get_corpus
+from chatbot.semantic_cache import DEFAULT_CONFIG, HashedTfidfVectorizer, SemanticCache
+
+DEFAULT_LOG = Path(__file__).resolve().parents[2] / "data" / "semantic_eval_questions.jsonl"
+
+
+class Command(BaseCommand):
+    help = 'Replay a labelled question log through the semantic cache at several thresholds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', type=str, default=str(DEFAULT_LOG), help='JSON-lines question log')
+        parser.add_argument('--threshold', type=float, nargs='+', default=[0.6, 0.7, 0.8, 0.9])
+        parser.add_argument('--gemini-latency-ms', type=float, default=1500.0,
+                            help='Average Gemini round trip avoided by a hit')
+
+    def handle(self, *args, **options):
+        questions = self._load(options['log'])
+
+        knowledge_base, _ = get_corpus()
+        vectorizers = [
+            ("tf", HashedTfidfVectorizer(DEFAULT_CONFIG["DIMENSIONS"])),
+            ("tf-idf", HashedTfidfVectorizer(DEFAULT_CONFIG["DIMENSIONS"]).fit(knowledge_base.iter_chunks())),
+        ]
+
+        rows = []
+        for label, vectorizer in vectorizers:
+            for threshold in options['threshold']:
+                rows.append([label] + self._replay(questions, vectorizer, threshold, options['gemini_latency_ms']))
+
+        self.stdout.write(f"{len(questions)} questions, {len({i for _, i in questions})} intents\n")
+        self.stdout.write(format_table(
+            ["weights", "threshold", "hits", "hit_rate", "false_reuse", "false_rate", "missed_reuse",
+             "lookup_ms (mean)", "saved_s"],
+            rows,
+        ))
+
+    def _load(self, path):
+        try:
+            with open(path, encoding="utf-8") as fh:
+                entries = [json.loads(line) for line in fh if line.strip()]
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read question log {path}: {e}")
+        return [(entry["question"], entry["intent"]) for entry in entries]
+
+    def _replay(self, questions, vectorizer, threshold, gemini_latency_ms):
+        cache = SemanticCache(vectorizer, threshold, max_entries=len(questions))
+        seen_intents = set()
+        hits = false_hits = missed = 0
+        lookup_seconds = 0.0
+
+        for question, intent in questions:
+            start = time.perf_counter()
+            match = cache.lookup(question, False)
+            lookup_seconds += time.perf_counter() - start
+
+            if match is not None:
+                hits += 1
+                # The stored "reply" is the intent label of the question that produced it
+                if match.reply != intent:
+                    false_hits += 1
+            else:
+                if intent in seen_intents:
+                    missed += 1
+                cache.add(question, False, intent)
+            seen_intents.add(intent)
+
+        saved = hits * gemini_latency_ms / 1000 - lookup_seconds
+        return [
+            threshold,
+            hits,
+            hits / len(questions),
+            false_hits,
+            (false_hits / hits) if hits else 0.0,
+            missed,
+            lookup_seconds / len(questions) * 1000,
+            saved,
+        ]
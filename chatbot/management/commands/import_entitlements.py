@@ -0,0 +1,50 @@
+# chatbot/management/commands/import_entitlements.py
+"""
+Load the entitlement CSV files (settings.ENTITLEMENTS['FILES']) into the Entitlement table,
+for ENTITLEMENTS['BACKEND'] = "db". Existing emails are updated in place.
+Usage: python manage.py import_entitlements [--prune] [--batch-size=5000]
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from chatbot.entitlements import load_config, parse_entitlements
+from chatbot.models import Entitlement
+
+
+class Command(BaseCommand):
+    help = 'Import the entitlement CSV files into the Entitlement table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true', help='Delete emails no longer in any file')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        records = {}
+        for entry in load_config()["FILES"]:
+            path = Path(entry["PATH"])
+            if not path.exists():
+                raise CommandError(f"{path} not found")
+            parsed = parse_entitlements(path.read_text(encoding="utf-8-sig"), entry.get("TYPE"))
+            for key, (_, kind) in parsed.items():
+                records.setdefault(key, (kind, path.name))
+            self.stdout.write(f"  {path.name}: {len(parsed):,} emails")
+
+        now = timezone.now()
+        rows = [Entitlement(email=key, type=kind, source=source, updated_at=now)
+                for key, (kind, source) in records.items()]
+        with transaction.atomic():
+            Entitlement.objects.bulk_create(
+                rows, batch_size=options['batch_size'],
+                update_conflicts=True, unique_fields=["email"], update_fields=["type", "source", "updated_at"],
+            )
+            pruned = 0
+            if options['prune']:
+                pruned, _ = Entitlement.objects.filter(updated_at__lt=now).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(rows):,} entitlements" + (f", pruned {pruned:,}" if options['prune'] else "")
+        ))
@@ -0,0 +1,105 @@
+# chatbot/management/commands/loadtest_chat.py
+"""
+Load test of the chat endpoint: sync ChatView under WSGI vs AsyncChatView under ASGI.
+
+Every request goes through the full Django stack (middleware, token auth, ORM) against a
+temporary test database; Gemini is replaced by a fake model with configurable latency.
+WSGI capacity is modelled as a pool of --threads (gunicorn workers x threads); the ASGI
+application runs every request on one event loop, like a single uvicorn worker.
+Usage: python manage.py loadtest_chat --requests=300 --latency-ms=2000 --threads=8
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.authtoken.models import Token
+
+from chatbot import gemini_client, views
+from chatbot.benchmarking import FakeGenAI, FakeGenerativeModel, format_table
+from chatbot.models import UserProfile
+
+MESSAGE = json.dumps({"message": "How do I get the most out of the job tracker?"})
+
+
+class Command(BaseCommand):
+    help = 'Compare in-flight chat capacity of WSGI (thread per request) and ASGI (async view)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Requests fired at once')
+        parser.add_argument('--latency-ms', type=float, default=2000.0, help='Fake Gemini latency')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='WSGI request threads (gunicorn workers x threads)')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = User.objects.create_user("loadtest", "loadtest@example.com", "loadtest")
+            UserProfile.objects.create(user=user, is_premium=True)
+            auth = f"Token {Token.objects.create(user=user).key}"
+            gemini_client.get_corpus()  # one-off load, not part of any request
+
+            rows = []
+            for label, capacity, runner in (
+                ("WSGI ChatView", f"{options['threads']} threads", self._run_wsgi),
+                ("ASGI AsyncChatView", "1 event loop", self._run_asgi),
+            ):
+                model = FakeGenerativeModel(base_latency_ms=options['latency_ms'], ms_per_1k_input_tokens=0)
+                with mock.patch.object(gemini_client, "get_genai", return_value=FakeGenAI(model)), \
+                        mock.patch.object(views, "get_cached_reply", return_value=None), \
+                        mock.patch.object(views, "store_reply"):
+                    start = time.perf_counter()
+                    latencies, statuses = runner(auth, options)
+                    wall = time.perf_counter() - start
+
+                latencies.sort()
+                errors = sum(1 for status in statuses if status != 200)
+                rows.append([
+                    label, capacity, len(latencies), errors, model.peak_in_flight, wall,
+                    len(latencies) / wall, latencies[len(latencies) // 2],
+                    latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                ])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(format_table(
+            ["server", "capacity", "requests", "errors", "peak_in_flight", "wall_s", "req/s",
+             "p50_s", "p95_s"],
+            rows,
+        ))
+
+    def _run_wsgi(self, auth, options):
+        def one_request(start):
+            response = Client().post("/api/chat/", MESSAGE, content_type="application/json",
+                                     HTTP_AUTHORIZATION=auth)
+            return time.perf_counter() - start, response.status_code
+
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            start = time.perf_counter()
+            results = list(pool.map(one_request, [start] * options['requests']))
+        return [r[0] for r in results], [r[1] for r in results]
+
+    def _run_asgi(self, auth, options):
+        async def one_request(client, start):
+            # AsyncClient takes raw header names, not WSGI META keys
+            response = await client.post("/api/chat/async/", MESSAGE, content_type="application/json",
+                                         authorization=auth)
+            return time.perf_counter() - start, response.status_code
+
+        async def run():
+            client = AsyncClient()
+            start = time.perf_counter()
+            return await asyncio.gather(*(one_request(client, start) for _ in range(options['requests'])))
+
+        results = asyncio.run(run())
+        return [r[0] for r in results], [r[1] for r in results]
@@ -0,0 +1,52 @@
+# chatbot/management/commands/profile_report.py
+"""
+Hottest frames across the profiles ProfilingMiddleware wrote to settings.PROFILING['DIRECTORY'].
+"self" is time with the frame on top of the stack (where the time actually went: a socket read,
+SQLite waiting on a lock, Python code); "total" includes everything the frame called.
+--sign prints a value for the X-Profile header that profiles a single request on demand:
+    curl -H "X-Profile: $(python manage.py profile_report --sign)" ...
+Usage: python manage.py profile_report [--top=25] [--route=book_slot] [--dir=profiles]
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.benchmarking import format_table
+from chatbot.profiling import hot_frames, iter_profile_paths, load_config, profile_directory, read_profile, sign_header
+
+
+class Command(BaseCommand):
+    help = 'Aggregate the top hot frames across captured request profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Profile directory (default: settings.PROFILING DIRECTORY)')
+        parser.add_argument('--top', type=int, default=25)
+        parser.add_argument('--route', help='Only profiles whose route contains this, e.g. book_slot')
+        parser.add_argument('--sign', action='store_true', help='Print a signed X-Profile header value and exit')
+
+    def handle(self, *args, **options):
+        if options['sign']:
+            self.stdout.write(sign_header())
+            return
+
+        directory = Path(options['dir']) if options['dir'] else profile_directory(load_config())
+        if not directory.is_dir():
+            raise CommandError(f"No profile directory at {directory}")
+        paths = list(iter_profile_paths(directory))
+        own, inclusive, routes = hot_frames((read_profile(p) for p in paths), options['route'])
+        total = sum(routes.values())
+        if not total:
+            self.stdout.write(f"No samples in {len(paths)} profile(s) under {directory}")
+            return
+
+        self.stdout.write(f"{len(paths)} profile(s), {total:,} samples, {directory}\n")
+        self.stdout.write(format_table(
+            ["route", "samples", "%"],
+            [[route, count, count / total * 100] for route, count in routes.most_common()],
+        ) + "\n")
+        self.stdout.write(format_table(
+            ["frame", "self", "self %", "total %"],
+            [[frame, count, count / total * 100, inclusive[frame] / total * 100]
+             for frame, count in own.most_common(options['top'])],
+        ))
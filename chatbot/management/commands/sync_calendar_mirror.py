@@ -0,0 +1,46 @@
+# chatbot/management/commands/sync_calendar_mirror.py
+"""
+Sync the local calendar event mirror (chatbot/calendar_mirror.py) with Google Calendar.
+The first run per calendar lists WINDOW_DAYS of events; later runs fetch only the changes
+since the stored sync token. Run it from cron, or as a long-running worker:
+Usage: python manage.py sync_calendar_mirror [--full] [--mentor=EMAIL ...] [--interval=60]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from chatbot.calendar_client import sync_event_mirror
+
+
+class Command(BaseCommand):
+    help = 'Incrementally sync mentor calendar events into the local mirror tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Ignore stored sync tokens and list everything again')
+        parser.add_argument('--mentor', action='append', dest='mentors',
+                            help='Mentor email to sync (repeatable; default: every mentor)')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Repeat every N seconds (0 = run once)')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            start = time.perf_counter()
+            results = sync_event_mirror(options['mentors'], full=full)
+            elapsed = time.perf_counter() - start
+            for calendar_id, result in results.items():
+                if "error" in result:
+                    self.stderr.write(self.style.ERROR(f"{calendar_id}: {result['error']}"))
+                else:
+                    kind = "full" if result["full"] else "incremental"
+                    self.stdout.write(f"{calendar_id}: {result['changed']:,} changed, "
+                                      f"{result['deleted']:,} deleted ({kind})")
+            self.stdout.write(self.style.SUCCESS(f"Calendar mirror synced ({elapsed:.2f}s)"))
+
+            if not options['interval']:
+                return
+            full = False  # --full applies to the first pass only
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,38 @@
+# chatbot/management/commands/sync_premium_status.py
+"""
+Apply the entitlement source (users.csv or the Entitlement table) to UserProfile.is_premium
+in bulk, so signup is the only request that writes premium status.
+Run it after changing the entitlement files, from cron, or as a long-running worker:
+Usage: python manage.py sync_premium_status [--dry-run] [--interval=300]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from chatbot.entitlements import sync_premium_status
+
+
+class Command(BaseCommand):
+    help = 'Sync UserProfile.is_premium with the entitlement source using bulk updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Profiles per UPDATE')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without writing them')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Repeat every N seconds (0 = run once)')
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            counts = sync_premium_status(options['batch_size'], options['dry_run'])
+            elapsed = time.perf_counter() - start
+            summary = ", ".join(f"{name} {count:,}" for name, count in counts.items())
+            prefix = "[dry run] " if options['dry_run'] else ""
+            self.stdout.write(self.style.SUCCESS(f"{prefix}Premium sync: {summary} ({elapsed:.2f}s)"))
+
+            if not options['interval']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
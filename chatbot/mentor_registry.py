@@ -0,0 +1,224 @@
+# chatbot/mentor_registry.py
+"""
+Process-local registry of active mentors.
+
+The mentor listing endpoints and the chat's mentor picker read an immutable
+snapshot (id, names, email, expertise, domain tags) instead of querying
+Mentor + User on every request. The snapshot is rebuilt lazily, with two
+queries, after chatbot/signals.py invalidates it (Mentor, mentor User,
+Domain changes, applied after the transaction commits).
+
+Other worker processes don't see those signals. With VERSION_STAMP on, every
+invalidation also bumps a version stamp in a Django cache shared by all
+workers (see chatbot/version_stamp.py), and each process compares its
+snapshot against it at most every CHECK_INTERVAL seconds. The stamp is
+ignored, with a warning, when CACHE_ALIAS is a per-process cache. Whatever
+the stamp says, a snapshot is rebuilt once it is MAX_AGE seconds old, so a
+missed or evicted stamp leaves other workers stale for a bounded time only.
+
+Configured through settings.MENTOR_REGISTRY:
+    VERSION_STAMP   share invalidations across processes through the cache
+    CACHE_ALIAS     Django cache alias holding the version stamp
+    CHECK_INTERVAL  seconds between version checks
+    MAX_AGE         seconds before a snapshot is rebuilt regardless (0: never)
+"""
+
+import logging
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import version_stamp as stamps
+from .models import Mentor, MentorDomain
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    "VERSION_STAMP": True,
+    "CACHE_ALIAS": "shared",
+    "CHECK_INTERVAL": 1.0,
+    "MAX_AGE": 5.0,
+}
+
+VERSION_KEY = "chatbot:mentor_registry:version"
+
+
+@dataclass(frozen=True)
+class MentorEntry:
+    id: int
+    user_id: int
+    username: str
+    display_name: str  # Mentor.get_display_name()
+    email: str
+    expertise: Optional[str]
+    is_head_mentor: bool
+    domains: Tuple[Tuple[str, int], ...]  # (domain slug, match rank), best first
+
+
+class MentorSnapshot:
+    """Immutable view of the active mentors, sorted by username"""
+
+    def __init__(self, entries, version=None):
+        self.entries = tuple(entries)
+        self.version = version
+        self.by_id = MappingProxyType({e.id: e for e in self.entries})
+        self.user_ids = frozenset(e.user_id for e in self.entries)
+        by_domain = {}
+        for entry in self.entries:
+            for slug, rank in entry.domains:
+                by_domain.setdefault(slug, []).append((rank, entry))
+        self._by_domain = MappingProxyType({
+            slug: tuple(sorted(tags, key=lambda t: (t[0], t[1].id))) for slug, tags in by_domain.items()
+        })
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def get(self, mentor_id) -> Optional[MentorEntry]:
+        return self.by_id.get(mentor_id)
+
+    def in_domain(self, domain: str) -> Tuple[MentorEntry, ...]:
+        """Mentors tagged with the domain, best match first"""
+        return tuple(entry for _, entry in self._by_domain.get(domain, ()))
+
+    def random_in_domain(self, domain: str) -> Optional[MentorEntry]:
+        """A random mentor among the domain's best matches"""
+        tags = self._by_domain.get(domain)
+        if not tags:
+            return None
+        return random.choice([entry for rank, entry in tags if rank == tags[0][0]])
+
+    def random(self) -> Optional[MentorEntry]:
+        return random.choice(self.entries) if self.entries else None
+
+
+def load_snapshot(version=None) -> MentorSnapshot:
+    """Read the active mentors and their domain tags (two queries)"""
+    tags = {}
+    for mentor_id, slug, rank in (
+        MentorDomain.objects.filter(mentor__is_active=True)
+        .order_by("rank", "domain__priority")
+        .values_list("mentor_id", "domain__slug", "rank")
+    ):
+        tags.setdefault(mentor_id, []).append((slug, rank))
+
+    entries = [
+        MentorEntry(
+            id=m.id,
+            user_id=m.user_id,
+            username=m.user.username,
+            display_name=m.get_display_name(),
+            email=m.user.email,
+            expertise=m.expertise,
+            is_head_mentor=m.is_head_mentor,
+            domains=tuple(tags.get(m.id, ())),
+        )
+        for m in Mentor.objects.filter(is_active=True).select_related("user").order_by("user__username")
+    ]
+    return MentorSnapshot(entries, version)
+
+
+class MentorRegistry:
+
+    def __init__(self, version_stamp: bool = False, cache_alias: str = "shared", check_interval: float = 1.0,
+                 max_age: float = 0):
+        self.version_stamp = version_stamp
+        self.cache_alias = cache_alias
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self.rebuilds = 0
+        self._snapshot = None
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> MentorSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and not self._stale(snapshot):
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot is snapshot:
+                version = self._shared_version()
+                self._snapshot = load_snapshot(version)
+                self._built_at = self._checked_at = time.monotonic()
+                self.rebuilds += 1
+            return self._snapshot
+
+    async def asnapshot(self) -> MentorSnapshot:
+        """snapshot() for async views; only a rebuild leaves the event loop"""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and not self._expired(now) and (
+            not self.version_stamp or now - self._checked_at < self.check_interval
+        ):
+            return snapshot
+        return await sync_to_async(self.snapshot)()
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+        if self.version_stamp:
+            stamps.bump(self.cache_alias, VERSION_KEY)
+
+    def contains_user(self, user_id) -> Optional[bool]:
+        """Is the user an active mentor? None when no snapshot is loaded"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return user_id in snapshot.user_ids
+
+    def _shared_version(self):
+        if not self.version_stamp:
+            return None
+        return stamps.read(self.cache_alias, VERSION_KEY)
+
+    def _expired(self, now) -> bool:
+        return self.max_age > 0 and now - self._built_at >= self.max_age
+
+    def _stale(self, snapshot) -> bool:
+        now = time.monotonic()
+        if self._expired(now):
+            return True
+        if not self.version_stamp or now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = time.monotonic()
+        return self._shared_version() != snapshot.version
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_mentor_registry() -> MentorRegistry:
+    """Process-wide registry built from settings.MENTOR_REGISTRY"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                config = {**DEFAULT_CONFIG, **getattr(settings, 'MENTOR_REGISTRY', {})}
+                version_stamp = config["VERSION_STAMP"]
+                if version_stamp and not stamps.is_shared(config["CACHE_ALIAS"]):
+                    logger.warning("👥 Mentor registry: CACHE_ALIAS %r is per process, other workers "
+                                   "see mentor edits after MAX_AGE only", config["CACHE_ALIAS"])
+                    version_stamp = False
+                _registry = MentorRegistry(
+                    version_stamp=version_stamp,
+                    cache_alias=config["CACHE_ALIAS"],
+                    check_interval=config["CHECK_INTERVAL"],
+                    max_age=config["MAX_AGE"],
+                )
+    return _registry
+
+
+def active_mentors() -> MentorSnapshot:
+    return get_mentor_registry().snapshot()
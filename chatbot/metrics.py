@@ -0,0 +1,380 @@
+# chatbot/metrics.py
+"""
+Per-endpoint request metrics, kept in memory and served on /metrics in the
+Prometheus text format.
+
+MetricsMiddleware times every request and labels it with the URL name from
+chatbot/urls.py (e.g. "chat", "book_slot"). For each route it records:
+    chatbot_http_requests_total              requests by method and status
+    chatbot_http_request_duration_seconds    wall time (plus p50/p90/p99 in ..._quantiles)
+    chatbot_db_queries_per_request           number of SQL queries
+    chatbot_db_duration_seconds              time spent in SQL per request
+    chatbot_external_call_duration_seconds   each Gemini / Google Calendar / SMTP call, by service
+
+SQL is timed by a wrapper added to every database connection (the
+connection.execute_wrapper hook), so queries an async view runs in a
+sync_to_async thread count towards the request too. External calls are timed
+where they are made: `with track_external("gemini"): ...`. The request a query
+or call belongs to travels in a contextvar.
+
+Values go into HDR-style log-linear histograms: 32 sub-buckets per power of
+two (about 3% relative error), stored sparsely, so memory stays small
+whatever the range. Prometheus buckets are exported at powers of two.
+
+Streaming responses are timed up to the start of the stream; Gemini chunks
+generated afterwards are recorded under route "-".
+
+Configured through settings.METRICS:
+    ENABLED  record and serve metrics
+    TOKEN    scrapers send "Authorization: Bearer <TOKEN>"; without a TOKEN
+             /metrics answers 403 to everyone (route names and traffic are
+             not for the public)
+"""
+
+import asyncio
+import hmac
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+
+DEFAULT_CONFIG = {
+    "ENABLED": True,
+    "TOKEN": "",
+}
+
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS  # sub-buckets per power of two
+QUANTILES = (0.5, 0.9, 0.99)
+NO_ROUTE = "-"
+
+
+def load_config() -> dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'METRICS', {})}
+
+
+def bucket_index(value: int) -> int:
+    """Bucket for a non-negative integer: exact below 64, then 32 buckets per power of two"""
+    if value < 2 * SUB_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return shift * SUB_COUNT + (value >> shift)
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """[low, high) of the integers in a bucket"""
+    if index < 2 * SUB_COUNT:
+        return index, index + 1
+    shift, mantissa = divmod(index, SUB_COUNT)
+    shift -= 1
+    mantissa += SUB_COUNT
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class Histogram:
+    """
+    Sparse HDR-style histogram. Values are recorded in `unit`s (1e-6 for seconds
+    measured to the microsecond, 1 for counts) and reported back in the original scale.
+    Not locked itself; MetricsRegistry serialises access.
+    """
+
+    def __init__(self, unit: float = 1e-6):
+        self.unit = unit
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value: float):
+        index = bucket_index(max(0, int(value / self.unit)))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile q (0..1), the midpoint of the bucket it falls in"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                return (low + high - 1) / 2 * self.unit
+        return 0.0
+
+    def cumulative(self, min_exponent: int, max_exponent: int):
+        """(le, count of values <= le) at le = 2**min_exponent .. 2**max_exponent units"""
+        edges = [1 << k for k in range(min_exponent, max_exponent + 1)]
+        totals = [0] * len(edges)
+        for index, count in self.counts.items():
+            last = bucket_bounds(index)[1] - 1  # largest integer in the bucket
+            for i, edge in enumerate(edges):
+                if last <= edge:
+                    totals[i] += count
+                    break
+        running = 0
+        for edge, total in zip(edges, totals):
+            running += total
+            yield edge * self.unit, running
+
+
+class MetricsRegistry:
+    """Histograms and counters by (family, labels), shared by all threads of the process"""
+
+    # family -> (help, unit, Prometheus buckets from 2**min to 2**max units)
+    # Durations: 128 us .. 67 s; query counts: 1 .. 1024
+    FAMILIES = {
+        "chatbot_http_request_duration_seconds": ("Request wall time", 1e-6, 7, 26),
+        "chatbot_db_queries_per_request": ("SQL queries per request", 1, 0, 10),
+        "chatbot_db_duration_seconds": ("Time spent in SQL per request", 1e-6, 7, 26),
+        "chatbot_external_call_duration_seconds": ("Gemini / Google Calendar / SMTP call time", 1e-6, 7, 26),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self._requests: Dict[tuple, int] = {}
+        self._routes: Dict[str, Tuple[Histogram, Histogram, Histogram]] = {}  # per-request families by route
+
+    def observe(self, family: str, labels: tuple, value: float):
+        with self._lock:
+            self._observe(family, labels, value)
+
+    def _histogram(self, family, labels) -> Histogram:
+        key = (family, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(self.FAMILIES[family][1])
+        return histogram
+
+    def _observe(self, family, labels, value):
+        self._histogram(family, labels).record(value)
+
+    def record_request(self, route: str, method: str, status: int, metrics: "RequestMetrics", elapsed: float):
+        with self._lock:
+            key = (route, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histograms = self._routes.get(route)
+            if histograms is None:
+                labels = (("route", route),)
+                histograms = self._routes[route] = (
+                    self._histogram("chatbot_http_request_duration_seconds", labels),
+                    self._histogram("chatbot_db_queries_per_request", labels),
+                    self._histogram("chatbot_db_duration_seconds", labels),
+                )
+            histograms[0].record(elapsed)
+            histograms[1].record(metrics.queries)
+            histograms[2].record(metrics.db_time)
+            for service, seconds in metrics.external_calls:
+                self._observe("chatbot_external_call_duration_seconds",
+                              (("route", route), ("service", service)), seconds)
+
+    def histogram(self, family: str, **labels) -> Optional[Histogram]:
+        return self._histograms.get((family, tuple(sorted(labels.items()))))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+            self._routes.clear()
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            requests = dict(self._requests)
+            histograms = {
+                key: (dict(h.counts), h.count, h.sum) for key, h in self._histograms.items()
+            }
+
+        lines = [
+            "# HELP chatbot_http_requests_total Requests by route, method and status",
+            "# TYPE chatbot_http_requests_total counter",
+        ]
+        for (route, method, status), count in sorted(requests.items()):
+            lines.append(
+                f'chatbot_http_requests_total{{route="{route}",method="{method}",status="{status}"}} {count}'
+            )
+
+        for family, (help_text, unit, min_exponent, max_exponent) in self.FAMILIES.items():
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} histogram")
+            quantile_lines = []
+            for (name, labels), (counts, count, total) in sorted(histograms.items()):
+                if name != family:
+                    continue
+                snapshot = Histogram(unit)
+                snapshot.counts, snapshot.count, snapshot.sum = counts, count, total
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                for le, cumulative in snapshot.cumulative(min_exponent, max_exponent):
+                    lines.append(f'{family}_bucket{{{label_text},le="{le:g}"}} {cumulative}')
+                lines.append(f'{family}_bucket{{{label_text},le="+Inf"}} {count}')
+                lines.append(f"{family}_sum{{{label_text}}} {total:.6f}")
+                lines.append(f"{family}_count{{{label_text}}} {count}")
+                if family == "chatbot_http_request_duration_seconds":
+                    for q in QUANTILES:
+                        quantile_lines.append(
+                            f'{family}_quantiles{{{label_text},quantile="{q}"}} {snapshot.quantile(q):.6f}'
+                        )
+            if quantile_lines:
+                lines.append(f"# HELP {family}_quantiles Request wall time quantiles from the HDR histogram")
+                lines.append(f"# TYPE {family}_quantiles summary")
+                lines.extend(quantile_lines)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Totals for the request being handled (see the contextvar below)"""
+
+    __slots__ = ("queries", "db_time", "external_calls")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.external_calls = []  # (service, seconds); recorded with the route once it is known
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("chatbot_request_metrics", default=None)
+
+
+def current_request_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+@contextmanager
+def track_external(service: str):
+    """Time a call to an outside service ("gemini", "google_calendar", "smtp")"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.external_calls.append((service, elapsed))
+        else:
+            registry.observe(
+                "chatbot_external_call_duration_seconds", (("route", NO_ROUTE), ("service", service)), elapsed
+            )
+
+
+def _timed(service, method):
+    def timed(*args, **kwargs):
+        with track_external(service):
+            return method(*args, **kwargs)
+    timed.__name__ = method.__name__
+    return timed
+
+
+class TimedSMTP(smtplib.SMTP):
+    """smtplib.SMTP whose network round trips count as external "smtp" time"""
+    connect = _timed("smtp", smtplib.SMTP.connect)
+    starttls = _timed("smtp", smtplib.SMTP.starttls)
+    login = _timed("smtp", smtplib.SMTP.login)
+    sendmail = _timed("smtp", smtplib.SMTP.sendmail)
+    quit = _timed("smtp", smtplib.SMTP.quit)
+
+
+class TimedSMTP_SSL(smtplib.SMTP_SSL):
+    connect = _timed("smtp", smtplib.SMTP_SSL.connect)
+    login = _timed("smtp", smtplib.SMTP_SSL.login)
+    sendmail = _timed("smtp", smtplib.SMTP_SSL.sendmail)
+    quit = _timed("smtp", smtplib.SMTP_SSL.quit)
+
+
+class TimedEmailBackend(EmailBackend):
+    """Django's SMTP backend (settings.EMAIL_BACKEND) on TimedSMTP"""
+
+    @property
+    def connection_class(self):
+        return TimedSMTP_SSL if self.use_ssl else TimedSMTP
+
+
+def _time_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def install_query_timer(connection, **kwargs):
+    """Add the query timer to a connection (connected to connection_created; idempotent)"""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def route_name(request) -> str:
+    """URL name of the resolved view, used as the route label"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.url_name or match.route or match.view_name
+
+
+@sync_and_async_middleware
+def MetricsMiddleware(get_response):
+    """Records wall time, SQL and external call time per route (settings.METRICS['ENABLED'])"""
+    if not load_config()["ENABLED"]:
+        return get_response
+
+    connection_created.connect(install_query_timer, dispatch_uid="chatbot.metrics.query_timer")
+    for existing in connections.all(initialized_only=True):  # e.g. the one settings.py opens
+        install_query_timer(existing)
+
+    def finish(request, response, metrics, start):
+        registry.record_request(route_name(request), request.method, response.status_code, metrics,
+                                time.perf_counter() - start)
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            metrics = RequestMetrics()
+            token = _current.set(metrics)
+            start = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            finish(request, response, metrics, start)
+            return response
+    else:
+        def middleware(request):
+            metrics = RequestMetrics()
+            token = _current.set(metrics)
+            start = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            finish(request, response, metrics, start)
+            return response
+
+    return middleware
+
+
+def metrics_view(request):
+    """GET /metrics - Prometheus scrape endpoint"""
+    config = load_config()
+    if not config["ENABLED"]:
+        return HttpResponse(status=404)
+    if not config["TOKEN"]:
+        return HttpResponse(status=403)
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {config['TOKEN']}"):
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
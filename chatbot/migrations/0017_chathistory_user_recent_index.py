@@ -0,0 +1,17 @@
+# Generated by Django 4.1.13 on 2026-10-17 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0016_mentor_display_name_mentor_is_head_mentor'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chathistory',
+            index=models.Index(fields=['user', '-created_at'], name='chat_history_user_recent'),
+        ),
+    ]
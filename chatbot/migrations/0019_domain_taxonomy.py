@@ -0,0 +1,49 @@
+# Generated by Django 4.1.13 on 2026-10-17 03:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0018_auditlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Domain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('keywords', models.JSONField(blank=True, default=list, help_text='Lowercase phrases that point to this domain')),
+                ('priority', models.IntegerField(default=0, help_text='Lower wins when a message matches several domains')),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'db_table': 'domains',
+                'ordering': ['priority', 'slug'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MentorDomain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.IntegerField(default=2)),
+                ('domain', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentor_tags', to='chatbot.domain')),
+                ('mentor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='domain_tags', to='chatbot.mentor')),
+            ],
+            options={
+                'db_table': 'mentor_domains',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='mentordomain',
+            index=models.Index(fields=['domain', 'rank'], name='mentor_domain_lookup'),
+        ),
+        migrations.AddConstraint(
+            model_name='mentordomain',
+            constraint=models.UniqueConstraint(fields=('mentor', 'domain'), name='mentor_domain_unique'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+# DOMAIN_KEYWORDS as it was hard-coded in views.py, in priority order
+SEED = {
+    'marketing': ['marketing', 'digital marketing', 'seo', 'social media', 'content', 'campaigns', 'ads', 'promotion'],
+    'cv': ['cv', 'resume', 'curriculum vitae', 'profile', 'career document', 'job application'],
+    'linkedin': ['linkedin', 'professional network', 'social networking', 'profile optimization', 'connections'],
+    'testing': ['test', 'qa', 'quality assurance', 'automation', 'selenium', 'cypress'],
+    'data': ['data', 'analytics', 'data science', 'machine learning', 'statistics', 'python', 'sql'],
+    'development': ['developer', 'programming', 'coding', 'software', 'web development', 'frontend', 'backend'],
+    'design': ['design', 'ui', 'ux', 'graphic', 'visual', 'creative', 'figma', 'photoshop'],
+    'finance': ['finance', 'accounting', 'investment', 'banking', 'financial analysis'],
+    'hr': ['hr', 'human resources', 'recruitment', 'talent', 'people management']
+}
+
+NAMES = {'cv': 'CV', 'hr': 'HR', 'linkedin': 'LinkedIn'}
+
+# MentorDomain.RANK_* as of this migration (historical models don't carry class attributes)
+RANK_EXACT = 0
+RANK_CONTAINS = 1
+RANK_KEYWORD = 2
+
+
+def match_rank(expertise, slug, keywords):
+    """taxonomy.match_rank() frozen at this migration, so later edits there can't change the seed"""
+    expertise = (expertise or "").lower()
+    if not expertise:
+        return None
+    if expertise == slug:
+        return RANK_EXACT
+    if slug in expertise:
+        return RANK_CONTAINS
+    for i, keyword in enumerate(keywords):
+        if keyword.lower() in expertise:
+            return RANK_KEYWORD + i
+    return None
+
+
+def seed_domains(apps, schema_editor):
+    Domain = apps.get_model('chatbot', 'Domain')
+    Mentor = apps.get_model('chatbot', 'Mentor')
+    MentorDomain = apps.get_model('chatbot', 'MentorDomain')
+
+    domains = [
+        Domain.objects.create(slug=slug, name=NAMES.get(slug, slug.title()), keywords=keywords, priority=i)
+        for i, (slug, keywords) in enumerate(SEED.items())
+    ]
+    tags = []
+    for mentor in Mentor.objects.all():
+        for domain in domains:
+            rank = match_rank(mentor.expertise, domain.slug, domain.keywords)
+            if rank is not None:
+                tags.append(MentorDomain(mentor=mentor, domain=domain, rank=rank))
+    MentorDomain.objects.bulk_create(tags)
+
+
+def unseed_domains(apps, schema_editor):
+    apps.get_model('chatbot', 'Domain').objects.filter(slug__in=SEED).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0019_domain_taxonomy'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_domains, unseed_domains),
+    ]
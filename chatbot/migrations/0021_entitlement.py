@@ -0,0 +1,26 @@
+# Generated by Django 4.1.13 on 2026-10-17 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0020_seed_domains'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Entitlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(help_text='Lower-cased', max_length=254, unique=True)),
+                ('type', models.CharField(blank=True, help_text='premium / standard', max_length=20)),
+                ('source', models.CharField(blank=True, max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'entitlements',
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.1.13 on 2026-10-17 04:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0021_entitlement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(max_length=254)),
+                ('event_id', models.CharField(max_length=1024)),
+                ('summary', models.CharField(blank=True, max_length=500)),
+                ('start', models.DateTimeField(null=True)),
+                ('end', models.DateTimeField(null=True)),
+                ('updated', models.DateTimeField(help_text='Last change in Google Calendar', null=True)),
+            ],
+            options={
+                'db_table': 'calendar_events',
+            },
+        ),
+        migrations.CreateModel(
+            name='CalendarSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(max_length=254, unique=True)),
+                ('sync_token', models.CharField(blank=True, max_length=1024)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+                ('full_sync_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'calendar_sync_states',
+            },
+        ),
+        migrations.CreateModel(
+            name='CalendarEventAttendee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(help_text='Lower-cased', max_length=254)),
+                ('response_status', models.CharField(blank=True, max_length=20)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendees', to='chatbot.calendarevent')),
+            ],
+            options={
+                'db_table': 'calendar_event_attendees',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='calendarevent',
+            constraint=models.UniqueConstraint(fields=('calendar_id', 'event_id'), name='calendar_event_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='calendareventattendee',
+            index=models.Index(fields=['email', 'response_status'], name='calendar_attendee_lookup'),
+        ),
+    ]
@@ -48,6 +48,45 @@ class Mentor(models.Model):
         # Call the parent delete method
         super().delete(*args, **kwargs)
 
+class Domain(models.Model):
+    """Mentor domain taxonomy (seeded from the original DOMAIN_KEYWORDS)"""
+    slug = models.SlugField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+    keywords = models.JSONField(default=list, blank=True, help_text="Lowercase phrases that point to this domain")
+    priority = models.IntegerField(default=0, help_text="Lower wins when a message matches several domains")
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['priority', 'slug']
+        db_table = 'domains'
+
+    def __str__(self):
+        return self.name
+
+class MentorDomain(models.Model):
+    """Precomputed mentor -> domain tags, kept up to date by chatbot/signals.py"""
+    # How the mentor's expertise matched the domain; lower is a better match
+    RANK_EXACT = 0      # expertise is the domain slug
+    RANK_CONTAINS = 1   # expertise contains the slug
+    RANK_KEYWORD = 2    # expertise contains keyword i -> RANK_KEYWORD + i
+
+    mentor = models.ForeignKey(Mentor, on_delete=models.CASCADE, related_name='domain_tags')
+    domain = models.ForeignKey(Domain, on_delete=models.CASCADE, related_name='mentor_tags')
+    rank = models.IntegerField(default=RANK_KEYWORD)
+
+    class Meta:
+        db_table = 'mentor_domains'
+        constraints = [
+            models.UniqueConstraint(fields=['mentor', 'domain'], name='mentor_domain_unique'),
+        ]
+        indexes = [
+            # Best-matching mentors of one domain
+            models.Index(fields=['domain', 'rank'], name='mentor_domain_lookup'),
+        ]
+
+    def __str__(self):
+        return f"{self.mentor_id} -> {self.domain_id} ({self.rank})"
+
 # Existing models - retained but not used in new implementation
 class MentorSchedule(models.Model):
     """
@@ -159,10 +198,90 @@ class ChatHistory(models.Model):
     class Meta:
         ordering = ['-created_at']
         db_table = 'chat_history'
+        indexes = [
+            # Latest turns of one user (conversation memory)
+            models.Index(fields=['user', '-created_at'], name='chat_history_user_recent'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}: {self.message[:50]}..."
 
+class Entitlement(models.Model):
+    """Signup allow-list and plan per email, imported from the CSV files by `manage.py import_entitlements`"""
+    email = models.CharField(max_length=254, unique=True, help_text="Lower-cased")
+    type = models.CharField(max_length=20, blank=True, help_text="premium / standard")
+    source = models.CharField(max_length=100, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'entitlements'
+
+    def __str__(self):
+        return f"{self.email} ({self.type or '-'})"
+
+class AuditLog(models.Model):
+    """Security-relevant events (signups, logins, logouts), written in batches by chatbot/write_behind.py"""
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    action = models.CharField(max_length=50)
+    detail = models.JSONField(default=dict, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    # Set when the event is queued, not when the batch is written
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        db_table = 'audit_log'
+
+    def __str__(self):
+        return f"{self.action} ({self.user_id}) at {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+class CalendarEvent(models.Model):
+    """An event in a mentor's Google Calendar, mirrored by chatbot/calendar_mirror.py"""
+    calendar_id = models.CharField(max_length=254)
+    event_id = models.CharField(max_length=1024)
+    summary = models.CharField(max_length=500, blank=True)
+    # Null for all-day events, which never count as sessions
+    start = models.DateTimeField(null=True)
+    end = models.DateTimeField(null=True)
+    updated = models.DateTimeField(null=True, help_text="Last change in Google Calendar")
+
+    class Meta:
+        db_table = 'calendar_events'
+        constraints = [
+            models.UniqueConstraint(fields=['calendar_id', 'event_id'], name='calendar_event_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.summary or self.event_id} ({self.calendar_id})"
+
+class CalendarEventAttendee(models.Model):
+    event = models.ForeignKey(CalendarEvent, on_delete=models.CASCADE, related_name='attendees')
+    email = models.CharField(max_length=254, help_text="Lower-cased")
+    response_status = models.CharField(max_length=20, blank=True)
+
+    class Meta:
+        db_table = 'calendar_event_attendees'
+        indexes = [
+            # Last accepted session per student (calendar_mirror.last_session_end)
+            models.Index(fields=['email', 'response_status'], name='calendar_attendee_lookup'),
+        ]
+
+    def __str__(self):
+        return f"{self.email} ({self.response_status or '-'})"
+
+class CalendarSyncState(models.Model):
+    """Where incremental sync of one calendar left off"""
+    calendar_id = models.CharField(max_length=254, unique=True)
+    sync_token = models.CharField(max_length=1024, blank=True)
+    synced_at = models.DateTimeField(null=True, blank=True)
+    full_sync_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'calendar_sync_states'
+
+    def __str__(self):
+        return f"{self.calendar_id} (synced {self.synced_at or 'never'})"
+
 # New models for the simplified booking system
 class MentorAvailability(models.Model):
     """
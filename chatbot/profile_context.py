@@ -0,0 +1,33 @@
+# chatbot/profile_context.py
+"""
+The signed-in user's UserProfile, loaded once per request.
+
+ProfileContextMixin (DRF class views) and `attach_profile()` (function views)
+set request.profile (None when the user has no profile) and request.is_premium
+right after authentication, so views and the helpers they call read them
+instead of querying UserProfile again. With CachedTokenAuthentication the
+profile arrives with the token and this costs no query; session
+authentication costs one.
+
+Profiles are created at signup and by `manage.py sync_premium_status`, never here.
+"""
+
+from typing import Optional
+
+from .authentication import get_profile
+from .models import UserProfile
+
+
+def attach_profile(request) -> Optional[UserProfile]:
+    profile = get_profile(request.user) if request.user.is_authenticated else None
+    request.profile = profile
+    request.is_premium = bool(profile and profile.is_premium)
+    return profile
+
+
+class ProfileContextMixin:
+    """APIView mixin: request.profile / request.is_premium are set before the handler runs"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        attach_profile(request)
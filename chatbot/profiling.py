@@ -0,0 +1,280 @@
+# chatbot/profiling.py
+"""
+Opt-in request profiling: where a slow request's time went, in production.
+
+ProfilingMiddleware profiles a random SAMPLE_RATE fraction of requests, plus
+any request carrying a valid signed "X-Profile" header (get one with
+`manage.py profile_report --sign`). A profiled request gets a sampling thread
+that records the request thread's Python stack every INTERVAL seconds, so
+time blocked on SQLite locks, Google API or SMTP sockets shows up under the
+frame that made the call, next to pure Python time. Requests that are not
+profiled pay one random() call; with ENABLED off the middleware is not
+installed at all.
+
+cProfile is not used: it traces every call (several times slower for the
+profiled request) and keeps only caller/callee pairs, not whole stacks.
+
+Each profile is written to DIRECTORY when the response is ready, as
+    <timestamp>-<route>-<ms>ms-<pid>.collapsed       "route;frame;frame count" lines (flamegraph.pl, speedscope)
+    <timestamp>-<route>-<ms>ms-<pid>.speedscope.json with FORMAT = "speedscope" (https://www.speedscope.app)
+and only the newest MAX_FILES are kept. `manage.py profile_report` ranks the
+hottest frames across all of them.
+
+Async views are sampled on the event loop thread; work they hand to
+sync_to_async threads is not captured. Streaming responses are profiled up to
+the start of the stream.
+
+Configured through settings.PROFILING:
+    ENABLED      install the middleware
+    SAMPLE_RATE  fraction of requests profiled at random (0 = header only)
+    SECRET       key for the X-Profile header (SECRET_KEY when empty)
+    MAX_AGE      seconds a signed header stays valid
+    INTERVAL     seconds between stack samples
+    DIRECTORY    where profiles are written
+    FORMAT       collapsed | speedscope
+    MAX_FILES    profiles kept in DIRECTORY (oldest deleted first)
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+from django.conf import settings
+from django.core import signing
+from django.utils.decorators import sync_and_async_middleware
+
+from .metrics import route_name
+
+DEFAULT_CONFIG = {
+    "ENABLED": False,
+    "SAMPLE_RATE": 0.0,
+    "SECRET": "",
+    "MAX_AGE": 3600,
+    "INTERVAL": 0.005,
+    "DIRECTORY": "profiles",
+    "FORMAT": "collapsed",
+    "MAX_FILES": 200,
+}
+
+HEADER = "X-Profile"
+SALT = "chatbot.profiling"
+SUFFIXES = {"collapsed": ".collapsed", "speedscope": ".speedscope.json"}
+
+Stack = Tuple[str, ...]  # outermost frame first
+
+
+def load_config() -> dict:
+    return {**DEFAULT_CONFIG, **getattr(settings, 'PROFILING', {})}
+
+
+def _signer(config: dict) -> signing.TimestampSigner:
+    return signing.TimestampSigner(key=config["SECRET"] or settings.SECRET_KEY, salt=SALT)
+
+
+def sign_header() -> str:
+    """Value for the X-Profile header, valid for MAX_AGE seconds"""
+    return _signer(load_config()).sign("profile")
+
+
+def has_valid_header(request, config: dict) -> bool:
+    value = request.headers.get(HEADER)
+    if not value:
+        return False
+    try:
+        return _signer(config).unsign(value, max_age=config["MAX_AGE"]) == "profile"
+    except signing.BadSignature:
+        return False
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    """Path relative to the longest sys.path entry containing it"""
+    best = ""
+    for entry in sys.path:
+        if entry and filename.startswith(entry.rstrip(os.sep) + os.sep) and len(entry) > len(best):
+            best = entry.rstrip(os.sep) + os.sep
+    return filename[len(best):]
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Counts the stacks one thread is in, sampled from a background thread"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="chatbot-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[tuple(reversed(labels))] += 1
+
+
+def render_collapsed(stacks: Dict[Stack, int], root: str) -> str:
+    return "".join(f"{';'.join((root,) + stack)} {count}\n" for stack, count in stacks.items())
+
+
+def render_speedscope(stacks: Dict[Stack, int], root: str, interval: float) -> str:
+    frames, index = [], {}
+    samples, weights = [], []
+    for stack, count in stacks.items():
+        sample = []
+        for label in (root,) + stack:
+            if label not in index:
+                index[label] = len(frames)
+                frames.append({"name": label})
+            sample.append(index[label])
+        samples.append(sample)
+        weights.append(count * interval * 1000)
+    return json.dumps({
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled", "name": root, "unit": "milliseconds",
+            "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights,
+        }],
+    })
+
+
+def profile_directory(config: dict) -> Path:
+    return Path(settings.BASE_DIR, config["DIRECTORY"])
+
+
+def write_profile(stacks: Dict[Stack, int], root: str, elapsed: float, config: dict) -> Path:
+    """Write one profile to DIRECTORY and delete the oldest beyond MAX_FILES"""
+    directory = profile_directory(config)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S.%f")[:-3]
+    label = re.sub(r"[^\w.-]+", "_", root)
+    name = f"{stamp}-{label}-{elapsed * 1000:.0f}ms-{os.getpid()}"
+    if config["FORMAT"] == "speedscope":
+        path = directory / (name + SUFFIXES["speedscope"])
+        path.write_text(render_speedscope(stacks, root, config["INTERVAL"]))
+    else:
+        path = directory / (name + SUFFIXES["collapsed"])
+        path.write_text(render_collapsed(stacks, root))
+    _rotate(directory, config["MAX_FILES"])
+    return path
+
+
+def _rotate(directory: Path, max_files: int):
+    profiles = sorted(iter_profile_paths(directory), key=lambda p: p.name)  # names start with the timestamp
+    for old in profiles[:max(0, len(profiles) - max_files)]:
+        old.unlink(missing_ok=True)
+
+
+def iter_profile_paths(directory: Path) -> Iterator[Path]:
+    for path in directory.iterdir():
+        if path.name.endswith(tuple(SUFFIXES.values())):
+            yield path
+
+
+def read_profile(path: Path) -> Dict[Stack, int]:
+    """Stacks (root first) -> samples, from either output format"""
+    stacks: Dict[Stack, int] = {}
+    if path.name.endswith(SUFFIXES["speedscope"]):
+        data = json.loads(path.read_text())
+        frames = [f["name"] for f in data["shared"]["frames"]]
+        interval_ms = load_config()["INTERVAL"] * 1000  # weights are milliseconds
+        for profile in data["profiles"]:
+            for sample, weight in zip(profile["samples"], profile["weights"]):
+                stack = tuple(frames[i] for i in sample)
+                stacks[stack] = stacks.get(stack, 0) + round(weight / interval_ms)
+    else:
+        for line in path.read_text().splitlines():
+            stack, _, count = line.rpartition(" ")
+            if stack:
+                key = tuple(stack.split(";"))
+                stacks[key] = stacks.get(key, 0) + int(count)
+    return stacks
+
+
+def hot_frames(profiles, route: str = None) -> Tuple[Counter, Counter, Counter]:
+    """
+    Aggregate read_profile() results: (self samples per frame, inclusive samples
+    per frame, samples per route). `route` keeps only profiles whose root
+    ("POST book_slot") contains it.
+    """
+    own, inclusive, routes = Counter(), Counter(), Counter()
+    for stacks in profiles:
+        for stack, count in stacks.items():
+            root, frames = stack[0], stack[1:]
+            if route and route not in root:
+                continue
+            routes[root] += count
+            if frames:
+                own[frames[-1]] += count
+                for frame in set(frames):  # recursion counts once
+                    inclusive[frame] += count
+    return own, inclusive, routes
+
+
+@sync_and_async_middleware
+def ProfilingMiddleware(get_response):
+    """Profiles sampled or X-Profile requests into settings.PROFILING['DIRECTORY']"""
+    config = load_config()
+    if not config["ENABLED"]:
+        return get_response
+    rate = config["SAMPLE_RATE"]
+
+    def wanted(request) -> bool:
+        return (rate > 0 and random.random() < rate) or has_valid_header(request, config)
+
+    def finish(request, sampler, start):
+        stacks = sampler.stop()
+        if stacks:
+            write_profile(stacks, f"{request.method} {route_name(request)}", time.perf_counter() - start, config)
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not wanted(request):
+                return await get_response(request)
+            sampler = StackSampler(threading.get_ident(), config["INTERVAL"])
+            start = time.perf_counter()
+            sampler.start()
+            try:
+                return await get_response(request)
+            finally:
+                finish(request, sampler, start)
+    else:
+        def middleware(request):
+            if not wanted(request):
+                return get_response(request)
+            sampler = StackSampler(threading.get_ident(), config["INTERVAL"])
+            start = time.perf_counter()
+            sampler.start()
+            try:
+                return get_response(request)
+            finally:
+                finish(request, sampler, start)
+
+    return middleware
@@ -0,0 +1,239 @@
+# chatbot/response_cache.py
+"""
+Cache of cleaned Gemini chat replies for repeated questions.
+
+Entries are keyed on the normalised message text, the user's tier (free/premium)
+and the content hash of the training corpus, so rebuilding the knowledge base
+naturally invalidates every cached answer.
+
+Configured through settings.CHAT_RESPONSE_CACHE:
+    BACKEND      "memory" (per-process LRU), "django" (a Django cache alias) or "file"
+    TTL          seconds an entry stays valid
+    MAX_ENTRIES  LRU bound for the memory and file backends
+    CACHE_ALIAS  Django cache alias for the "django" backend
+    DIRECTORY    directory for the "file" backend
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+
+DEFAULT_CONFIG = {
+    "BACKEND": "memory",
+    "TTL": 6 * 60 * 60,
+    "MAX_ENTRIES": 1000,
+    "CACHE_ALIAS": "default",
+    "DIRECTORY": settings.BASE_DIR / "cache" / "chat_responses",
+}
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Case, punctuation and whitespace-insensitive form of a chat message"""
+    text = _NON_WORD.sub(" ", message.lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+class InProcessBackend:
+    """Thread-safe LRU with per-entry expiry, local to one worker process"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCacheBackend:
+    """
+    Delegates to a configured Django cache (locmem, file, redis...) - shared across workers if the cache is.
+    Keys carry a generation stored in the same cache. clear() starts a new generation and leaves the old
+    entries to expire, so other users of the alias (version stamps, sessions) keep their keys.
+    """
+
+    GENERATION_KEY = "chat_reply:generation"
+
+    def __init__(self, alias: str):
+        from django.core.cache import caches
+        self._cache = caches[alias]
+
+    def _key(self, key: str) -> str:
+        generation = self._cache.get(self.GENERATION_KEY)
+        if generation is None:  # first use, or evicted: start afresh rather than revive old entries
+            generation = uuid.uuid4().hex
+            if not self._cache.add(self.GENERATION_KEY, generation, timeout=None):
+                generation = self._cache.get(self.GENERATION_KEY, generation)
+        return f"chat_reply:{generation}:{key}"
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(self._key(key))
+
+    def set(self, key: str, value: str, ttl: int):
+        self._cache.set(self._key(key), value, ttl)
+
+    def clear(self):
+        self._cache.set(self.GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+class FileBackend:
+    """
+    One JSON file per entry, shared by every worker on the host.
+    File mtime doubles as the LRU clock: hits touch the file, eviction drops the oldest.
+    The mtime is set from time.time() explicitly; the kernel's own file timestamps are
+    too coarse to order writes made within the same few milliseconds.
+    """
+
+    def __init__(self, directory, max_entries: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        now = time.time()
+        if entry["expires_at"] < now:
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        return entry["value"]
+
+    def set(self, key: str, value: str, ttl: int):
+        path = self._path(key)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        now = time.time()
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump({"expires_at": now + ttl, "value": value}, fh)
+        os.utime(tmp_path, (now, now))
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                os.unlink(entry.path)
+
+
+class ResponseCache:
+    """Tier- and corpus-aware reply cache with hit/miss counters"""
+
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(message: str, is_premium: bool, corpus_hash: str) -> str:
+        raw = f"{'premium' if is_premium else 'free'}\x00{corpus_hash}\x00{normalize_message(message)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, message: str, is_premium: bool, corpus_hash: str = "") -> Optional[str]:
+        try:
+            value = self.backend.get(self.make_key(message, is_premium, corpus_hash))
+        except Exception as e:
+            print(f"⚠️ Response cache read failed: {e}")
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, message: str, is_premium: bool, reply: str, corpus_hash: str = ""):
+        try:
+            self.backend.set(self.make_key(message, is_premium, corpus_hash), reply, self.ttl)
+        except Exception as e:
+            print(f"⚠️ Response cache write failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+
+def build_response_cache(config: dict = None) -> ResponseCache:
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    backend_name = config["BACKEND"]
+    if backend_name == "memory":
+        backend = InProcessBackend(config["MAX_ENTRIES"])
+    elif backend_name == "django":
+        backend = DjangoCacheBackend(config["CACHE_ALIAS"])
+    elif backend_name == "file":
+        backend = FileBackend(config["DIRECTORY"], config["MAX_ENTRIES"])
+    else:
+        raise ValueError(f"Unknown CHAT_RESPONSE_CACHE backend: {backend_name}")
+    return ResponseCache(backend, config["TTL"])
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache built from settings.CHAT_RESPONSE_CACHE"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = build_response_cache(getattr(settings, 'CHAT_RESPONSE_CACHE', None))
+    return _response_cache
@@ -0,0 +1,125 @@
+# chatbot/retrieval.py
+"""
+Lexical retrieval over the UKJobsInsider training material.
+
+The training PDFs are split into overlapping word windows once, and a BM25
+index is built over those chunks so that each chat turn only sends the few
+passages relevant to the user's query instead of the whole document.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+WORD_PATTERN = re.compile(r"\S+")
+
+# Very common English words carry no signal for ranking
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from how i if in into is it its
+me my no not of on or our so that the their them then there these they this
+to was we what when where which who why will with you your
+""".split())
+
+DEFAULT_CHUNK_WORDS = 80
+DEFAULT_CHUNK_OVERLAP = 20
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens with stopwords removed"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_spans(text: str, chunk_words: int = DEFAULT_CHUNK_WORDS,
+                overlap: int = DEFAULT_CHUNK_OVERLAP) -> List[Tuple[int, int]]:
+    """
+    Split text into overlapping windows of roughly `chunk_words` words.
+    Returns (start, end) character offsets into `text`; the overlap keeps
+    sentences that straddle a boundary retrievable from either side.
+    """
+    words = [(m.start(), m.end()) for m in WORD_PATTERN.finditer(text)]
+    if not words:
+        return []
+
+    step = max(1, chunk_words - overlap)
+    spans = []
+    for start in range(0, len(words), step):
+        last = min(start + chunk_words, len(words)) - 1
+        spans.append((words[start][0], words[last][1]))
+        if start + chunk_words >= len(words):
+            break
+    return spans
+
+
+def chunk_text(text: str, chunk_words: int = DEFAULT_CHUNK_WORDS,
+               overlap: int = DEFAULT_CHUNK_OVERLAP) -> List[str]:
+    """Chunk strings for the spans produced by chunk_spans()"""
+    return [text[start:end] for start, end in chunk_spans(text, chunk_words, overlap)]
+
+
+def merge_spans(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping or touching spans so overlapping chunks are not sent twice"""
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed sequence of chunks.
+    Built once per process; searching is a dictionary walk over the query terms only.
+    Only postings are kept - callers own the chunk text (see chatbot/knowledge_base.py).
+    """
+
+    def __init__(self, chunks: Iterable[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._postings = {}  # term -> list of (chunk_idx, term_freq)
+        self._doc_len = []
+        for idx, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            self._doc_len.append(sum(counts.values()))
+            for term, freq in counts.items():
+                self._postings.setdefault(term, []).append((idx, freq))
+
+        n_docs = self._n_docs = len(self._doc_len)
+        self._avg_len = (sum(self._doc_len) / n_docs) if n_docs else 0.0
+        self._idf = {
+            term: math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def __len__(self):
+        return self._n_docs
+
+    def search(self, query: str, top_k: int = 4) -> List[Tuple[int, float]]:
+        """Return up to top_k (chunk_idx, score) pairs, best first. Non-matching chunks are omitted."""
+        scores = {}
+        avg_len = self._avg_len or 1.0
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for idx, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[idx] / avg_len)
+                scores[idx] = scores.get(idx, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:top_k]
+
+    def top_indices(self, query: str, top_k: int = 4) -> List[int]:
+        """
+        Indices of the relevant chunks, in document order so the prompt reads naturally.
+        Falls back to the opening chunks when nothing in the query matches.
+        """
+        hits = self.search(query, top_k)
+        if not hits:
+            return list(range(min(top_k, self._n_docs)))
+        return sorted(idx for idx, _ in hits)
@@ -0,0 +1,213 @@
+# chatbot/semantic_cache.py
+"""
+Near-duplicate reuse of recent chat replies.
+
+Questions are embedded locally (CPU only, no model download) as hashed
+character n-gram TF vectors, optionally IDF-weighted from the training corpus.
+A new question reuses the reply of the most similar recent question when their
+cosine similarity reaches the configured threshold. Exact repeats are handled
+earlier by chatbot/response_cache.py.
+
+Off by default. THRESHOLD was tuned only on the 48 hand-labelled questions in
+chatbot/data/semantic_eval_questions.jsonl. Character n-grams score questions
+that differ in one decisive word close together ("Python jobs in London" vs
+"Java jobs in London" is 0.68), and a false reuse answers another question with
+confidence. Replay a sample of real traffic through eval_semantic_cache and
+check its false-reuse rate before turning it on.
+
+Configured through settings.CHAT_SEMANTIC_CACHE:
+    ENABLED      turn semantic reuse on/off
+    THRESHOLD    minimum cosine similarity for reuse
+                 (tune with `manage.py eval_semantic_cache`)
+    MAX_ENTRIES  recent questions kept (oldest overwritten first)
+    TTL          seconds a reply stays reusable
+    DIMENSIONS   size of the hashed feature space
+    FIT_IDF      weight features by IDF learnt from the training corpus
+"""
+
+import math
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+
+from .response_cache import normalize_message
+from .retrieval import STOPWORDS
+
+DEFAULT_CONFIG = {
+    "ENABLED": False,
+    "THRESHOLD": 0.7,
+    "MAX_ENTRIES": 1000,
+    "TTL": 6 * 60 * 60,
+    "DIMENSIONS": 2048,
+    "FIT_IDF": False,
+}
+
+
+class HashedTfidfVectorizer:
+    """
+    Character n-grams of each non-stopword (typo and plural tolerant) plus whole
+    words, hashed into a fixed number of buckets. IDF weights are learnt from a
+    reference corpus with fit(); unfitted, every feature weighs 1.
+    crc32 is used rather than hash() so vectors are stable across processes.
+    """
+
+    def __init__(self, dimensions: int = 2048, ngram_range=(3, 5)):
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+        self.idf = np.ones(dimensions, dtype=np.float32)
+
+    def features(self, text: str) -> Counter:
+        counts = Counter()
+        low, high = self.ngram_range
+        for word in normalize_message(text).split():
+            if word in STOPWORDS:
+                continue
+            counts[zlib.crc32(f"w:{word}".encode()) % self.dimensions] += 1
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                for i in range(len(padded) - n + 1):
+                    counts[zlib.crc32(padded[i:i + n].encode()) % self.dimensions] += 1
+        return counts
+
+    def fit(self, documents: Iterable[str]) -> "HashedTfidfVectorizer":
+        doc_freq = np.zeros(self.dimensions, dtype=np.float64)
+        n_docs = 0
+        for document in documents:
+            n_docs += 1
+            for bucket in self.features(document):
+                doc_freq[bucket] += 1
+        # Smoothed IDF, as in scikit-learn
+        self.idf = (np.log((1 + n_docs) / (1 + doc_freq)) + 1).astype(np.float32)
+        return self
+
+    def transform(self, text: str) -> np.ndarray:
+        """L2-normalised vector (all zeros for text with no usable words)"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for bucket, count in self.features(text).items():
+            vector[bucket] = 1 + math.log(count)
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector
+
+
+@dataclass
+class SemanticMatch:
+    reply: str
+    question: str
+    similarity: float
+
+
+class SemanticCache:
+    """
+    Fixed-size ring of recent (question vector, reply) pairs with top-1 cosine search.
+    Entries only match within the same tier and training-corpus hash.
+    """
+
+    def __init__(self, vectorizer: HashedTfidfVectorizer, threshold: float,
+                 max_entries: int = 1000, ttl: int = 6 * 60 * 60):
+        self.vectorizer = vectorizer
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._vectors = np.zeros((max_entries, vectorizer.dimensions), dtype=np.float32)
+        self._groups = np.full(max_entries, -1, dtype=np.int64)
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._questions = [None] * max_entries
+        self._replies = [None] * max_entries
+        self._group_ids = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _group_id(self, is_premium: bool, corpus_hash: str) -> int:
+        key = (bool(is_premium), corpus_hash)
+        if key not in self._group_ids:
+            self._group_ids[key] = len(self._group_ids)
+        return self._group_ids[key]
+
+    def lookup(self, message: str, is_premium: bool, corpus_hash: str = "") -> Optional[SemanticMatch]:
+        vector = self.vectorizer.transform(message)
+        match = None
+        with self._lock:
+            group = self._group_id(is_premium, corpus_hash)
+            live = (self._groups == group) & (self._expires > time.monotonic())
+            if vector.any() and live.any():
+                scores = self._vectors @ vector
+                scores[~live] = -1.0
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    match = SemanticMatch(self._replies[best], self._questions[best], float(scores[best]))
+
+            if match is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return match
+
+    def add(self, message: str, is_premium: bool, reply: str, corpus_hash: str = ""):
+        vector = self.vectorizer.transform(message)
+        if not vector.any():
+            return
+        with self._lock:
+            slot = self._next
+            self._next = (slot + 1) % self.max_entries
+            self._vectors[slot] = vector
+            self._groups[slot] = self._group_id(is_premium, corpus_hash)
+            self._expires[slot] = time.monotonic() + self.ttl
+            self._questions[slot] = message
+            self._replies[slot] = reply
+
+    def clear(self):
+        with self._lock:
+            self._groups.fill(-1)
+            self._questions = [None] * self.max_entries
+            self._replies = [None] * self.max_entries
+            self._next = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+
+def build_semantic_cache(config: dict = None, idf_documents: Iterable[str] = None) -> SemanticCache:
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    vectorizer = HashedTfidfVectorizer(config["DIMENSIONS"])
+    if idf_documents is not None:
+        vectorizer.fit(idf_documents)
+    return SemanticCache(vectorizer, config["THRESHOLD"], config["MAX_ENTRIES"], config["TTL"])
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Process-wide cache built from settings.CHAT_SEMANTIC_CACHE (None when disabled)"""
+    global _semantic_cache
+    config = {**DEFAULT_CONFIG, **getattr(settings, 'CHAT_SEMANTIC_CACHE', {})}
+    if not config["ENABLED"]:
+        return None
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                idf_documents = None
+                if config["FIT_IDF"]:
+                    from .gemini_client import get_corpus
+                    idf_documents = get_corpus()[0].iter_chunks()
+                _semantic_cache = build_semantic_cache(config, idf_documents)
+    return _semantic_cache
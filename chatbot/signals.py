@@ -0,0 +1,74 @@
+# chatbot/signals.py
+"""
+Model signal handlers, connected in ChatbotConfig.ready().
+"""
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import taxonomy
+from .authentication import forget_token, forget_user
+from .mentor_registry import get_mentor_registry
+from .models import Domain, Mentor, UserProfile
+
+
+def invalidate_mentor_registry():
+    # After commit, so a concurrent rebuild can't capture the old rows again
+    transaction.on_commit(get_mentor_registry().invalidate)
+
+
+@receiver(post_save, sender=Mentor, dispatch_uid="chatbot.tag_mentor")
+def retag_mentor(sender, instance, raw=False, **kwargs):
+    # Fixtures (raw) are loaded as-is; run retag_all() afterwards if needed
+    if not raw:
+        taxonomy.tag_mentor(instance)
+
+
+@receiver(post_save, sender=Mentor, dispatch_uid="chatbot.mentor_saved")
+@receiver(post_delete, sender=Mentor, dispatch_uid="chatbot.mentor_deleted")
+def mentor_changed(sender, instance, **kwargs):
+    invalidate_mentor_registry()
+
+
+@receiver(post_save, sender=User, dispatch_uid="chatbot.mentor_user_saved")
+def mentor_user_changed(sender, instance, update_fields=None, **kwargs):
+    # Every login saves last_login; that doesn't change what the registry shows
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    is_mentor = get_mentor_registry().contains_user(instance.pk)
+    if is_mentor is None:
+        is_mentor = Mentor.objects.filter(user_id=instance.pk, is_active=True).exists()
+    if is_mentor:
+        invalidate_mentor_registry()
+
+
+@receiver(post_save, sender=Domain, dispatch_uid="chatbot.domain_saved")
+@receiver(post_delete, sender=Domain, dispatch_uid="chatbot.domain_deleted")
+def taxonomy_changed(sender, instance, raw=False, **kwargs):
+    taxonomy.invalidate()
+    if not raw:
+        taxonomy.retag_all()
+    invalidate_mentor_registry()
+
+
+@receiver(post_save, sender=User, dispatch_uid="chatbot.auth_user_saved")
+@receiver(post_delete, sender=User, dispatch_uid="chatbot.auth_user_deleted")
+def auth_user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    # Deleted or deactivated users lose access in every worker, not just this one
+    forget_user(instance.pk, revoke=kwargs["signal"] is post_delete or not instance.is_active)
+
+
+@receiver(post_save, sender=UserProfile, dispatch_uid="chatbot.auth_profile_saved")
+@receiver(post_delete, sender=UserProfile, dispatch_uid="chatbot.auth_profile_deleted")
+def auth_profile_changed(sender, instance, **kwargs):
+    forget_user(instance.user_id)
+
+
+@receiver(post_delete, sender=Token, dispatch_uid="chatbot.auth_token_deleted")
+def auth_token_deleted(sender, instance, **kwargs):
+    forget_token(instance.key)
@@ -0,0 +1,183 @@
+# chatbot/taxonomy.py
+"""
+Data-driven mentor domains.
+
+Domains and their keywords live in the Domain table (editable in the admin).
+Each mentor's expertise is matched against them once, when the mentor or the
+taxonomy is saved (chatbot/signals.py), and the result is stored in
+MentorDomain. Finding the mentors of a domain is then one indexed query
+instead of a chain of icontains scans over the mentor table.
+
+Match ranks follow the original get_random_mentor_by_domain() order: exact
+expertise, then expertise containing the domain slug, then the first keyword
+(in list order) the expertise contains.
+
+The active domains used to classify messages are cached per process.
+invalidate() drops them and, with VERSION_STAMP on, bumps a version stamp in a
+cache every worker shares (see chatbot/version_stamp.py); other processes
+compare against it at most every CHECK_INTERVAL seconds. A table older than
+MAX_AGE seconds is reloaded regardless.
+
+Configured through settings.TAXONOMY:
+    VERSION_STAMP   share invalidations across processes through the cache
+    CACHE_ALIAS     Django cache alias holding the version stamp
+    CHECK_INTERVAL  seconds between version checks
+    MAX_AGE         seconds before the table is reloaded regardless (0: never)
+"""
+
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from . import intents
+from . import version_stamp as stamps
+from .models import Domain, Mentor, MentorDomain
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    "VERSION_STAMP": True,
+    "CACHE_ALIAS": "shared",
+    "CHECK_INTERVAL": 1.0,
+    "MAX_AGE": 5.0,
+}
+
+VERSION_KEY = "chatbot:taxonomy:version"
+
+_lock = threading.Lock()
+_table = None  # build_domain_table() of the active domains, loaded lazily
+_version = None  # shared version stamp the table was loaded at
+_loaded_at = 0.0
+_checked_at = 0.0
+_config = None
+
+
+def match_rank(expertise: str, slug: str, keywords) -> Optional[int]:
+    """How well a mentor's expertise matches a domain (lower is better); None if it doesn't"""
+    expertise = (expertise or "").lower()
+    if not expertise:
+        return None
+    if expertise == slug:
+        return MentorDomain.RANK_EXACT
+    if slug in expertise:
+        return MentorDomain.RANK_CONTAINS
+    for i, keyword in enumerate(keywords):
+        if keyword.lower() in expertise:
+            return MentorDomain.RANK_KEYWORD + i
+    return None
+
+
+# --- message -> domain ---
+
+def load_config() -> dict:
+    """settings.TAXONOMY; the version stamp only with a cache every worker shares"""
+    global _config
+    if _config is None:
+        config = {**DEFAULT_CONFIG, **getattr(settings, 'TAXONOMY', {})}
+        if config["VERSION_STAMP"] and not stamps.is_shared(config["CACHE_ALIAS"]):
+            logger.warning("🏷️ Taxonomy: CACHE_ALIAS %r is per process, other workers "
+                           "see domain edits after MAX_AGE only", config["CACHE_ALIAS"])
+            config["VERSION_STAMP"] = False
+        _config = config
+    return _config
+
+
+def _fresh(now, check: bool) -> bool:
+    """Can the loaded table still be used? Reads the shared stamp only when check is set"""
+    global _checked_at
+    config = load_config()
+    if _table is None or (config["MAX_AGE"] > 0 and now - _loaded_at >= config["MAX_AGE"]):
+        return False
+    if not config["VERSION_STAMP"] or now - _checked_at < config["CHECK_INTERVAL"]:
+        return True
+    if not check:
+        return False
+    _checked_at = now
+    return stamps.read(config["CACHE_ALIAS"], VERSION_KEY) == _version
+
+
+def domain_table() -> tuple:
+    """Active domains for intents.classify(domains=...); DOMAIN_KEYWORDS until the table is seeded"""
+    global _table, _version, _loaded_at, _checked_at
+    table = _table
+    if _fresh(time.monotonic(), check=True):
+        return table
+    with _lock:
+        if _table is None or _table is table:
+            config = load_config()
+            version = stamps.read(config["CACHE_ALIAS"], VERSION_KEY) if config["VERSION_STAMP"] else None
+            rows = Domain.objects.filter(is_active=True).values_list("slug", "keywords")
+            _table = intents.build_domain_table(dict(rows)) or intents.DEFAULT_DOMAINS
+            _version = version
+            _loaded_at = _checked_at = time.monotonic()
+        return _table
+
+
+async def adomain_table() -> tuple:
+    """domain_table() for async views; only a reload or a version check leaves the event loop"""
+    table = _table
+    return table if _fresh(time.monotonic(), check=False) else await sync_to_async(domain_table)()
+
+
+def invalidate():
+    """Drop the cached domain table here and, through the version stamp, in other workers"""
+    global _table
+    with _lock:
+        _table = None
+    config = load_config()
+    if config["VERSION_STAMP"]:
+        stamps.bump(config["CACHE_ALIAS"], VERSION_KEY)
+
+
+# --- mentor -> domains ---
+
+def mentor_tags(mentor: Mentor, domains) -> List[MentorDomain]:
+    tags = []
+    for domain in domains:
+        rank = match_rank(mentor.expertise, domain.slug, domain.keywords)
+        if rank is not None:
+            tags.append(MentorDomain(mentor=mentor, domain=domain, rank=rank))
+    return tags
+
+
+def tag_mentor(mentor: Mentor, domains=None):
+    """Recompute one mentor's domain tags"""
+    domains = list(Domain.objects.filter(is_active=True)) if domains is None else domains
+    with transaction.atomic():
+        MentorDomain.objects.filter(mentor=mentor).delete()
+        MentorDomain.objects.bulk_create(mentor_tags(mentor, domains))
+
+
+def retag_all():
+    """Recompute every mentor's tags (after a taxonomy change)"""
+    domains = list(Domain.objects.filter(is_active=True))
+    with transaction.atomic():
+        MentorDomain.objects.all().delete()
+        tags = []
+        for mentor in Mentor.objects.only("id", "expertise").iterator():
+            tags.extend(mentor_tags(mentor, domains))
+        MentorDomain.objects.bulk_create(tags, batch_size=500)
+
+
+def domain_tags(domain: str):
+    """Tags of the active mentors in a domain, best match first (one query)"""
+    return (
+        MentorDomain.objects.filter(domain__slug=domain, mentor__is_active=True)
+        .select_related("mentor__user")
+        .order_by("rank", "mentor_id")
+    )
+
+
+def mentors_for_domain(domain: str) -> List[Mentor]:
+    return [tag.mentor for tag in domain_tags(domain)]
+
+
+def random_mentor_for_domain(domain: str) -> Optional[Mentor]:
+    """A random active mentor among the domain's best matches (one query, one row)"""
+    tag = domain_tags(domain).order_by("rank", "?").first()
+    return tag.mentor if tag else None
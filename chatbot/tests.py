@@ -1,3 +1,1397 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from unittest import mock
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+import numpy as np
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import OperationalError, ProgrammingError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from googleapiclient.errors import HttpError
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import (authentication, calendar_client, calendar_mirror, conversation, intents, knowledge_base,
+               mentor_registry, metrics, response_cache, taxonomy, views)
+from .authentication import CachedTokenAuthentication, TokenCache, get_profile, get_token_cache
+from .availability import BusyIntervals, FreeBusyError, merge_intervals, slot_grid
+from .calendar_pool import CalendarServicePool
+from .entitlements import FileEntitlementStore, sync_premium_status
+from .fake_calendar import FakeCalendarServer
+from .fanout import CircuitBreaker, Fanout, FanoutError, reset_fanout
+from .logs import JsonFormatter
+from .mentor_registry import VERSION_KEY as MENTOR_VERSION_KEY, MentorRegistry, active_mentors, get_mentor_registry
+from .models import (AuditLog, CalendarEvent, CalendarSyncState, ChatHistory, Domain, Mentor, MentorDomain,
+                     TimeSlot, UserProfile)
+from .profiling import HEADER, ProfilingMiddleware, hot_frames, iter_profile_paths, read_profile, sign_header
+from .retrieval import BM25Index, chunk_spans, chunk_text, merge_spans
+from .semantic_cache import HashedTfidfVectorizer, SemanticCache
+from .write_behind import WriteBehindBuffer, flush_all, reset_write_behind
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def isolate_write_behind(test):
+    """
+    Keep rows the views queue in memory and write them at teardown, on the test's own
+    connection and inside its transaction, instead of from the background thread
+    after the test has rolled back
+    """
+    reset_write_behind()
+    override = override_settings(WRITE_BEHIND={**settings.WRITE_BEHIND, "AUTOSTART": False})
+    override.enable()
+    test.addCleanup(override.disable)
+    test.addCleanup(reset_write_behind)
+
+
+class WriteBehindFlushTests(TransactionTestCase):
+    """The background thread writes through its own DB connection, so no wrapping transaction"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("writer")
+
+    def turn(self, n):
+        return ChatHistory(user=self.user, message=f"q{n}", response=f"a{n}")
+
+    def test_flushes_when_batch_is_full(self):
+        buffer = WriteBehindBuffer(batch_size=3, flush_interval_ms=60000)
+        for n in range(3):
+            buffer.add(self.turn(n))
+        self.assertTrue(wait_for(lambda: ChatHistory.objects.count() == 3))
+        self.assertEqual(buffer.stats()["batches"], 1)
+        buffer.close()
+
+    def test_flushes_after_interval(self):
+        buffer = WriteBehindBuffer(batch_size=100, flush_interval_ms=50)
+        buffer.add(self.turn(1))
+        self.assertTrue(wait_for(lambda: ChatHistory.objects.count() == 1))
+        buffer.close()
+
+    def test_crash_loses_only_pending_and_shutdown_flushes_rest(self):
+        buffer = WriteBehindBuffer(batch_size=2, flush_interval_ms=60000)
+        for n in range(5):
+            buffer.add(self.turn(n))
+        self.assertTrue(wait_for(lambda: ChatHistory.objects.count() == 4))
+
+        # A crash at this point loses exactly what is still pending
+        self.assertEqual(buffer.pending, 1)
+
+        flush_all()  # what atexit / gunicorn worker_exit run
+        self.assertEqual(ChatHistory.objects.count(), 5)
+        self.assertEqual(buffer.pending, 0)
+
+    def test_mixed_models_and_failed_batches(self):
+        buffer = WriteBehindBuffer(batch_size=10, flush_interval_ms=60000, autostart=False)
+        buffer.add(self.turn(1))
+        buffer.add(AuditLog(user=self.user, action="login"))
+        buffer.add(ChatHistory(user_id=999999, message="orphan", response=""))  # FK violation
+        buffer.flush()
+
+        self.assertEqual(AuditLog.objects.count(), 1)
+        self.assertTrue(ChatHistory.objects.filter(message="q1").exists())
+        self.assertEqual(buffer.stats()["written"], 2)
+        self.assertEqual(buffer.stats()["failed"], 1)
+
+        # The writer keeps going after a failed batch
+        buffer.add(self.turn(2))
+        buffer.flush()
+        self.assertTrue(ChatHistory.objects.filter(message="q2").exists())
+
+    def test_unexpected_database_error_does_not_stop_the_writer(self):
+        bulk_create = ChatHistory.objects.bulk_create
+
+        def broken(objs, *args, **kwargs):
+            if any(obj.message == "bad" for obj in objs):
+                raise ProgrammingError("no such function: bad")
+            return bulk_create(objs, *args, **kwargs)
+
+        buffer = WriteBehindBuffer(batch_size=2, flush_interval_ms=60000)
+        with mock.patch.object(ChatHistory.objects, "bulk_create", side_effect=broken):
+            buffer.add(self.turn(1))
+            buffer.add(ChatHistory(user=self.user, message="bad", response=""))
+            self.assertTrue(wait_for(lambda: buffer.stats()["failed"] == 1))
+            buffer.add(self.turn(2))
+            buffer.add(self.turn(3))
+            self.assertTrue(wait_for(lambda: ChatHistory.objects.count() == 3))
+        self.assertEqual(sorted(ChatHistory.objects.values_list("message", flat=True)), ["q1", "q2", "q3"])
+        buffer.close()
+
+    def test_dead_writer_thread_is_restarted(self):
+        buffer = WriteBehindBuffer(batch_size=1, flush_interval_ms=60000)
+        buffer.add(self.turn(1))
+        self.assertTrue(wait_for(lambda: ChatHistory.objects.count() == 1))
+
+        # As if the thread had died on an error nothing caught
+        buffer._closing = True
+        with buffer._cond:
+            buffer._cond.notify_all()
+        buffer._thread.join(5)
+        buffer._closing = False
+
+        buffer.add(self.turn(2))
+        self.assertTrue(wait_for(lambda: ChatHistory.objects.count() == 2))
+        buffer.close()
+
+
+class WriteBehindBackpressureTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("producer")
+
+    def fill(self, buffer, count):
+        return [buffer.add(AuditLog(user=self.user, action=f"event{n}")) for n in range(count)]
+
+    def test_drop_newest(self):
+        buffer = WriteBehindBuffer(max_pending=3, overflow="drop_newest", autostart=False)
+        self.assertEqual(self.fill(buffer, 5), [True, True, True, False, False])
+        buffer.flush()
+        self.assertEqual(sorted(AuditLog.objects.values_list("action", flat=True)),
+                         ["event0", "event1", "event2"])
+        self.assertEqual(buffer.stats()["dropped"], 2)
+
+    def test_drop_oldest(self):
+        buffer = WriteBehindBuffer(max_pending=3, overflow="drop_oldest", autostart=False)
+        self.fill(buffer, 5)
+        buffer.flush()
+        self.assertEqual(sorted(AuditLog.objects.values_list("action", flat=True)),
+                         ["event2", "event3", "event4"])
+
+    def test_block_gives_up_after_timeout(self):
+        buffer = WriteBehindBuffer(max_pending=2, overflow="block", block_timeout_ms=50, autostart=False)
+        self.fill(buffer, 2)
+        start = time.monotonic()
+        self.assertFalse(buffer.add(AuditLog(user=self.user, action="late")))
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertEqual(buffer.pending, 2)
+
+    def test_non_blocking_add_drops_at_once(self):
+        buffer = WriteBehindBuffer(max_pending=2, overflow="block", block_timeout_ms=5000, autostart=False)
+        self.fill(buffer, 2)
+        start = time.monotonic()
+        self.assertFalse(buffer.add(AuditLog(user=self.user, action="late"), block=False))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(buffer.stats()["dropped"], 1)
+
+
+class WriteBehindRetryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("retrier")
+        self.bulk_create = AuditLog.objects.bulk_create
+
+    def locked(self, times):
+        calls = []
+
+        def bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) <= times:
+                raise OperationalError("database table is locked")
+            return self.bulk_create(objs, *args, **kwargs)
+
+        return mock.patch.object(AuditLog.objects, "bulk_create", side_effect=bulk_create), calls
+
+    def test_locked_table_is_retried_not_dropped(self):
+        buffer = WriteBehindBuffer(retry_delay_ms=1, autostart=False)
+        for n in range(3):
+            buffer.add(AuditLog(user=self.user, action=f"event{n}"))
+        patch, calls = self.locked(times=2)
+        with patch:
+            self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(calls, [3, 3, 3])  # whole batch again, not row by row
+        self.assertEqual(sorted(AuditLog.objects.values_list("action", flat=True)),
+                         ["event0", "event1", "event2"])
+        self.assertEqual(buffer.stats()["failed"], 0)
+        self.assertEqual(buffer.stats()["retries"], 2)
+
+    def test_gives_up_after_max_retries(self):
+        buffer = WriteBehindBuffer(max_retries=2, retry_delay_ms=1, autostart=False)
+        buffer.add(AuditLog(user=self.user, action="stuck"))
+        patch, calls = self.locked(times=10)
+        with patch:
+            buffer.flush()
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(buffer.stats()["failed"], 1)
+        self.assertEqual(buffer.pending, 0)
+
+
+class IntentClassifierTests(TestCase):
+    """Golden answers recorded from the original keyword checks"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        path = Path(__file__).resolve().parent / "data" / "intent_golden.jsonl"
+        with open(path, encoding="utf-8") as f:
+            cls.golden = [json.loads(line) for line in f if line.strip()]
+
+    def test_classify_matches_golden_corpus(self):
+        for case in self.golden:
+            with self.subTest(message=case["message"]):
+                self.assertEqual(
+                    intents.classify(case["message"]),
+                    intents.Intent(case["is_meeting"], case["is_cancel"], case["domain"], case["duration"]),
+                )
+
+    def test_wrappers_match_classify(self):
+        # detect_domain_from_message reads the Domain table seeded by migration 0020
+        from .utils import extract_duration, is_meeting_request
+        from .views import detect_domain_from_message, is_cancel_request
+
+        taxonomy.invalidate()
+        for case in self.golden:
+            message = case["message"]
+            with self.subTest(message=message):
+                self.assertEqual(is_meeting_request(message), case["is_meeting"])
+                self.assertEqual(is_cancel_request(message), case["is_cancel"])
+                self.assertEqual(detect_domain_from_message(message), case["domain"])
+                self.assertEqual(extract_duration(message), case["duration"])
+
+    def test_domain_priority_beats_position(self):
+        # 'ads' (marketing) overlaps 'sql' (data); 'profile optimization' (linkedin) contains 'profile' (cv)
+        self.assertEqual(intents.classify("adsql").domain, "marketing")
+        self.assertEqual(intents.classify("sql then ads").domain, "marketing")
+        self.assertEqual(intents.classify("profile optimization").domain, "cv")
+        self.assertEqual(intents.classify("recruitment").domain, "design")  # via 'ui'
+
+    def test_minutes_win_over_hours(self):
+        self.assertEqual(intents.classify("1 hour 30 min").duration, 30)
+        self.assertEqual(intents.classify("book 2 hours").duration, 120)
+        self.assertEqual(intents.classify("book a call").duration, intents.DEFAULT_DURATION)
+
+
+class MentorDomainTagTests(TestCase):
+
+    def mentor(self, username, expertise):
+        return Mentor.objects.create(user=User.objects.create_user(username), expertise=expertise)
+
+    def test_saving_a_mentor_tags_it(self):
+        mentor = self.mentor("ana", "Digital Marketing & SEO")
+        self.assertEqual(list(mentor.domain_tags.values_list("domain__slug", "rank")),
+                         [("marketing", MentorDomain.RANK_CONTAINS)])
+
+        mentor.expertise = "Python and SQL"
+        mentor.save()
+        self.assertEqual(taxonomy.mentors_for_domain("data"), [mentor])
+        self.assertEqual(taxonomy.mentors_for_domain("marketing"), [])
+
+    def test_best_match_rank_wins(self):
+        exact = self.mentor("exact", "data")
+        by_keyword = self.mentor("keyword", "statistics")
+        self.assertEqual(taxonomy.mentors_for_domain("data"), [exact, by_keyword])
+        self.assertEqual({taxonomy.random_mentor_for_domain("data") for _ in range(10)}, {exact})
+
+        Mentor.objects.filter(pk=exact.pk).update(is_active=False)
+        self.assertEqual(taxonomy.random_mentor_for_domain("data"), by_keyword)
+
+    def test_taxonomy_edit_retags_mentors(self):
+        mentor = self.mentor("bea", "Kubernetes")
+        domain = Domain.objects.create(slug="devops", name="DevOps", keywords=["kubernetes", "docker"], priority=20)
+        self.assertEqual(taxonomy.mentors_for_domain("devops"), [mentor])
+        self.assertEqual(intents.detect_domain("help with docker", taxonomy.domain_table()), "devops")
+
+        domain.delete()
+        self.assertFalse(MentorDomain.objects.filter(mentor=mentor).exists())
+        self.assertEqual(intents.detect_domain("help with docker", taxonomy.domain_table()), "general")
+
+
+class DomainTableTests(TestCase):
+    """Domain edits reach workers that never saw the signal"""
+
+    def setUp(self):
+        taxonomy.invalidate()
+        self.addCleanup(taxonomy.invalidate)  # don't leave the rolled-back domain behind
+        self.table = taxonomy.domain_table()
+        # Saved by another worker: no signal in this process
+        Domain.objects.bulk_create([Domain(slug="devops", name="DevOps", keywords=["docker"], priority=20)])
+
+    def detect(self):
+        return intents.detect_domain("help with docker", taxonomy.domain_table())
+
+    def test_version_stamp_reloads_the_table(self):
+        self.assertEqual(self.detect(), "general")
+        caches["shared"].set(taxonomy.VERSION_KEY, "bumped by another worker", timeout=None)
+        self.assertEqual(self.detect(), "general")  # checked at most every CHECK_INTERVAL
+        taxonomy._checked_at -= 1
+        self.assertEqual(self.detect(), "devops")
+
+    def test_table_is_reloaded_after_max_age(self):
+        self.assertIs(taxonomy.domain_table(), self.table)
+        taxonomy._loaded_at -= 5
+        self.assertEqual(self.detect(), "devops")
+
+
+class MentorRegistryTests(TestCase):
+
+    def setUp(self):
+        caches["shared"].delete(MENTOR_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mentor = Mentor.objects.create(user=User.objects.create_user("reg1"), expertise="Data")
+
+    def usernames(self, snapshot):
+        return [entry.username for entry in snapshot]
+
+    def test_saving_or_deleting_a_mentor_invalidates_the_snapshot(self):
+        self.assertEqual(self.usernames(active_mentors()), ["reg1"])
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Mentor.objects.create(user=User.objects.create_user("reg2"), expertise="Design")
+        self.assertEqual(self.usernames(active_mentors()), ["reg1", "reg2"])
+        self.assertEqual(active_mentors().get(other.id).domains, (("design", MentorDomain.RANK_EXACT),))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mentor.user.username = "reg3"
+            self.mentor.user.save()
+        self.assertEqual(self.usernames(active_mentors()), ["reg2", "reg3"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(self.usernames(active_mentors()), ["reg3"])
+
+    def test_snapshot_is_reused_until_invalidated(self):
+        snapshot = active_mentors()
+        with self.assertNumQueries(0):
+            self.assertIs(active_mentors(), snapshot)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mentor.user.save(update_fields=["last_login"])  # logins don't invalidate
+        self.assertIs(active_mentors(), snapshot)
+
+    def test_version_stamp_refreshes_other_processes(self):
+        this_worker = MentorRegistry(version_stamp=True, check_interval=0)
+        other_worker = MentorRegistry(version_stamp=True, check_interval=0)
+        self.assertEqual(self.usernames(other_worker.snapshot()), ["reg1"])
+
+        Mentor.objects.create(user=User.objects.create_user("reg2"), expertise="Design")
+        this_worker.invalidate()  # what the signal handlers run after commit
+        self.assertEqual(self.usernames(other_worker.snapshot()), ["reg1", "reg2"])
+        self.assertEqual(other_worker.rebuilds, 2)
+
+    def test_version_is_checked_at_most_every_interval(self):
+        this_worker = MentorRegistry(version_stamp=True, check_interval=60)
+        other_worker = MentorRegistry(version_stamp=True, check_interval=60)
+        snapshot = other_worker.snapshot()
+        this_worker.invalidate()
+        self.assertIs(other_worker.snapshot(), snapshot)
+        other_worker._checked_at -= 60
+        self.assertIsNot(other_worker.snapshot(), snapshot)
+
+    def test_snapshot_is_rebuilt_after_max_age(self):
+        registry = MentorRegistry(max_age=5)
+        snapshot = registry.snapshot()
+        Mentor.objects.create(user=User.objects.create_user("reg2"), expertise="Design")  # no invalidation
+        self.assertIs(registry.snapshot(), snapshot)
+        registry._built_at -= 5
+        self.assertEqual(self.usernames(registry.snapshot()), ["reg1", "reg2"])
+
+    def test_version_stamp_is_off_without_a_shared_cache(self):
+        with mock.patch.object(mentor_registry, "_registry", None), \
+                override_settings(MENTOR_REGISTRY={"CACHE_ALIAS": "default"}):
+            self.assertFalse(get_mentor_registry().version_stamp)
+        with mock.patch.object(mentor_registry, "_registry", None):
+            self.assertTrue(get_mentor_registry().version_stamp)
+
+
+class PremiumSyncTests(TestCase):
+
+    def test_sync_promotes_demotes_and_creates_profiles(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "users.csv"
+            path.write_text("email,type\nGold@Example.com,premium\nlapsed@example.com,standard\nnew@example.com,premium\n")
+            store = FileEntitlementStore([{"PATH": path, "TYPE": None}], check_interval=0)
+
+            gold = UserProfile.objects.create(user=User.objects.create_user("gold", "gold@example.com"))
+            lapsed = UserProfile.objects.create(
+                user=User.objects.create_user("lapsed", "lapsed@example.com"), is_premium=True)
+            new = User.objects.create_user("new", "new@example.com")
+
+            self.assertEqual(sync_premium_status(dry_run=True, store=store)["promoted"], 1)
+            gold.refresh_from_db()
+            self.assertFalse(gold.is_premium)
+
+            counts = sync_premium_status(batch_size=1, store=store)
+            self.assertEqual(counts, {"checked": 2, "promoted": 1, "demoted": 1, "unchanged": 0, "created": 1})
+            gold.refresh_from_db()
+            lapsed.refresh_from_db()
+            self.assertTrue(gold.is_premium)
+            self.assertFalse(lapsed.is_premium)
+            self.assertTrue(UserProfile.objects.get(user=new).is_premium)
+            self.assertEqual(sync_premium_status(store=store)["unchanged"], 3)
+
+
+class EntitlementStoreTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "users.csv"
+        self.path.write_text("email,type\nann@example.com,premium\n")
+        self.store = FileEntitlementStore([{"PATH": self.path, "TYPE": None}], check_interval=0)
+        self.addCleanup(self.reloaded)  # before the directory goes away
+
+    def reloaded(self):
+        return wait_for(lambda: not self.store._reload_lock.locked())
+
+    def write(self, text, mtime_ns):
+        self.path.write_text(text)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))  # coarse file clocks may not move between writes
+
+    def test_changed_file_is_reloaded_in_the_background(self):
+        self.assertEqual(self.store.lookup("ANN@example.com"), {"email": "ann@example.com", "type": "premium"})
+        self.write("email,type\nann@example.com,standard\nbob@example.com,premium\n", 10 ** 18)
+        self.assertTrue(wait_for(lambda: self.store.lookup("bob@example.com") is not None))
+        self.assertEqual(self.store.lookup("ann@example.com")["type"], "standard")
+        self.assertEqual(self.store.loads, 2)
+
+    def test_unchanged_content_is_not_parsed_again(self):
+        self.store.lookup("ann@example.com")
+        self.write(self.path.read_text(), 10 ** 18)  # new mtime, same bytes
+        self.store.lookup("ann@example.com")
+        self.assertTrue(wait_for(lambda: self.store._signature[0][0] == 10 ** 18))
+        self.assertEqual(self.store.loads, 1)
+
+    def test_files_are_not_checked_within_the_interval(self):
+        self.store.check_interval = 60
+        self.store.lookup("ann@example.com")
+        with mock.patch("chatbot.entitlements.os.stat") as stat:
+            self.assertIsNotNone(self.store.lookup("ann@example.com"))
+        stat.assert_not_called()
+
+    def test_missing_or_malformed_file_keeps_the_previous_data(self):
+        self.store.lookup("ann@example.com")
+        self.path.unlink()
+        self.store.lookup("ann@example.com")
+        self.assertTrue(self.reloaded())
+        self.assertEqual(self.store.lookup("ann@example.com")["type"], "premium")
+
+        self.path.write_bytes(b"email,type\n\xff\xfe@example.com,premium\n")  # not UTF-8
+        self.store.lookup("ann@example.com")
+        self.assertTrue(self.reloaded())
+        self.assertEqual(self.store.lookup("ann@example.com")["type"], "premium")
+
+        self.write("email,type\nbob@example.com,premium\n", 10 ** 18)
+        self.assertTrue(wait_for(lambda: self.store.lookup("ann@example.com") is None))
+
+    def test_missing_file_on_first_load_is_empty(self):
+        self.path.unlink()
+        self.assertIsNone(self.store.lookup("ann@example.com"))
+        self.assertEqual(len(self.store), 0)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        isolate_write_behind(self)
+        get_token_cache().clear()
+        self.user = User.objects.create_user("tok", "tok@example.com", "pw")
+        self.profile = UserProfile.objects.create(user=self.user, is_premium=True)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def authenticate(self):
+        user, _ = CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        return user
+
+    def test_second_request_authenticates_from_cache(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(self.client.get("/api/test/").data["user_authenticated"])
+        with self.assertNumQueries(0):
+            self.assertTrue(self.client.get("/api/test/").data["user_authenticated"])
+            self.assertTrue(get_profile(self.authenticate()).is_premium)
+
+    def test_cached_instances_are_not_shared(self):
+        first = self.authenticate()
+        get_profile(first).session_count = 99
+        self.assertEqual(get_profile(self.authenticate()).session_count, 0)
+
+    def test_profile_save_invalidates(self):
+        self.authenticate()
+        self.profile.is_premium = False
+        self.profile.save()
+        with self.assertNumQueries(1):
+            self.assertFalse(get_profile(self.authenticate()).is_premium)
+
+    def test_expired_token_is_rejected_and_login_rotates_it(self):
+        Token.objects.filter(pk=self.token.pk).update(created=timezone.now() - timedelta(days=2))
+        with override_settings(TOKEN_EXPIRY_TIME=86400):
+            self.assertEqual(self.client.get("/api/test/").status_code, 401)
+            response = APIClient().post("/api/auth/login/", {"email": "tok@example.com", "password": "pw"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data["token"], self.token.key)
+
+    def test_logout_drops_cached_token(self):
+        self.client.get("/api/test/")
+        self.assertEqual(self.client.post("/api/auth/logout/").status_code, 200)
+        self.assertEqual(self.client.get("/api/test/").status_code, 401)
+
+    def test_logout_reaches_other_processes_caches(self):
+        other_worker = TokenCache(100, 60, version_stamp=True, check_interval=0)
+        other_worker.set(Token.objects.select_related("user", "user__userprofile").get(pk=self.token.pk))
+        self.assertIsNotNone(other_worker.get(self.token.key))
+
+        self.assertEqual(self.client.post("/api/auth/logout/").status_code, 200)
+        self.assertIsNone(other_worker.get(self.token.key))
+
+    def test_deactivating_a_user_reaches_other_processes_caches(self):
+        other_worker = TokenCache(100, 60, version_stamp=True, check_interval=0)
+        other_worker.set(Token.objects.select_related("user", "user__userprofile").get(pk=self.token.pk))
+        self.assertIsNotNone(other_worker.get(self.token.key))
+        self.profile.save()  # ordinary changes stay local
+        self.assertIsNotNone(other_worker.get(self.token.key))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(other_worker.get(self.token.key))
+
+    def test_revocation_reaches_an_independent_cache(self):
+        def in_other_worker(fn):  # another thread gets its own cache connection; only the files are shared
+            result = []
+            thread = threading.Thread(target=lambda: result.append(fn()))
+            thread.start()
+            thread.join()
+            return result[0]
+
+        token = Token.objects.select_related("user", "user__userprofile").get(pk=self.token.pk)
+        with tempfile.TemporaryDirectory() as tmp, override_settings(CACHES={
+            **settings.CACHES, "shared": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                                          "LOCATION": tmp}}):
+            this_worker = TokenCache(100, 60, version_stamp=True, check_interval=0)
+            other_worker = TokenCache(100, 60, version_stamp=True, check_interval=0)
+            in_other_worker(lambda: other_worker.set(token))
+            self.assertIsNotNone(in_other_worker(lambda: other_worker.get(token.key)))
+
+            this_worker.invalidate(token.key)  # logout in this worker
+            self.assertIsNone(in_other_worker(lambda: other_worker.get(token.key)))
+
+    def test_token_cache_is_off_without_a_shared_cache(self):
+        with mock.patch.object(authentication, "_cache", None), \
+                override_settings(TOKEN_AUTH_CACHE={"TTL": 60, "CACHE_ALIAS": "default"}):
+            self.assertEqual(get_token_cache().ttl, 0)
+        with mock.patch.object(authentication, "_cache", None), \
+                override_settings(TOKEN_AUTH_CACHE={"TTL": 60, "VERSION_STAMP": False}):
+            self.assertEqual(get_token_cache().ttl, 0)
+        with mock.patch.object(authentication, "_cache", None):
+            self.assertEqual(get_token_cache().ttl, 60)
+
+
+class EndpointQueryCountTests(TestCase):
+    """Upper bounds on queries per warm request; the profile comes with the cached token"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("plus", "plus@example.com", "pw")
+        UserProfile.objects.create(user=cls.user, is_premium=True)
+        cls.token = Token.objects.create(user=cls.user)
+        cls.mentor = Mentor.objects.create(user=User.objects.create_user("m1", "m1@example.com"), expertise="Data")
+
+    def setUp(self):
+        isolate_write_behind(self)
+        get_token_cache().clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.client.get("/api/test/")  # warm the token cache
+        active_mentors()  # the mentor registry
+        taxonomy.domain_table()  # and the domain table
+
+    def assertMaxQueries(self, limit, method, path, data=None, status=200):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data, format="json")
+        self.assertEqual(response.status_code, status, response.content)
+        sql = [q["sql"] for q in queries]
+        self.assertLessEqual(len(sql), limit, "\n".join(sql))
+        self.assertFalse([q for q in sql if "user_profiles" in q], "profile queried again")
+        return response
+
+    def test_chat_booking_request(self):
+        self.assertMaxQueries(1, "post", "/api/chat/", {"message": "Can I book a meeting?"})
+
+    def test_chat_stream_booking_request(self):
+        self.assertMaxQueries(1, "post", "/api/chat/stream/", {"message": "Can I book a meeting?"})
+
+    def test_chat_free_user_cancel(self):
+        UserProfile.objects.filter(user=self.user).update(is_premium=False)
+        get_token_cache().clear()
+        self.client.get("/api/test/")
+        self.assertMaxQueries(0, "post", "/api/chat/", {"message": "cancel my session"})
+
+    def test_mentor_list(self):
+        self.assertMaxQueries(0, "get", "/api/mentors/")
+
+    def test_book_slot_mentor_selection(self):
+        self.assertMaxQueries(4, "post", "/api/book-slot/", {})
+
+    def test_mentor_slots(self):
+        TimeSlot.objects.create(
+            mentor=self.mentor, date=timezone.now().date() + timedelta(days=1),
+            start_time="10:00", end_time="10:15",
+        )
+        self.assertMaxQueries(3, "get", f"/api/slots/{self.mentor.id}/")
+
+    def test_cancel_and_reschedule_without_booking(self):
+        self.assertMaxQueries(1, "post", "/api/timeslot/cancel/", {}, status=404)
+        self.assertMaxQueries(1, "post", "/api/timeslot/reschedule/", {}, status=404)
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        isolate_write_behind(self)
+        metrics.registry.reset()
+
+    def test_histogram_buckets_and_quantiles(self):
+        for value in range(64):
+            self.assertEqual(metrics.bucket_bounds(metrics.bucket_index(value)), (value, value + 1))
+        for value in (64, 100, 1000, 123456, 10 ** 9):
+            low, high = metrics.bucket_bounds(metrics.bucket_index(value))
+            self.assertTrue(low <= value < high)
+            self.assertLessEqual((high - low) / low, 1 / 32)
+
+        histogram = metrics.Histogram(unit=1e-6)
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.5, delta=0.5 * 0.03)
+        self.assertAlmostEqual(histogram.quantile(0.99), 0.99, delta=0.99 * 0.03)
+        self.assertEqual(dict(histogram.cumulative(9, 20))[2 ** 20 * 1e-6], 1000)
+
+    def test_middleware_records_route_queries_and_external_calls(self):
+        user = User.objects.create_user("metered")
+        UserProfile.objects.create(user=user, is_premium=True)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        get_token_cache().clear()
+        with mock.patch("chatbot.views.ask_gemini", side_effect=self.fake_gemini), \
+                mock.patch("chatbot.views.record_turn"):  # keep the write-behind buffer empty
+            client.post("/api/chat/", {"message": "what is a CV?"}, format="json")
+
+        queries = metrics.registry.histogram("chatbot_db_queries_per_request", route="chat")
+        self.assertEqual(queries.count, 1)
+        self.assertGreaterEqual(queries.sum, 1)
+        gemini = metrics.registry.histogram("chatbot_external_call_duration_seconds", route="chat", service="gemini")
+        self.assertEqual(gemini.count, 1)
+
+        with override_settings(METRICS={"TOKEN": "s3cret"}):
+            text = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").content.decode()
+        self.assertIn('chatbot_http_requests_total{route="chat",method="POST",status="200"} 1', text)
+        self.assertIn('chatbot_http_request_duration_seconds_count{route="chat"} 1', text)
+        self.assertIn('chatbot_external_call_duration_seconds_bucket{route="chat",service="gemini",le="+Inf"} 1', text)
+
+    def fake_gemini(self, message, is_premium=False, history=None):
+        with metrics.track_external("gemini"):
+            return "A CV is a summary of your experience."
+
+    @override_settings(METRICS={"TOKEN": "s3cret"})
+    def test_scrape_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+    @override_settings(METRICS={"TOKEN": ""})
+    def test_scrape_without_a_configured_token_is_refused(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer ").status_code, 403)
+
+
+class StructuredLoggingTests(TestCase):
+    start = datetime(2025, 3, 3, 8, 0, tzinfo=calendar_client.UK_TZ)  # a Monday
+
+    def search(self):
+        busy = lambda emails, start, end: {email: BusyIntervals([(start, end)]) for email in emails}
+        with mock.patch.object(calendar_client, "get_busy_intervals", busy):
+            return calendar_client.find_next_available_15min_slot("mentor@example.com", after=self.start)
+
+    def test_per_slot_lines_only_at_debug(self):
+        with self.assertLogs("chatbot.calendar_client", level=logging.INFO) as logs:
+            self.search()
+        self.assertEqual([r.levelname for r in logs.records], ["WARNING"])
+
+        with self.assertLogs("chatbot.calendar_client", level=logging.DEBUG) as logs:
+            self.search()
+        busy = [r for r in logs.records if r.getMessage().startswith("❌ Slot busy")]
+        self.assertEqual(len(busy), 4 * len(calendar_client.AVAILABLE_TIME_SLOTS))
+
+    def test_json_formatter_includes_extra_fields(self):
+        record = logging.getLogger("chatbot.test").makeRecord(
+            "chatbot.test", logging.INFO, __file__, 1, "found %d slots", (3,), None,
+            extra={"mentor": "mentor@example.com", "slot_start": self.start},
+        )
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry["message"], "found 3 slots")
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["mentor"], "mentor@example.com")
+        self.assertEqual(entry["slot_start"], self.start.isoformat())
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.settings_override = override_settings(PROFILING={
+            "ENABLED": True, "SAMPLE_RATE": 0, "INTERVAL": 0.001, "DIRECTORY": self.directory.name, "MAX_FILES": 2,
+        })
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def slow_view(self, request):
+        time.sleep(0.03)
+        return HttpResponse("ok")
+
+    def profiles(self):
+        return sorted(iter_profile_paths(Path(self.directory.name)))
+
+    def test_signed_header_profiles_the_request(self):
+        middleware = ProfilingMiddleware(self.slow_view)
+        middleware(RequestFactory().get("/api/test/"))
+        middleware(RequestFactory().get("/api/test/", HTTP_X_PROFILE="forged:value"))
+        self.assertEqual(self.profiles(), [])
+
+        middleware(RequestFactory().get("/api/test/", **{f"HTTP_{HEADER.upper().replace('-', '_')}": sign_header()}))
+        [path] = self.profiles()
+        own, inclusive, routes = hot_frames([read_profile(path)])
+        self.assertEqual(list(routes), ["GET unmatched"])
+        self.assertTrue(any(frame.startswith("slow_view (") for frame in inclusive))
+
+    def test_sample_rate_and_rotation(self):
+        with override_settings(PROFILING={"ENABLED": True, "SAMPLE_RATE": 1, "INTERVAL": 0.001,
+                                          "DIRECTORY": self.directory.name, "MAX_FILES": 2}):
+            middleware = ProfilingMiddleware(self.slow_view)
+        for _ in range(3):
+            middleware(RequestFactory().get("/api/test/"))
+        self.assertEqual(len(self.profiles()), 2)
+
+
+class CalendarServicePoolTests(TestCase):
+    def test_clients_are_reused_per_thread_with_one_token(self):
+        day = datetime(2025, 3, 3, 9, 0, tzinfo=calendar_client.UK_TZ)
+        with FakeCalendarServer() as server, tempfile.TemporaryDirectory() as tmp:
+            key_file = server.write_service_account(Path(tmp) / "service_account.json")
+            server.add_event("mentor@example.com", day, day + timedelta(minutes=15))
+            pool = CalendarServicePool(api_endpoint=server.api_endpoint)
+
+            def list_events(service):
+                return service.events().list(calendarId="mentor@example.com", timeMin=day.isoformat(),
+                                             timeMax=(day + timedelta(hours=8)).isoformat()).execute()["items"]
+
+            service = pool.service(key_file, "mentor@example.com")
+            self.assertIs(pool.service(key_file, "mentor@example.com"), service)
+            self.assertEqual(len(list_events(service)), 1)
+
+            other = []
+            thread = threading.Thread(target=lambda: other.append(pool.service(key_file, "mentor@example.com")))
+            thread.start()
+            thread.join()
+            self.assertIsNot(other[0], service)
+            self.assertIsNot(other[0]._http, service._http)
+            self.assertIs(other[0]._http.credentials, service._http.credentials)
+            self.assertEqual(len(list_events(other[0])), 1)
+
+            self.assertEqual(server.requests["POST token"], 1)
+            self.assertEqual(server.connections, 2)
+
+
+class AvailabilityEngineTests(TestCase):
+    day = datetime(2025, 3, 3, 9, 0, tzinfo=calendar_client.UK_TZ)  # a Monday
+
+    def random_periods(self, rng, n):
+        """Busy periods on a 5-minute grid (so edges touch often), some empty or reversed, in mixed zones"""
+        zones = [calendar_client.UK_TZ, ZoneInfo("UTC"), ZoneInfo("Asia/Kolkata")]
+        periods = []
+        for _ in range(n):
+            start = self.day + timedelta(minutes=5 * rng.randrange(-20, 600))
+            end = start + timedelta(minutes=5 * rng.randrange(-1, 15))
+            zone = rng.choice(zones)
+            periods.append((start.astimezone(zone), end.astimezone(zone)))
+        return periods
+
+    def test_busy_intervals_agree_with_has_overlap(self):
+        # property check against the linear scan, over many random calendars
+        for seed in range(200):
+            rng = random.Random(seed)
+            periods = self.random_periods(rng, rng.randrange(0, 60))
+            valid = [p for p in periods if p[0] < p[1]]  # has_overlap never matches an empty range
+            busy = BusyIntervals(periods)
+            self.assertEqual(busy.intervals, merge_intervals(valid))
+
+            slots = []
+            for _ in range(50):
+                start = self.day + timedelta(minutes=5 * rng.randrange(-30, 620))
+                slots.append((start, start + timedelta(minutes=5 * rng.randrange(1, 7))))
+            expected = [calendar_client.has_overlap(s, e, valid) for s, e in slots]
+            self.assertEqual([busy.overlaps(s, e) for s, e in slots], expected, seed)
+            mask = busy.free_mask(np.array([s.timestamp() for s, _ in slots]),
+                                  np.array([e.timestamp() for _, e in slots]))
+            self.assertEqual((~mask).tolist(), expected, seed)
+
+    def test_slot_grid_matches_slot_bounds_across_dst(self):
+        dates = [datetime(2025, 3, 28).date() + timedelta(days=i) for i in range(5)]  # clocks change on the 30th
+        dates += [datetime(2025, 10, 24).date() + timedelta(days=i) for i in range(5)]  # and on 26 October
+        starts, ends = slot_grid(dates, calendar_client.AVAILABLE_TIME_SLOTS, calendar_client.UK_TZ)
+        for d, day in enumerate(dates):
+            for j, slot in enumerate(calendar_client.AVAILABLE_TIME_SLOTS):
+                slot_start, slot_end = calendar_client.slot_bounds(day, slot)
+                self.assertEqual((starts[d, j], ends[d, j]), (slot_start.timestamp(), slot_end.timestamp()))
+
+    def test_day_search_matches_has_overlap(self):
+        for seed in range(50):
+            rng = random.Random(seed)
+            periods = [p for p in self.random_periods(rng, rng.randrange(0, 30)) if p[0] < p[1]]
+            earliest = self.day + timedelta(minutes=15 * rng.randrange(0, 40))
+            found = calendar_client.get_slots_for_specific_day_helper(
+                "student@example.com", self.day.date(), "mentor@example.com",
+                earliest_allowed=earliest, busy=BusyIntervals(periods))
+            expected = [slot_start for slot_start, slot_end in
+                        (calendar_client.slot_bounds(self.day.date(), slot) for slot in calendar_client.AVAILABLE_TIME_SLOTS)
+                        if slot_start >= earliest and not calendar_client.has_overlap(slot_start, slot_end, periods)]
+            self.assertEqual([slot["start_time"] for slot in found], expected, seed)
+
+    def test_thirty_day_search_is_one_freebusy_query(self):
+        with FakeCalendarServer() as server, tempfile.TemporaryDirectory() as tmp:
+            key_file = server.write_service_account(Path(tmp) / "service_account.json")
+            for day in range(30):  # everything but 16:45 is taken, every day
+                start = self.day + timedelta(days=day)
+                server.add_event("mentor@example.com", start, start + timedelta(hours=7, minutes=45))
+            server.add_event("other@example.com", self.day, self.day + timedelta(hours=8))
+
+            with server.patch_calendar_client(key_file), \
+                    mock.patch.object(calendar_client, "calculate_earliest_next_session", return_value=self.day):
+                slots = calendar_client.get_next_available_slots_for_user("student@example.com", 10,
+                                                                          "mentor@example.com")
+                busy = calendar_client.get_busy_intervals(["mentor@example.com", "other@example.com"],
+                                                          self.day, self.day + timedelta(days=1))
+
+        self.assertEqual(len(slots), 10)
+        self.assertTrue(all(s["start_time"].strftime("%H:%M") == "16:45" for s in slots))
+        self.assertEqual(len(busy["other@example.com"]), 1)
+        self.assertEqual(server.requests["POST freeBusy"], 3)  # one per calendar
+        self.assertEqual(server.requests["GET events"], 0)
+
+
+@override_settings(CALENDAR_MIRROR={"ENABLED": True, "MAX_AGE": 900, "WINDOW_DAYS": 180, "PAGE_SIZE": 2})
+class CalendarMirrorTests(TestCase):
+    mentor = "mentor@example.com"
+
+    def setUp(self):
+        self.now = datetime.now(calendar_client.UK_TZ).replace(microsecond=0)
+        self.server = FakeCalendarServer().start()
+        self.addCleanup(self.server.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.key_file = self.server.write_service_account(Path(tmp.name) / "service_account.json")
+
+    def add_session(self, days_ago, email="student@example.com", status="accepted", calendar=mentor):
+        start = self.now - timedelta(days=days_ago)
+        return self.server.add_event(calendar, start, start + timedelta(minutes=15), summary="Session",
+                                     attendees=[{"email": email, "responseStatus": status}])
+
+    def mirrored(self):
+        return sorted(CalendarEvent.objects.filter(calendar_id=self.mentor).values_list("event_id", flat=True))
+
+    def live(self):
+        return sorted(e["id"] for e in self.server.calendars[self.mentor].values() if e["status"] != "cancelled")
+
+    def sync(self):
+        with self.server.patch_calendar_client(self.key_file):
+            return calendar_client.sync_event_mirror([self.mentor])[self.mentor]
+
+    def test_incremental_sync_follows_changes(self):
+        events = [self.add_session(days) for days in (30, 20, 10, 5, 2)]
+        self.assertEqual(self.sync(), {"changed": 5, "deleted": 0, "full": True})
+        self.assertEqual(self.server.requests["GET events"], 3)  # pages of 2
+        self.assertEqual(self.mirrored(), self.live())
+
+        self.server.update_event(self.mentor, events[0]["id"], summary="Moved")
+        self.server.delete_event(self.mentor, events[1]["id"])
+        self.add_session(1, email="other@example.com")
+        self.assertEqual(self.sync(), {"changed": 2, "deleted": 1, "full": False})
+        self.assertEqual(self.mirrored(), self.live())
+        self.assertEqual(CalendarEvent.objects.get(event_id=events[0]["id"]).summary, "Moved")
+        self.assertEqual(self.sync(), {"changed": 0, "deleted": 0, "full": False})
+
+        self.server.expire_sync_tokens()
+        self.server.delete_event(self.mentor, events[2]["id"])
+        self.assertEqual(self.sync(), {"changed": 4, "deleted": 0, "full": True})
+        self.assertEqual(self.mirrored(), self.live())
+
+    def test_gap_check_uses_mirror_and_falls_back_for_stale_calendars(self):
+        self.add_session(3)
+        self.add_session(1, status="declined")
+        self.add_session(2, email="other@example.com")
+        self.add_session(1, calendar="head@example.com")
+        expected = self.now - timedelta(days=3) + timedelta(minutes=15)
+
+        with self.server.patch_calendar_client(self.key_file):
+            with override_settings(CALENDAR_MIRROR={"ENABLED": False}):
+                self.assertEqual(calendar_client.get_user_last_session_date("student@example.com", self.mentor),
+                                 expected)
+            calendar_client.sync_event_mirror([self.mentor])
+            before = self.server.requests["GET events"]
+            self.assertEqual(calendar_client.get_user_last_session_date("Student@example.com", self.mentor),
+                             expected)
+            self.assertEqual(self.server.requests["GET events"], before)
+
+            CalendarSyncState.objects.update(synced_at=timezone.now() - timedelta(hours=1))
+            with mock.patch.dict(calendar_client.MENTOR_CONFIG, clear=True,
+                                 values={"a": {"email": self.mentor, "calendar_id": self.mentor},
+                                         "b": {"email": "head@example.com", "calendar_id": "head@example.com"}}):
+                last = calendar_client.get_user_last_session_date("student@example.com")
+            self.assertEqual(last, self.now - timedelta(days=1) + timedelta(minutes=15))
+            self.assertEqual(self.server.requests["GET events"], before + 2)  # both stale: live scan
+
+    def test_own_bookings_are_written_through(self):
+        with self.server.patch_calendar_client(self.key_file):
+            created = calendar_client.create_enhanced_event("Session", "", self.now, self.now + timedelta(minutes=15),
+                                                            ["student@example.com"], self.mentor, "Mentor")
+            self.assertEqual(self.mirrored(), [created["event_id"]])
+            self.assertTrue(calendar_client.cancel_calendar_event(created["event_id"], self.mentor))
+        self.assertEqual(self.mirrored(), [])
+
+
+class FanoutTests(TestCase):
+    def test_breaker_opens_after_failures_and_lets_one_trial_through(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failures=2, cooldown=10, clock=lambda: now[0])
+        breaker.failure("a")
+        self.assertTrue(breaker.allow("a"))
+        breaker.failure("a")
+        self.assertFalse(breaker.allow("a"))
+        self.assertTrue(breaker.allow("b"))
+
+        now[0] = 10
+        self.assertTrue(breaker.allow("a"))  # the trial
+        self.assertFalse(breaker.allow("a"))
+        breaker.failure("a")  # trial failed: open again for another cooldown
+        now[0] = 15
+        self.assertFalse(breaker.allow("a"))
+        now[0] = 20
+        self.assertTrue(breaker.allow("a"))
+        breaker.success("a")
+        self.assertTrue(breaker.allow("a"))
+        self.assertFalse(breaker.is_open("a"))
+
+    def test_partial_results_within_timeouts(self):
+        fanout = Fanout(max_workers=4, call_timeout=0.2, deadline=2, breaker=CircuitBreaker(failures=1))
+        self.addCleanup(fanout.shutdown)
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def fail():
+            raise ValueError("boom")
+
+        start = time.monotonic()
+        result = fanout.run({"fast": lambda: 1, "slow": lambda: release.wait(5), "broken": fail})
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(result.results, {"fast": 1})
+        self.assertIsInstance(result.errors["broken"], ValueError)
+        self.assertEqual(result.timed_out, ["slow"])
+        self.assertFalse(result.complete)
+
+        result = fanout.run({"fast": lambda: 2, "slow": lambda: 3, "broken": lambda: 4})
+        self.assertEqual(result.results, {"fast": 2})
+        self.assertEqual(sorted(result.skipped), ["broken", "slow"])
+
+    def test_trial_cancelled_before_it_starts_is_released(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failures=1, cooldown=10, clock=lambda: now[0])
+        fanout = Fanout(max_workers=1, call_timeout=5, deadline=0.2, breaker=breaker)
+        self.addCleanup(fanout.shutdown)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        breaker.failure("cal")
+        now[0] = 10
+
+        # the only worker is busy, so the trial for "cal" is still queued at the deadline
+        result = fanout.run({"busy": lambda: release.wait(5), "cal": lambda: 1})
+        self.assertEqual(sorted(result.timed_out), ["busy", "cal"])
+        release.set()
+        self.assertTrue(breaker.allow("cal"))
+
+    def test_last_session_lookup_queries_calendars_in_parallel(self):
+        reset_fanout()
+        self.addCleanup(reset_fanout)
+        now = datetime.now(calendar_client.UK_TZ).replace(microsecond=0)
+        mentors = {f"m{i}": {"email": f"mentor{i}@example.com", "calendar_id": f"mentor{i}@example.com"}
+                   for i in range(4)}
+        with FakeCalendarServer() as server, tempfile.TemporaryDirectory() as tmp:
+            key_file = server.write_service_account(Path(tmp) / "service_account.json")
+            for i, mentor in enumerate(mentors.values()):
+                start = now - timedelta(days=10 - i)
+                server.add_event(mentor["email"], start, start + timedelta(minutes=15),
+                                 attendees=[{"email": "student@example.com", "responseStatus": "accepted"}])
+                server.calendar_latency[mentor["email"]] = 0.3
+            server.failing.add("mentor3@example.com")  # has the latest session, but can't be read
+
+            with server.patch_calendar_client(key_file), \
+                    mock.patch.dict(calendar_client.MENTOR_CONFIG, mentors, clear=True):
+                calendar_client.get_user_last_session_date("student@example.com")  # clients built per thread
+                start = time.monotonic()
+                last = calendar_client.get_user_last_session_date("student@example.com")
+                elapsed = time.monotonic() - start
+                calendar_client.get_user_last_session_date("student@example.com")  # third failure opens it
+                before = server.requests["GET events"]
+                calendar_client.get_user_last_session_date("student@example.com")
+
+        self.assertEqual(last, now - timedelta(days=8) + timedelta(minutes=15))
+        self.assertLess(elapsed, 0.9)  # 1.2 s one calendar after another
+        self.assertEqual(server.requests["GET events"] - before, 3)
+
+    def test_a_broken_calendar_only_opens_its_own_breaker(self):
+        fanout = Fanout(max_workers=4, call_timeout=5, deadline=5, breaker=CircuitBreaker(failures=2, cooldown=60))
+        self.addCleanup(fanout.shutdown)
+        day = datetime(2025, 3, 3, 9, tzinfo=calendar_client.UK_TZ)
+        with FakeCalendarServer() as server, tempfile.TemporaryDirectory() as tmp:
+            key_file = server.write_service_account(Path(tmp) / "service_account.json")
+            server.failing.add("down@example.com")  # outage: 503
+            server.missing.add("gone@example.com")  # deleted calendar: notFound, every time
+            server.add_event("ok@example.com", day, day + timedelta(hours=1))
+
+            def lookup(email):
+                return calendar_client.get_busy_intervals([email], day, day + timedelta(hours=8))[email]
+
+            with server.patch_calendar_client(key_file), \
+                    mock.patch.object(calendar_client, "get_fanout", return_value=fanout):
+                for _ in range(2):
+                    with self.assertRaises(HttpError):
+                        lookup("down@example.com")
+                for _ in range(3):
+                    with self.assertRaises(FreeBusyError):
+                        lookup("gone@example.com")
+                with self.assertRaisesRegex(FanoutError, "circuit open"):
+                    lookup("down@example.com")
+                self.assertEqual(len(lookup("ok@example.com")), 1)
+
+        self.assertTrue(fanout.breaker.is_open("down@example.com"))
+        self.assertFalse(fanout.breaker.is_open("gone@example.com"))
+        self.assertFalse(fanout.breaker.is_open("ok@example.com"))
+
+
+class KnowledgeBaseBuildTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.extracted = []
+
+        def extract(path):  # the "PDFs" are plain text files
+            self.extracted.append(path.name)
+            return path.read_text().strip()
+
+        settings = override_settings(BASE_DIR=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        patcher = mock.patch.object(knowledge_base, "extract_pdf_text", extract)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def build(self):
+        self.extracted.clear()
+        manifest, _ = knowledge_base.build_knowledge_base(self.root / "kb", log=lambda message: None)
+        corpus = (self.root / "kb" / knowledge_base.CORPUS_FILE).read_bytes()
+        return {s["name"]: s for s in manifest["sources"]}, corpus.decode()
+
+    def test_duplicates_keep_their_text_when_the_original_changes(self):
+        (self.root / "ukjobs1.pdf").write_text("alpha")
+        (self.root / "ukjobs2.pdf").write_text("alpha\n")  # same text, different bytes
+        (self.root / "ukjobs3.pdf").write_text("alpha\n")  # byte-identical to ukjobs2
+        sources, corpus = self.build()
+        self.assertEqual(sources["ukjobs2.pdf"]["duplicate_of"], "ukjobs1.pdf")
+        self.assertEqual(sources["ukjobs3.pdf"]["duplicate_of"], "ukjobs1.pdf")
+        self.assertEqual(corpus.count("alpha"), 1)
+
+        (self.root / "ukjobs1.pdf").write_text("beta")
+        sources, corpus = self.build()
+        self.assertEqual(self.extracted, ["ukjobs1.pdf", "ukjobs2.pdf", "ukjobs3.pdf"])  # original changed
+        start, end = sources["ukjobs2.pdf"]["offset"]
+        self.assertEqual(corpus.encode()[start:end].decode(), "alpha")
+        self.assertNotIn("duplicate_of", sources["ukjobs2.pdf"])
+        self.assertEqual(sources["ukjobs3.pdf"]["duplicate_of"], "ukjobs2.pdf")
+        self.assertIn("beta", corpus)
+
+        (self.root / "ukjobs1.pdf").write_text("gamma")
+        sources, corpus = self.build()
+        self.assertEqual(self.extracted, ["ukjobs1.pdf"])  # ukjobs2/3 reused from the corpus
+        self.assertEqual(corpus.count("alpha"), 1)
+        self.assertEqual(sources["ukjobs3.pdf"]["duplicate_of"], "ukjobs2.pdf")
+
+
+class ConversationMemoryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("talker")
+
+    def test_follow_up_detection(self):
+        for message in ["tell me more", "Why?", "go on", "what about the second one?", "Is it remote?",
+                        "How do I apply for them?", "and then?"]:
+            self.assertTrue(conversation.is_follow_up(message), message)
+        for message in ["What jobs are in demand in UK tech?", "Hi", "CV tips", "salary for data analyst",
+                        "How do I get a graduate visa and is it hard to switch employers after I arrive?",
+                        "That is a question about sponsorship for software engineers"]:
+            self.assertFalse(conversation.is_follow_up(message), message)
+
+    def test_history_context_keeps_order_within_budget(self):
+        turns = [(f"question {n}", f"<p>answer {n}</p>") for n in range(3)]
+        context = conversation.build_history_context(turns, budget=1000)
+        self.assertEqual(context, "User: question 0\nAssistant: answer 0\n\n"
+                                  "User: question 1\nAssistant: answer 1\n\n"
+                                  "User: question 2\nAssistant: answer 2")
+
+    def test_history_context_condenses_then_drops_older_turns(self):
+        long_reply = " ".join(f"word{n}" for n in range(100))
+        turns = [("oldest", long_reply), ("older", long_reply), ("newest", long_reply)]
+        verbatim = conversation._tokens(f"User: newest\nAssistant: {long_reply}")
+        excerpt = conversation._tokens(f"User: older\nAssistant: {conversation._excerpt(long_reply, 35)}")
+        context = conversation.build_history_context(turns, budget=verbatim + excerpt)
+
+        entries = context.split("\n\n")
+        self.assertEqual(len(entries), 2)  # "oldest" no longer fits even as an excerpt
+        self.assertTrue(entries[0].startswith("User: older\n") and entries[0].endswith("word34 ..."))
+        self.assertEqual(entries[1], f"User: newest\nAssistant: {long_reply}")
+
+    def test_record_turn_queues_and_recent_turns_reads_back(self):
+        buffer = WriteBehindBuffer(autostart=False)
+        with mock.patch.object(conversation, "get_write_behind", return_value=buffer):
+            conversation.record_turn(self.user.id, "q1", "a1")
+            conversation.record_turn(self.user.id, "q2", "a2")
+        self.assertEqual(ChatHistory.objects.count(), 0)  # queued, not written yet
+        buffer.flush()
+        self.assertEqual(conversation.recent_turns(self.user.id), [("q1", "a1"), ("q2", "a2")])
+
+    def test_async_record_turn_never_waits_for_room(self):
+        buffer = WriteBehindBuffer(max_pending=1, overflow="block", block_timeout_ms=5000, autostart=False)
+        with mock.patch.object(conversation, "get_write_behind", return_value=buffer):
+            conversation.record_turn(self.user.id, "q1", "a1")
+            start = time.monotonic()
+            async_to_sync(conversation.arecord_turn)(self.user.id, "q2", "a2")  # on the event loop
+            self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(buffer.stats()["dropped"], 1)
+
+    def test_stale_turns_are_not_context(self):
+        ChatHistory.objects.create(user=self.user, message="old", response="reply")
+        ChatHistory.objects.update(created_at=timezone.now() - timedelta(seconds=conversation.HISTORY_MAX_AGE + 60))
+        ChatHistory.objects.create(user=self.user, message="new", response="reply")
+        self.assertEqual(conversation.recent_turns(self.user.id), [("new", "reply")])
+
+
+class ChatOutputCleaningTests(TestCase):
+    REPLIES = [
+        'Salary < £30k is common; see <a class="x">jobs</a> and <a href="https://example.com">this</a>.',
+        '  <p>Hello <u>there</u>,</p>\n<b>bold</b> 3 < 4 > 2 <a href="https://a.io" title="t">link</a>  ',
+        '<script>alert(1)</script>x<y and z> <a/> <abbr>AI</abbr> </a> <',
+        'a <<b>> b <\n <img src=x onerror=alert(1)> end <a',
+        'x<y when comparing ' + 'values, ' * 80 + 'the <a href="https://x.io" ' + 'a' * 500 + '>end</a>',
+        '',
+    ]
+
+    def stream(self, text, rng):
+        cleaner = views.StreamingChatCleaner()
+        cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randrange(0, 8)))) if text else []
+        pieces = [text[i:j] for i, j in zip([0, *cuts], [*cuts, len(text)])]
+        return "".join(cleaner.feed(piece) for piece in pieces) + cleaner.finish()
+
+    def test_bare_less_than_is_text(self):
+        self.assertEqual(views.clean_chat_output(self.REPLIES[0]),
+                         'Salary < £30k is common; see <a class="x">jobs</a> and <a href="https://example.com" '
+                         'style="color:#1a73e8; text-decoration:none;" target="_blank">this</a>.')
+
+    def test_stream_matches_clean_chat_output_for_any_split(self):
+        rng = random.Random(6)
+        for text in self.REPLIES:
+            expected = views.clean_chat_output(text)
+            self.assertNotIn("<u>", expected)
+            self.assertNotIn("<img", expected)
+            for _ in range(200):
+                self.assertEqual(self.stream(text, rng), expected, text)
+
+    def test_tag_is_held_back_until_it_closes(self):
+        cleaner = views.StreamingChatCleaner()
+        self.assertEqual(cleaner.feed("Apply <a hr"), "Apply")
+        self.assertEqual(cleaner.feed('ef="https://x.io">here'),
+                         ' <a href="https://x.io" style="color:#1a73e8; text-decoration:none;" '
+                         'target="_blank">here')
+        self.assertEqual(cleaner.feed(" < £30k"), " < £30k")
+
+    def test_unterminated_tag_is_released_as_text(self):
+        cleaner = views.StreamingChatCleaner()
+        self.assertEqual(cleaner.feed("x<y when comparing"), "x")
+        tail = " values," * 80
+        self.assertEqual(cleaner.feed(tail), "&lt;y when comparing" + tail.rstrip())
+        self.assertEqual(cleaner.finish(), "")
+        self.assertEqual(views.clean_chat_output("x<y when comparing" + tail), "x&lt;y when comparing" + tail.rstrip())
+        self.assertEqual(views.clean_chat_output("see <a"), "see &lt;a")
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                           # Two replies plus the django backend's generation key
+                           "replies": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                                       "OPTIONS": {"MAX_ENTRIES": 3, "CULL_FREQUENCY": 3}}})
+class ResponseCacheTests(TestCase):
+    """Every backend behind the same ResponseCache contract"""
+
+    def setUp(self):
+        self.now = 1000.0
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        clocks = [mock.patch.object(response_cache, "time"),
+                  mock.patch("django.core.cache.backends.base.time"),  # Django cache expiry
+                  mock.patch("django.core.cache.backends.locmem.time")]
+        for clock in clocks:
+            fake = clock.start()
+            fake.time.side_effect = fake.monotonic.side_effect = lambda: self.now
+            self.addCleanup(clock.stop)
+
+    def caches(self):
+        for backend in ("memory", "django", "file"):
+            yield backend, response_cache.build_response_cache({
+                "BACKEND": backend, "TTL": 60, "MAX_ENTRIES": 2, "CACHE_ALIAS": "replies",
+                "DIRECTORY": Path(self.directory) / backend,
+            })
+
+    def test_entries_expire_after_ttl(self):
+        for backend, cache in self.caches():
+            cache.set("What is a CV?", False, "A CV is...", "h1")
+            self.now += 59
+            self.assertEqual(cache.get("what is a cv", False, "h1"), "A CV is...", backend)
+            self.now += 2
+            self.assertIsNone(cache.get("what is a cv", False, "h1"), backend)
+            self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for backend, cache in self.caches():
+            cache.set("first", False, "1", "h1")
+            self.now += 1
+            cache.set("second", False, "2", "h1")
+            self.now += 1
+            self.assertEqual(cache.get("first", False, "h1"), "1", backend)  # now "second" is the oldest
+            self.now += 1
+            cache.set("third", False, "3", "h1")
+            self.assertIsNone(cache.get("second", False, "h1"), backend)
+            self.assertEqual(cache.get("first", False, "h1"), "1", backend)
+            self.assertEqual(cache.get("third", False, "h1"), "3", backend)
+
+    def test_corpus_hash_and_tier_are_part_of_the_key(self):
+        for backend, cache in self.caches():
+            cache.set("Visa options?", True, "premium answer", "h1")
+            self.assertEqual(cache.get("visa options", True, "h1"), "premium answer", backend)
+            self.assertIsNone(cache.get("visa options", False, "h1"), backend)  # other tier
+            self.assertIsNone(cache.get("visa options", True, "h2"), backend)  # knowledge base rebuilt
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                               "replies": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_clear_drops_replies_only(self):
+        caches["replies"].set("chatbot:token_cache:version", "v1", timeout=None)
+        for backend, cache in self.caches():
+            cache.set("What is a CV?", False, "A CV is...", "h1")
+            cache.backend.clear()
+            self.assertIsNone(cache.get("what is a cv", False, "h1"), backend)
+            cache.set("What is a CV?", False, "A CV is...", "h1")
+            self.assertEqual(cache.get("what is a cv", False, "h1"), "A CV is...", backend)
+        self.assertEqual(caches["replies"].get("chatbot:token_cache:version"), "v1")
+
+
+class SemanticCacheTests(TestCase):
+
+    def setUp(self):
+        self.vectorizer = HashedTfidfVectorizer()
+
+    def similarity(self, a, b):
+        return float(self.vectorizer.transform(a) @ self.vectorizer.transform(b))
+
+    def test_vectorizer(self):
+        vector = self.vectorizer.transform("How do I write a CV?")
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+        self.assertTrue(np.array_equal(vector, HashedTfidfVectorizer().transform("how do i write a cv")))
+        self.assertFalse(self.vectorizer.transform("how do I? is it the").any())  # stopwords only
+        self.assertGreater(self.similarity("cover letter tips", "cover letters tip"), 0.7)  # plurals
+        self.assertLess(self.similarity("cover letter tips", "graduate visa sponsorship"), 0.1)  # hash collisions only
+
+    def test_fitted_idf_downweights_common_words(self):
+        plain = self.similarity("graduate visa jobs", "graduate salary jobs")
+        self.vectorizer.fit(["graduate jobs", "graduate jobs in london", "jobs for graduate", "visa", "salary"])
+        self.assertLess(self.similarity("graduate visa jobs", "graduate salary jobs"), plain)
+
+    def test_threshold_tier_and_corpus(self):
+        question = "How do I write a good CV?"
+        score = self.similarity(question, "how do I write a good cv for tech")
+        cache = SemanticCache(self.vectorizer, threshold=score, max_entries=4)
+        cache.add(question, False, "CV reply", "h1")
+        match = cache.lookup("how do I write a good cv for tech", False, "h1")
+        self.assertEqual(match.reply, "CV reply")
+        self.assertAlmostEqual(match.similarity, score, places=5)
+
+        cache.threshold = score + 0.01
+        self.assertIsNone(cache.lookup("how do I write a good cv for tech", False, "h1"))
+        self.assertIsNone(cache.lookup(question, True, "h1"))  # other tier
+        self.assertIsNone(cache.lookup(question, False, "h2"))  # knowledge base rebuilt
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_oldest_entries_are_overwritten_and_expire(self):
+        cache = SemanticCache(self.vectorizer, threshold=0.99, max_entries=2, ttl=60)
+        with mock.patch("chatbot.semantic_cache.time") as clock:
+            clock.monotonic.return_value = 1000.0
+            for question in ("cv tips", "visa sponsorship", "interview practice"):
+                cache.add(question, False, f"reply: {question}")
+            self.assertIsNone(cache.lookup("cv tips", False))
+            self.assertEqual(cache.lookup("visa sponsorship", False).reply, "reply: visa sponsorship")
+
+            clock.monotonic.return_value = 1061.0
+            self.assertIsNone(cache.lookup("interview practice", False))
+
+
+class RetrievalTests(TestCase):
+    CORPUS = [
+        "Graduate visa sponsorship for software engineers in London.",
+        "CV tips: keep your CV to two pages and lead with results.",
+        "Visa rules change often; check the visa guidance before you apply.",
+        "Interview practice for graduate roles: prepare STAR stories.",
+        "Salary guide for software engineers outside London.",
+    ]
+
+    def test_bm25_ranking(self):
+        index = BM25Index(self.CORPUS)
+        self.assertEqual([idx for idx, _ in index.search("How do I fix my CV?")], [1])
+        # Both terms beat either alone; two mentions of "visa" beat one of "graduate"
+        self.assertEqual([idx for idx, _ in index.search("graduate visa")], [0, 2, 3])
+        self.assertEqual([idx for idx, _ in index.search("visa")], [2, 0])  # term frequency
+        self.assertEqual([idx for idx, _ in index.search("software engineers london")], [0, 4])  # tie: by index
+        self.assertEqual(index.search("graduate visa", top_k=1)[0][0], 0)
+
+    def test_top_indices_are_in_document_order_with_a_fallback(self):
+        index = BM25Index(self.CORPUS)
+        self.assertEqual(index.top_indices("visa", top_k=2), [0, 2])
+        self.assertEqual(index.top_indices("what is the", top_k=2), [0, 1])  # stopwords only
+        self.assertEqual(BM25Index([]).top_indices("visa"), [])
+
+    def test_chunk_spans_overlap(self):
+        text = " ".join(f"w{n}" for n in range(10))
+        self.assertEqual(chunk_text(text, chunk_words=4, overlap=1),
+                         ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"])
+        self.assertEqual(chunk_text(text, chunk_words=20, overlap=5), [text])
+        self.assertEqual(chunk_spans("   "), [])
+
+    def test_merge_spans(self):
+        self.assertEqual(merge_spans([(20, 30), (0, 10), (5, 12)]), [(0, 12), (20, 30)])  # overlapping
+        self.assertEqual(merge_spans([(0, 10), (11, 20)]), [(0, 20)])  # touching (one separator apart)
+        self.assertEqual(merge_spans([(0, 10), (12, 20)]), [(0, 10), (12, 20)])
+        self.assertEqual(merge_spans([(0, 30), (5, 10)]), [(0, 30)])  # contained
+        text = "one two three four five six seven"
+        spans = chunk_spans(text, chunk_words=3, overlap=1)
+        self.assertEqual(merge_spans(spans), [(0, len(text))])
+        self.assertEqual(merge_spans([]), [])
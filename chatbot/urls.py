@@ -1,6 +1,6 @@
 # chatbot/urls.py
 from django.urls import path
-from .views import SignupView, LoginView, LogoutView, ScheduleView, ChatView, CancelRescheduleView,TimeSlotCancelView,TimeSlotRescheduleView,UserProfileView, test_email_send, TestView,AvailableSlotsView, list_mentors, test_email_config, TimeSlotBookingView, TimeSlotListView
+from .views import SignupView, LoginView, LogoutView, ScheduleView, ChatView, ChatStreamView, AsyncChatView, CancelRescheduleView,TimeSlotCancelView,TimeSlotRescheduleView,UserProfileView, test_email_send, TestView,AvailableSlotsView, list_mentors, test_email_config, TimeSlotBookingView, TimeSlotListView
 
 urlpatterns = [
     # Authentication endpoints
@@ -12,6 +12,8 @@ urlpatterns = [
     # Feature endpoints
     path('schedule/', ScheduleView.as_view(), name='schedule'),
     path('chat/', ChatView.as_view(), name='chat'),
+    path('chat/stream/', ChatStreamView.as_view(), name='chat-stream'),
+    path('chat/async/', AsyncChatView.as_view(), name='chat-async'),
     path("mentors/", list_mentors, name="list_mentors"),
     path('available-slots/', AvailableSlotsView.as_view(), name='available-slots'),
     path('test-email/', test_email_send, name='test-email'),
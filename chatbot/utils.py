@@ -9,6 +9,8 @@ import urllib.parse
 import logging
 from typing import List, Dict, Any
 
+from . import intents
+
 logger = logging.getLogger(__name__)
 
 # IST timezone
@@ -78,41 +80,9 @@ def format_meeting_summary(booking) -> str:
 def is_meeting_request(message: str) -> bool:
     """
     Detect if user is asking for a session/1-on-1 call/meeting/mentorship.
-    Returns True if any keyword matches.
+    Returns True if any keyword matches (patterns live in chatbot/intents.py).
     """
-    msg = message.lower().strip()
-
-    patterns = [
-        # --- Generic booking phrases ---
-        r"\bbook( a)? (call|meeting|session|mentor|mentorship|chat)\b",
-        r"\bschedule( a)? (call|meeting|session|mentor|mentorship|chat)\b",
-        r"\b(reserve|arrange|setup|set up|fix|plan)( a)? (call|meeting|session|chat)\b",
-
-        # --- Mentorship-specific ---
-        r"\bbook( a)? mentor\b",
-        r"\bbook( a)? mentorship (call|session|meeting)?\b",
-        r"\bschedule( a)? mentorship (call|session|meeting)?\b",
-        r"\bconnect with (a )?mentor\b",
-        r"\btalk to (a )?mentor\b",
-        r"\bneed (a )?mentor\b",
-        r"\bwant (a )?mentor\b",
-
-        # --- 1-on-1 / 1:1 variants ---
-        r"\b1[\s:\-]?[oO]n[\s:\-]?1\b",         # 1on1 / 1:1 / 1-on-1
-        r"\bone[\s\-]?on[\s\-]?one\b",           # one on one
-        r"\bone to one\b",
-        r"\b1[\s:\-]?1[\s:\-]?\b",               # "1 1" or "1-1" or "1:1"
-        r"\bbook 1[\s:\-]?[1lI]\b",              # handles "book 1:11" typo too
-
-        # --- Common phrasing ---
-        r"\bmentor(ship)? (session|call|meeting|chat)\b",
-        r"\bjoin (a )?(mentor|mentorship) (session|call)\b",
-        r"\bget (a )?(mentor|guidance|session)\b",
-        r"\bstart (a )?1[\s:\-]?1\b",
-        r"\bhelp me (book|schedule) (a )?(mentor|call|session)\b"
-    ]
-
-    return any(re.search(p, msg) for p in patterns)
+    return intents.is_meeting_request(message)
 
 
 
@@ -124,22 +94,11 @@ def extract_duration(message: str) -> int:
         "book a 30 min call" → 30
         "schedule 1 hour session" → 60
     """
-    msg = message.lower()
-
-    # Match "30 min" / "45 minutes"
-    match_min = re.search(r"(\d+)\s*(min|minutes?)", msg)
-    if match_min:
-        return int(match_min.group(1))
-
-    # Match "1 hour" / "2 hours"
-    match_hr = re.search(r"(\d+)\s*(hour|hours?)", msg)
-    if match_hr:
-        return int(match_hr.group(1)) * 60
-
-    return 120  # default 2 hours
+    return intents.extract_duration(message)
 
 from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials
+from .calendar_client import TimedHttpRequest
 
 def cancel_calendar_event(event_id: str) -> bool:
     """
@@ -147,7 +106,7 @@ def cancel_calendar_event(event_id: str) -> bool:
     """
     try:
         creds = Credentials.from_authorized_user_file("token.json", ["https://www.googleapis.com/auth/calendar"])
-        service = build("calendar", "v3", credentials=creds)
+        service = build("calendar", "v3", credentials=creds, requestBuilder=TimedHttpRequest)
 
         service.events().delete(calendarId="primary", eventId=event_id).execute()
 
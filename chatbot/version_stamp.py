@@ -0,0 +1,38 @@
+# chatbot/version_stamp.py
+"""
+Version stamps: one small value per process-local cache, kept in a Django
+cache that every worker process reads, so an invalidation in one worker
+(a logout, a mentor edit) reaches the others.
+
+bump() stores a fresh random value rather than incrementing. FileBasedCache's
+incr() is a read followed by a write, so two workers bumping at once could
+both write the same number and a reader could miss the second change.
+
+Only a cache outside the process can carry a stamp. is_shared() says no for
+the locmem and dummy backends (Django's default when CACHES is not set).
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+PER_PROCESS_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_shared(alias: str) -> bool:
+    """Do all worker processes see the same values under this cache alias?"""
+    config = settings.CACHES.get(alias)
+    return config is not None and config["BACKEND"] not in PER_PROCESS_BACKENDS
+
+
+def bump(alias: str, key: str):
+    caches[alias].set(key, uuid.uuid4().hex, timeout=None)
+
+
+def read(alias: str, key: str):
+    """The current stamp; None until the first bump (or after eviction)"""
+    return caches[alias].get(key)
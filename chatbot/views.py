@@ -1,3 +1,4 @@
+import logging
 import traceback
 import random
 from .models import SessionBooking, UserProfile, TimeSlot, EnhancedSessionBooking, Mentor
@@ -8,24 +9,36 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import status
 from rest_framework.authtoken.models import Token
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import make_password
 from django.core.mail import send_mail
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from asgiref.sync import sync_to_async
 from django.utils.dateparse import parse_datetime
 from .services import schedule_between_two_users
 import json
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-import csv
 import os
 from django.core.exceptions import ValidationError
 from django.conf import settings
-from .gemini_client import ask_gemini
+from .gemini_client import ask_gemini, ask_gemini_async, ask_gemini_stream, corpus_hash, FALLBACK_REPLIES
+from .response_cache import get_response_cache
+from .semantic_cache import get_semantic_cache
+from .conversation import arecent_turns, arecord_turn, is_follow_up, recent_turns, record_turn
+from .audit import audit
+from .metrics import TimedSMTP
+from .authentication import CachedTokenAuthentication, aload_token, check_token, forget_token, get_profile, issue_token
+from .profile_context import ProfileContextMixin, attach_profile
+from .entitlements import get_entitlement
 from .utils import is_meeting_request, extract_duration
+from .intents import classify
+from . import intents, taxonomy
+from .mentor_registry import active_mentors, get_mentor_registry
 from datetime import datetime, timedelta
 from django.core.mail import EmailMultiAlternatives
 from .calendar_client import (
@@ -48,18 +61,8 @@ except ImportError:
 from zoneinfo import ZoneInfo
 UK_TZ = ZoneInfo("Europe/London")
 
-# Domain mappings for mentors - Based on your actual mentor expertise
-DOMAIN_KEYWORDS = {
-    'marketing': ['marketing', 'digital marketing', 'seo', 'social media', 'content', 'campaigns', 'ads', 'promotion'],
-    'cv': ['cv', 'resume', 'curriculum vitae', 'profile', 'career document', 'job application'],
-    'linkedin': ['linkedin', 'professional network', 'social networking', 'profile optimization', 'connections'],
-    'testing': ['test', 'qa', 'quality assurance', 'automation', 'selenium', 'cypress'],
-    'data': ['data', 'analytics', 'data science', 'machine learning', 'statistics', 'python', 'sql'],
-    'development': ['developer', 'programming', 'coding', 'software', 'web development', 'frontend', 'backend'],
-    'design': ['design', 'ui', 'ux', 'graphic', 'visual', 'creative', 'figma', 'photoshop'],
-    'finance': ['finance', 'accounting', 'investment', 'banking', 'financial analysis'],
-    'hr': ['hr', 'human resources', 'recruitment', 'talent', 'people management']
-}
+logger = logging.getLogger(__name__)
+
 BOOKING_COOLDOWN_DAYS = 7  # Production: 14 days
 BOOKING_COOLDOWN_MINUTES = 2  # Testing: 2 minutes
 USE_TESTING_COOLDOWN = False  # Set to False for production
@@ -143,15 +146,7 @@ def check_booking_cooldown(user):
 
 def is_cancel_request(message: str) -> bool:
     """Check if the message is a cancellation request"""
-    lower = message.lower()
-    cancel_keywords = [
-        'cancel', 'cancel my', 'cancel session', 'cancel call', 'cancel meeting',
-        'cancel appointment', 'cancel booking', 'dont want', 'don\'t want',
-        'remove session', 'delete session', 'cancel last session',
-        'cancel my session', 'cancel my last session','reschedule','reschedule my session', 'reschedule last session','reschedule my last session','reschedule the call','reschedule the session',
-    ]
-    
-    return any(keyword in lower for keyword in cancel_keywords)
+    return intents.is_cancel_request(message)
 
 def ensure_timezone_aware(dt_obj):
     """Ensure datetime object is timezone-aware in UK_TZ"""
@@ -178,57 +173,22 @@ def detect_domain_from_message(message: str) -> str:
     Detect the domain based on keywords in the user's message
     Returns the domain name or 'general' if no specific domain detected
     """
-    message_lower = message.lower()
-    
-    for domain, keywords in DOMAIN_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in message_lower:
-                return domain
-    
-    return 'general'
+    return intents.detect_domain(message, taxonomy.domain_table())
 
 def get_random_mentor_by_domain(domain: str) -> Mentor:
     """
-    Get a random mentor from the specified domain based on exact expertise match
+    Get a random mentor from the specified domain, preferring the best expertise match
+    (exact, then containing the domain, then by keyword; see chatbot/taxonomy.py)
     If no mentors found in domain, return a random mentor from any domain
     """
     try:
         print(f"🔍 Looking for mentors in domain: {domain}")
-        
-        # Direct expertise match (case insensitive)
-        domain_mentors = Mentor.objects.filter(
-            is_active=True,
-            expertise__iexact=domain
-        ).select_related('user')
-        
-        if domain_mentors.exists():
-            selected = random.choice(list(domain_mentors))
-            print(f"✅ Found {domain_mentors.count()} mentors for '{domain}', selected: {selected.user.username}")
-            return selected
-        
-        # If no exact match, try case-insensitive contains
-        domain_mentors = Mentor.objects.filter(
-            is_active=True,
-            expertise__icontains=domain
-        ).select_related('user')
-        
-        if domain_mentors.exists():
-            selected = random.choice(list(domain_mentors))
-            print(f"✅ Found {domain_mentors.count()} mentors containing '{domain}', selected: {selected.user.username}")
+
+        selected = taxonomy.random_mentor_for_domain(domain)
+        if selected:
+            print(f"✅ Found mentor for '{domain}', selected: {selected.user.username}")
             return selected
         
-        # Try keyword-based search
-        for keyword in DOMAIN_KEYWORDS.get(domain, []):
-            keyword_mentors = Mentor.objects.filter(
-                is_active=True,
-                expertise__icontains=keyword
-            ).select_related('user')
-            
-            if keyword_mentors.exists():
-                selected = random.choice(list(keyword_mentors))
-                print(f"✅ Found {keyword_mentors.count()} mentors for keyword '{keyword}', selected: {selected.user.username}")
-                return selected
-        
         # Fallback: return any active mentor
         all_mentors = Mentor.objects.filter(is_active=True).select_related('user')
         if all_mentors.exists():
@@ -269,31 +229,8 @@ def is_first_time_user(user):
         return True  # Assume first time if error
 
 def get_user_data(email: str) -> dict | None:
-    csv_path = os.path.join(settings.BASE_DIR, "users.csv")
-    try:
-        with open(csv_path, newline="") as csvfile:
-            sample = csvfile.read(1024)
-            csvfile.seek(0)
-
-            # Detect if file has header
-            has_header = csv.Sniffer().has_header(sample)
-
-            if has_header:
-                reader = csv.DictReader(csvfile)
-                reader.fieldnames = [h.strip().lower() for h in reader.fieldnames]
-            else:
-                reader = csv.reader(csvfile)
-                for row in reader:
-                    if row[0].strip().lower() == email.strip().lower():
-                        return {"email": row[0].strip(), "type": row[1].strip().lower()}
-
-            for row in reader:
-                row = {k.strip().lower(): (v.strip() if v else v) for k, v in row.items()}
-                if row.get("email", "").lower() == email.strip().lower():
-                    return {"email": row["email"], "type": row.get("type", "").lower()}
-    except Exception as e:
-        print(f"❌ Error reading users.csv: {e}")
-    return None
+    """Entitlement from users.csv (indexed in memory, see chatbot/entitlements.py)"""
+    return get_entitlement(email)
 
 def is_email_allowed(email: str) -> bool:
     """Check if email exists in users.csv"""
@@ -370,7 +307,8 @@ class SignupView(APIView):
                 is_premium=is_premium
             )
 
-            token, _ = Token.objects.get_or_create(user=user)
+            token = issue_token(user)
+            audit("signup", request, user, is_premium=bool(is_premium))
 
             return Response({
                 "message": "User created successfully",
@@ -401,22 +339,19 @@ class LoginView(APIView):
         try:
             user = User.objects.get(email=email)
         except User.DoesNotExist:
+            audit("login_failed", request, email=email)
             return Response({"error": "Invalid email or password"}, status=401)
 
         if not user.check_password(password):
+            audit("login_failed", request, user, email=email)
             return Response({"error": "Invalid email or password"}, status=401)
 
-        # Sync premium status with CSV
-        user_data = get_user_data(email)
-        is_premium = user_data and user_data["type"] == "premium"
-        
-        # Update UserProfile if exists
-        profile, created = UserProfile.objects.get_or_create(user=user)
-        if profile.is_premium != is_premium:
-            profile.is_premium = is_premium
-            profile.save()
+        # Read-only: profiles are created at signup, premium status is applied by `manage.py sync_premium_status`
+        profile = UserProfile.objects.filter(user=user).first()
+        is_premium = profile.is_premium if profile else bool(is_email_premium(email))
 
-        token, _ = Token.objects.get_or_create(user=user)
+        token = issue_token(user)
+        audit("login", request, user)
         return Response({
             "message": "Login successful",
             "token": token.key,
@@ -448,9 +383,11 @@ class LogoutView(APIView):
 
     def post(self, request):
         try:
-            token = getattr(request.user, "auth_token", None)
+            token = request.auth if isinstance(request.auth, Token) else getattr(request.user, "auth_token", None)
             if token:
+                forget_token(token.key)
                 token.delete()
+            audit("logout", request, request.user)
             return Response({"message": "Logged out successfully"}, status=status.HTTP_200_OK)
         except Exception:
             # Even if token is missing or invalid
@@ -475,34 +412,24 @@ class TestView(APIView):
             "user_authenticated": request.user.is_authenticated
         })
 
-class UserProfileView(APIView):
-    authentication_classes = [TokenAuthentication]
+class UserProfileView(ProfileContextMixin, APIView):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        try:
-            # Sync with CSV to ensure latest status
-            user_data = get_user_data(request.user.email)
-            is_premium = user_data and user_data["type"] == "premium"
-            
-            profile, created = UserProfile.objects.get_or_create(user=request.user)
-            if profile.is_premium != is_premium:
-                profile.is_premium = is_premium
-                profile.save()
-            
-            return Response({
-                "user": {
-                    "id": request.user.id,
-                    "email": request.user.email,
-                    "username": request.user.username,
-                    "is_premium": profile.is_premium,
-                    "session_count": profile.session_count
-                }
-            }, status=status.HTTP_200_OK)
-        except UserProfile.DoesNotExist:
-            return Response({
-                "error": "Profile not found"
-            }, status=status.HTTP_404_NOT_FOUND)
+        profile = request.profile
+        if profile is None:
+            return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "user": {
+                "id": request.user.id,
+                "email": request.user.email,
+                "username": request.user.username,
+                "is_premium": profile.is_premium,
+                "session_count": profile.session_count
+            }
+        }, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 def list_mentors(request):
@@ -510,21 +437,19 @@ def list_mentors(request):
     if not request.user.is_authenticated:
         return Response({"error": "Authentication required"}, status=401)
 
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if not profile.is_premium:
-            return Response({"error": "Only Plus users can access mentors"}, status=403)
-    except UserProfile.DoesNotExist:
+    if attach_profile(request) is None:
         return Response({"error": "Profile not found"}, status=404)
+    if not request.is_premium:
+        return Response({"error": "Only Plus users can access mentors"}, status=403)
 
     # Active mentors sorted by username
-    mentors = Mentor.objects.filter(is_active=True).select_related("user").order_by("user__username")
+    mentors = active_mentors()
 
     data = [
         {
             "id": m.id,
-            "username": m.user.username,
-            "email": m.user.email,
+            "username": m.username,
+            "email": m.email,
             "expertise": m.expertise,
         }
         for m in mentors
@@ -536,8 +461,6 @@ def list_mentors(request):
 def test_email_config(request):
     """Test email configuration with detailed debugging"""
     try:
-        import smtplib
-        
         print("📧 [EMAIL TEST] Starting email configuration test...")
         
         # Print current settings
@@ -557,7 +480,7 @@ def test_email_config(request):
         # Test SMTP connection directly
         try:
             print("📧 [EMAIL TEST] Testing SMTP connection...")
-            server = smtplib.SMTP('smtp.gmail.com', 587)
+            server = TimedSMTP('smtp.gmail.com', 587)
             server.starttls()
             server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
             server.quit()
@@ -789,15 +712,17 @@ class CancelRescheduleView(APIView):
             }
         }, status=status.HTTP_200_OK)
 
-class TimeSlotListView(APIView):
+class TimeSlotListView(ProfileContextMixin, APIView):
     """View to list available time slots for a mentor"""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request, mentor_id=None):
         try:
             # Check if user is premium
-            profile = UserProfile.objects.get(user=request.user)
+            profile = request.profile
+            if profile is None:
+                return Response({"error": "User profile not found"}, status=404)
             if not profile.is_premium:
                 return Response({"error": "Only Plus users can view time slots"}, status=403)
             
@@ -881,9 +806,9 @@ class TimeSlotListView(APIView):
             print(f"❌ Error getting time slots: {e}")
             return Response({"error": "Failed to get time slots"}, status=500)
         
-class TimeSlotCancelView(APIView):
+class TimeSlotCancelView(ProfileContextMixin, APIView):
     """Cancel a booked time slot"""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -891,7 +816,9 @@ class TimeSlotCancelView(APIView):
             user = request.user
             
             # Check if user is premium
-            profile = UserProfile.objects.get(user=user)
+            profile = request.profile
+            if profile is None:
+                return Response({"error": "User profile not found"}, status=404)
             if not profile.is_premium:
                 return Response({
                     "error": "Only Plus users can manage sessions"
@@ -932,7 +859,7 @@ class TimeSlotCancelView(APIView):
             start_time_uk = start_time.astimezone(UK_TZ)
             formatted_time = start_time_uk.strftime('%A, %B %d, %Y at %I:%M %p UK Time')
 
-            print(f"🕐 DEBUG: UTC: {start_time}, UK: {start_time_uk}, Formatted: {formatted_time}")
+            logger.debug("🕐 UTC: %s, UK: %s, Formatted: %s", start_time, start_time_uk, formatted_time)
             
             # 2. Cancel booking in database
             last_booking.status = "cancelled"
@@ -1052,9 +979,9 @@ class TimeSlotCancelView(APIView):
             return False
 
 
-class TimeSlotRescheduleView(APIView):
+class TimeSlotRescheduleView(ProfileContextMixin, APIView):
     """Reschedule a booked time slot with unlimited rebooking and no cooldown"""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -1062,7 +989,9 @@ class TimeSlotRescheduleView(APIView):
             user = request.user
             
             # Check if user is premium
-            profile = UserProfile.objects.get(user=user)
+            profile = request.profile
+            if profile is None:
+                return Response({"error": "User profile not found"}, status=404)
             if not profile.is_premium:
                 return Response({
                     "error": "Only Plus users can manage sessions"
@@ -1253,7 +1182,6 @@ class TimeSlotRescheduleView(APIView):
                                 mentor_name, old_time, new_time, meet_link):
             """Send rescheduling confirmation emails using SMTP directly"""
             try:
-                import smtplib
                 from email.mime.multipart import MIMEMultipart
                 from email.mime.text import MIMEText
                 from django.conf import settings
@@ -1300,7 +1228,7 @@ class TimeSlotRescheduleView(APIView):
                 msg.attach(part2)
                 
                 # Connect to SMTP server
-                server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
+                server = TimedSMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
                 server.ehlo()
                 server.starttls()  # No keyfile/certfile arguments
                 server.ehlo()
@@ -1525,14 +1453,16 @@ class TimeSlotRescheduleView(APIView):
 # views.py
 # Replace your TimeSlotBookingView class with this version:
 
-class TimeSlotBookingView(APIView):
+class TimeSlotBookingView(ProfileContextMixin, APIView):
     """View to book a time slot with earliest slot detection and confirmation step"""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         try:
-            profile = UserProfile.objects.get(user=request.user)
+            profile = request.profile
+            if profile is None:
+                return Response({"error": "User profile not found"}, status=404)
             if not profile.is_premium:
                 return Response({"error": "Only Plus users can book sessions"}, status=403)
             can_book, cooldown_message, remaining_time = check_booking_cooldown(request.user)
@@ -1557,13 +1487,13 @@ class TimeSlotBookingView(APIView):
             # STEP 1: ALL users MUST provide mentor_id
             if not mentor_id and not slot_id:
                 # Return mentor list for selection
-                mentors = Mentor.objects.filter(is_active=True).select_related("user")
+                mentors = active_mentors()
                 
                 mentor_list = [
                     {
                         "id": m.id,
-                        "name": m.get_display_name(),
-                        "email": m.user.email,
+                        "name": m.display_name,
+                        "email": m.email,
                         "expertise": m.expertise
                     }
                     for m in mentors
@@ -2077,15 +2007,15 @@ class TimeSlotBookingView(APIView):
             print(f"❌ Error in day selection: {e}")
             return Response({"error": str(e)}, status=500)
         
-class ScheduleView(APIView):
-    authentication_classes = [TokenAuthentication]
+class ScheduleView(ProfileContextMixin, APIView):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     # In ScheduleView.post() method, update the head mentor handling:
 
     def post(self, request):
         try:
-            print("📌 [DEBUG] ScheduleView POST called")
+            logger.debug("📌 ScheduleView POST called")
             self.request = request  # Store request for use in helper methods
             
             data = request.data
@@ -2096,8 +2026,10 @@ class ScheduleView(APIView):
             auto_book = data.get("auto_book", False)
             preferred_day = data.get("preferred_day")
 
-            profile, _ = UserProfile.objects.get_or_create(user=request.user)
-            print(f"👀 {request.user.email} session_count: {profile.session_count}")
+            profile = request.profile
+            if profile is None:
+                return Response({"error": "User profile not found"}, status=404)
+            logger.debug("👀 %s session_count: %s", request.user.email, profile.session_count)
 
             if not profile.is_premium:
                 return Response({"error": "Only Plus users can book sessions."}, status=403)
@@ -2311,15 +2243,17 @@ class ScheduleView(APIView):
             traceback.print_exc()
             return Response({"error": f"Scheduling error: {str(e)}"}, status=500)
 
-class AvailableSlotsView(APIView):
-    authentication_classes = [TokenAuthentication]
+class AvailableSlotsView(ProfileContextMixin, APIView):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         """Return next 5 available 15-minute slots"""
         try:
             # Check if user is premium
-            profile = UserProfile.objects.get(user=request.user)
+            profile = request.profile
+            if profile is None:
+                return Response({"error": "User profile not found"}, status=404)
             if not profile.is_premium:
                 return Response({"error": "Only Plus users can view available slots"}, status=403)
             
@@ -2396,6 +2330,33 @@ class AvailableSlotsView(APIView):
                 "error": "Could not fetch available slots"
             }, status=500)
 import re
+# One grammar for whole and streamed replies: a tag is '<', an optional '/', a letter,
+# then anything but '<' or '>' up to the closing '>', MAX_CHAT_TAG_LENGTH characters at most.
+# A tag start that never closes in time ("x<y when comparing...") is text, sent with '<' escaped
+# so the page doesn't parse it as a tag either. Any other '<' ("salary < £30k") is text as is.
+MAX_CHAT_TAG_LENGTH = 500
+_CHAT_TAG = re.compile(r"<(/?)([A-Za-z][A-Za-z0-9-]*)([^<>]*)(>?)")
+_CHAT_TAG_START = re.compile(r"</?(?:[A-Za-z][^<>]*)?\Z")  # could still become a tag
+_CHAT_HREF = re.compile(r'href="([^"]+)"')
+
+def _clean_chat_tag(match) -> str:
+    closing, name, attrs, end = match.groups()
+    if not end or len(match.group(0)) > MAX_CHAT_TAG_LENGTH:
+        return "&lt;" + match.group(0)[1:]
+    # Keep only <a> tags, remove all others (<u> included)
+    if name != "a" or (attrs and not attrs[0].isspace()):
+        return ""
+    if closing:
+        return match.group(0)
+    # Ensure anchor tags have inline style for blue color (so link looks professional)
+    href = _CHAT_HREF.search(attrs)
+    if href:
+        return f'<a href="{href.group(1)}" style="color:#1a73e8; text-decoration:none;" target="_blank">'
+    return match.group(0)
+
+def _sanitize_chat_html(text: str) -> str:
+    return _CHAT_TAG.sub(_clean_chat_tag, text)
+
 def clean_chat_output(text: str) -> str:
     """
     Sanitize AI reply:
@@ -2406,23 +2367,201 @@ def clean_chat_output(text: str) -> str:
     if not text:
         return text
 
-    # Remove underline tags
-    text = re.sub(r"</?u>", "", text, flags=re.IGNORECASE)
+    return _sanitize_chat_html(text).strip()
 
-    # Keep only <a> tags and their href attribute, remove all others
-    text = re.sub(r"<(?!/?a(?=>|\s.*>))[^>]+>", "", text)
+class StreamingChatCleaner:
+    """
+    clean_chat_output() for a reply that arrives in pieces.
+    Text from a '<' that could still start a tag (_CHAT_TAG) is held back until the
+    tag closes or turns out to be text, so a tag split across chunks (e.g. '<a hr' +
+    'ef="...">') is sanitized as a whole. A bare '<' ("salary < £30k") goes out at once,
+    and no more than MAX_CHAT_TAG_LENGTH characters are ever held.
+    """
 
-    # Ensure anchor tags have inline style for blue color (so link looks professional)
-    text = re.sub(
-        r'<a\s+([^>]*?)href="([^"]+)"([^>]*)>',
-        r'<a href="\2" style="color:#1a73e8; text-decoration:none;" target="_blank">',
-        text
-    )
+    def __init__(self):
+        self._pending = ""
+        self._started = False
+        self._trailing_space = ""
+
+    def feed(self, fragment: str) -> str:
+        self._pending += fragment
+        cut = self._pending.rfind("<")
+        if (cut == -1 or not _CHAT_TAG_START.match(self._pending, cut)
+                or len(self._pending) - cut >= MAX_CHAT_TAG_LENGTH):
+            cut = len(self._pending)
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        return self._emit(_sanitize_chat_html(ready))
+
+    def finish(self) -> str:
+        ready, self._pending = self._pending, ""
+        return self._emit(_sanitize_chat_html(ready), final=True)
+
+    def _emit(self, text: str, final: bool = False) -> str:
+        # Match clean_chat_output()'s strip(): no leading whitespace, and trailing
+        # whitespace is only released once more text follows it
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        text = self._trailing_space + text
+        stripped = text.rstrip()
+        self._trailing_space = "" if final else text[len(stripped):]
+        return stripped
+
+def get_cached_reply(message: str, is_premium: bool, knowledge_hash: str):
+    """Reply from the exact-match or semantic cache, or None"""
+    reply = get_response_cache().get(message, is_premium, knowledge_hash)
+    if reply is not None:
+        return reply
+
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is not None:
+        match = semantic_cache.lookup(message, is_premium, knowledge_hash)
+        if match is not None:
+            print(f"♻️ Reusing reply for similar question ({match.similarity:.2f}): {match.question!r}")
+            return match.reply
+    return None
+
+def store_reply(message: str, is_premium: bool, reply: str, knowledge_hash: str):
+    """Remember a cleaned Gemini reply in both caches"""
+    get_response_cache().set(message, is_premium, reply, knowledge_hash)
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is not None:
+        semantic_cache.add(message, is_premium, reply, knowledge_hash)
+
+def get_ai_reply(message: str, is_premium: bool, user_id: int = None) -> str:
+    """
+    Cleaned Gemini reply for a chat message.
+    Repeated questions are served from the response cache (already cleaned),
+    near-duplicates of a recent question from the semantic cache.
+    Follow-ups are answered with the user's recent turns and bypass the caches.
+    """
+    knowledge_hash = corpus_hash()
+    history = recent_turns(user_id) if user_id and is_follow_up(message) else []
+
+    reply = None if history else get_cached_reply(message, is_premium, knowledge_hash)
+    if reply is None:
+        raw_reply = ask_gemini(message, is_premium, history)
+        reply = clean_chat_output(raw_reply)
+        if raw_reply in FALLBACK_REPLIES:
+            return reply
+        if not history:
+            store_reply(message, is_premium, reply, knowledge_hash)
+
+    if user_id:
+        record_turn(user_id, message, reply)
+    return reply
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_ai_reply(message: str, is_premium: bool, user_id: int = None):
+    """
+    Server-sent events for a chat reply: one `token` event per cleaned piece of text
+    as Gemini produces it, then `done` with the full reply. Cache hits arrive as a single token.
+    """
+    knowledge_hash = corpus_hash()
+    history = recent_turns(user_id) if user_id and is_follow_up(message) else []
+
+    reply = None if history else get_cached_reply(message, is_premium, knowledge_hash)
+    if reply is not None:
+        if user_id:
+            record_turn(user_id, message, reply)
+        yield sse_event("token", {"text": reply})
+        yield sse_event("done", {"reply": reply, "cached": True})
+        return
+
+    cleaner = StreamingChatCleaner()
+    raw_parts = []
+    failed = False
+    for fragment in ask_gemini_stream(message, is_premium, history):
+        raw_parts.append(fragment)
+        failed = failed or fragment in FALLBACK_REPLIES
+        text = cleaner.feed(fragment)
+        if text:
+            yield sse_event("token", {"text": text})
+
+    text = cleaner.finish()
+    if text:
+        yield sse_event("token", {"text": text})
+
+    reply = clean_chat_output("".join(raw_parts))
+    if not failed:
+        if not history:
+            store_reply(message, is_premium, reply, knowledge_hash)
+        if user_id:
+            record_turn(user_id, message, reply)
+    yield sse_event("done", {"reply": reply, "cached": False})
+
+def cancel_confirmation_payload(last_session) -> dict:
+    """Chat reply asking the user to confirm cancelling their last active session"""
+    # Convert start_time to readable format
+    session_start = last_session.start_time
+    if isinstance(session_start, str):
+        session_start = parse_datetime(session_start)
+
+    # Ensure timezone aware
+    UK_TZ = ZoneInfo("Europe/London")
+    if session_start.tzinfo is None:
+        session_start = timezone.make_aware(session_start, UK_TZ)
+
+    session_time_ist = session_start.astimezone(UK_TZ).strftime('%d %b %Y, %I:%M %p')
+    mentor_name = last_session.mentor.user.username if last_session.mentor else "Mentor"
+
+    return {
+        "reply": f"📅 I found your active session with {mentor_name} scheduled for {session_time_ist}.\n\nAre you sure you want to cancel this session?",
+        "session_actions": True,
+        "session_details": {
+            "mentor_name": mentor_name,
+            "session_time": session_time_ist,
+            "session_id": last_session.id
+        }
+    }
+
+def auto_selected_mentor_payload(selected_mentor, detected_domain: str) -> dict:
+    """Chat reply for a booking request whose domain picked a mentor (a registry MentorEntry) automatically"""
+    return {
+        "reply": f"I detected you're interested in {detected_domain.title()} domain. I've selected {selected_mentor.username} as your mentor specialist for this area.",
+        "mentors": [{
+            "id": selected_mentor.id,
+            "username": selected_mentor.username,
+            "email": selected_mentor.email,
+            "expertise": selected_mentor.expertise
+        }],
+        "is_first_time": False,
+        "detected_domain": detected_domain,
+        "auto_selected": True,
+        "auto_mentor_id": selected_mentor.id
+    }
+
+def mentor_selection_payload(mentors, detected_domain: str) -> dict:
+    """Chat reply listing active mentors (registry MentorEntry objects) to choose from"""
+    mentor_list = [
+        {
+            "id": m.id,
+            "username": m.username,
+            "email": m.email,
+            "expertise": m.expertise
+        }
+        for m in mentors
+    ]
+
+    if not mentor_list:
+        return {
+            "reply": "⚠️ No mentors available at the moment. Please try again later.",
+            "mentors": None
+        }
 
-    return text.strip()
+    return {
+        "reply": "I can help you schedule a mentorship session. Please select a mentor:",
+        "mentors": mentor_list,
+        "is_first_time": False,
+        "detected_domain": detected_domain
+    }
 
-class ChatView(APIView):
-    authentication_classes = [TokenAuthentication]
+class ChatView(ProfileContextMixin, APIView):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -2432,11 +2571,12 @@ class ChatView(APIView):
             if not message:
                 return Response({"error": "Message is required"}, status=400)
 
-            profile = UserProfile.objects.filter(user=request.user).first()
-            is_premium = profile.is_premium if profile else False
+            is_premium = request.is_premium
+
+            intent = classify(message, taxonomy.domain_table())
 
             # PRIORITY 1: Check for cancellation requests FIRST (before booking check)
-            if is_cancel_request(message):
+            if intent.is_cancel:
                 if not is_premium:
                     return Response({
                         "reply": "⚠️ Only Plus users can manage sessions. Please upgrade to Plus.",
@@ -2471,33 +2611,10 @@ class ChatView(APIView):
                         "mentors": None
                     }, status=200)
 
-                # Convert start_time to readable format
-                session_start = last_session.start_time
-                if isinstance(session_start, str):
-                    from django.utils.dateparse import parse_datetime
-                    session_start = parse_datetime(session_start)
-
-                # Ensure timezone aware
-                from zoneinfo import ZoneInfo
-                UK_TZ = ZoneInfo("Europe/London")
-                if session_start.tzinfo is None:
-                    session_start = timezone.make_aware(session_start, UK_TZ)
-
-                session_time_ist = session_start.astimezone(UK_TZ).strftime('%d %b %Y, %I:%M %p')
-                mentor_name = last_session.mentor.user.username if last_session.mentor else "Mentor"
-
-                return Response({
-                    "reply": f"📅 I found your active session with {mentor_name} scheduled for {session_time_ist}.\n\nAre you sure you want to cancel this session?",
-                    "session_actions": True,
-                    "session_details": {
-                        "mentor_name": mentor_name,
-                        "session_time": session_time_ist,
-                        "session_id": last_session.id
-                    }
-                }, status=200)
+                return Response(cancel_confirmation_payload(last_session), status=200)
 
             # PRIORITY 2: Check for meeting/booking requests (MUST COME BEFORE AI CHAT)
-            if is_meeting_request(message):
+            if intent.is_meeting:
                 if not is_premium:
                     return Response({
                         "reply": "⚠️ Only Plus users can book mentorship sessions. Please upgrade to premium.",
@@ -2505,57 +2622,24 @@ class ChatView(APIView):
                     }, status=200)
                 
                 # Detect domain from message
-                detected_domain = detect_domain_from_message(message)
+                detected_domain = intent.domain
                 
                 # ALL USERS get regular mentor selection (head mentor logic commented out)
                 
-                # If domain detected, auto-select mentor
+                mentors = active_mentors()
+
+                # If domain detected, auto-select mentor (any active mentor if none matches the domain)
                 if detected_domain != 'general':
-                    selected_mentor = get_random_mentor_by_domain(detected_domain)
+                    selected_mentor = mentors.random_in_domain(detected_domain) or mentors.random()
                     
                     if selected_mentor:
-                        return Response({
-                            "reply": f"I detected you're interested in {detected_domain.title()} domain. I've selected {selected_mentor.user.username} as your mentor specialist for this area.",
-                            "mentors": [{
-                                "id": selected_mentor.id,
-                                "username": selected_mentor.user.username,
-                                "email": selected_mentor.user.email,
-                                "expertise": selected_mentor.expertise
-                            }],
-                            "is_first_time": False,
-                            "detected_domain": detected_domain,
-                            "auto_selected": True,
-                            "auto_mentor_id": selected_mentor.id
-                        }, status=200)
+                        return Response(auto_selected_mentor_payload(selected_mentor, detected_domain), status=200)
                 
                 # Fallback: show all mentors except head mentor for ALL users
             # Fallback: show all mentors (no head mentor exclusion)
                 try:
                     # HEAD MENTOR LOGIC REMOVED - Get all active mentors
-                    mentors = Mentor.objects.filter(is_active=True).select_related("user")
-                    
-                    mentor_list = [
-                        {
-                            "id": m.id,
-                            "username": m.user.username,
-                            "email": m.user.email,
-                            "expertise": m.expertise
-                        }
-                        for m in mentors
-                    ]
-                    
-                    if not mentor_list:
-                        return Response({
-                            "reply": "⚠️ No mentors available at the moment. Please try again later.",
-                            "mentors": None
-                        }, status=200)
-                    
-                    return Response({
-                        "reply": "I can help you schedule a mentorship session. Please select a mentor:",
-                        "mentors": mentor_list,
-                        "is_first_time": False,
-                        "detected_domain": detected_domain
-                    }, status=200)
+                    return Response(mentor_selection_payload(mentors, detected_domain), status=200)
                     
                 except Exception as e:
                     print(f"❌ Error getting mentors: {e}")
@@ -2601,8 +2685,7 @@ class ChatView(APIView):
                     }, status=200)
 
             # PRIORITY 3: Default AI chat for other messages (only reached if not booking/cancel)
-            reply = ask_gemini(message, is_premium)
-            reply = clean_chat_output(reply)
+            reply = get_ai_reply(message, is_premium, request.user.id)
 
             return Response({"reply": reply}, status=200)
 
@@ -2610,6 +2693,138 @@ class ChatView(APIView):
             traceback.print_exc()
             return Response({"error": str(e)}, status=500)
 
+async def aget_token_user(request):
+    """Async equivalent of DRF TokenAuthentication: the active user for 'Authorization: Token <key>', or None"""
+    parts = request.headers.get("Authorization", "").split()
+    if len(parts) != 2 or parts[0].lower() != "token":
+        return None
+    try:
+        return check_token(await aload_token(parts[1]))
+    except AuthenticationFailed:
+        return None
+
+class AsyncChatView(View):
+    """
+    Async implementation of ChatView for ASGI servers (uvicorn config.asgi:application).
+    While Gemini is generating, the request waits on the event loop instead of holding a
+    worker thread, so one process can keep hundreds of chats in flight.
+    Same request/response contract as ChatView.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated API, like the DRF views
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def post(self, request):
+        try:
+            user = await aget_token_user(request)
+            if user is None:
+                detail = "Invalid token." if "Authorization" in request.headers else "Authentication credentials were not provided."
+                return JsonResponse({"detail": detail}, status=401)
+
+            try:
+                data = json.loads(request.body or b"{}")
+            except ValueError:
+                return JsonResponse({"error": "Invalid JSON"}, status=400)
+            message = str(data.get("message", "")).strip()
+            if not message:
+                return JsonResponse({"error": "Message is required"}, status=400)
+
+            profile = get_profile(user)  # loaded with the token
+            is_premium = profile.is_premium if profile else False
+
+            intent = classify(message, await taxonomy.adomain_table())
+
+            # PRIORITY 1: cancellation requests
+            if intent.is_cancel:
+                if not is_premium:
+                    return JsonResponse({
+                        "reply": "⚠️ Only Plus users can manage sessions. Please upgrade to Plus.",
+                        "mentors": None
+                    }, status=200)
+
+                last_session = await (
+                    EnhancedSessionBooking.objects.filter(user=user)
+                    .exclude(status="cancelled")
+                    .select_related("mentor__user")
+                    .order_by("-created_at")
+                    .afirst()
+                )
+                if last_session is None:
+                    last_session = await (
+                        SessionBooking.objects.filter(user=user)
+                        .exclude(status="cancelled")
+                        .select_related("mentor__user")
+                        .order_by("-created_at")
+                        .afirst()
+                    )
+
+                if not last_session:
+                    return JsonResponse({
+                        "reply": "❌ No active booked sessions found to cancel.",
+                        "mentors": None
+                    }, status=200)
+
+                return JsonResponse(cancel_confirmation_payload(last_session), status=200)
+
+            # PRIORITY 2: meeting/booking requests
+            if intent.is_meeting:
+                if not is_premium:
+                    return JsonResponse({
+                        "reply": "⚠️ Only Plus users can book mentorship sessions. Please upgrade to premium.",
+                        "mentors": None
+                    }, status=200)
+
+                detected_domain = intent.domain
+                mentors = await get_mentor_registry().asnapshot()
+                if detected_domain != 'general':
+                    selected_mentor = mentors.random_in_domain(detected_domain) or mentors.random()
+                    if selected_mentor:
+                        return JsonResponse(auto_selected_mentor_payload(selected_mentor, detected_domain), status=200)
+
+                return JsonResponse(mentor_selection_payload(mentors, detected_domain), status=200)
+
+            # PRIORITY 3: AI chat - cache lookups may touch disk, so they run off the event loop
+            knowledge_hash = await sync_to_async(corpus_hash, thread_sensitive=False)()
+            history = await arecent_turns(user.id) if is_follow_up(message) else []
+
+            reply = None
+            if not history:
+                reply = await sync_to_async(get_cached_reply, thread_sensitive=False)(message, is_premium, knowledge_hash)
+            if reply is None:
+                raw_reply = await ask_gemini_async(message, is_premium, history)
+                reply = clean_chat_output(raw_reply)
+                if raw_reply in FALLBACK_REPLIES:
+                    return JsonResponse({"reply": reply}, status=200)
+                if not history:
+                    await sync_to_async(store_reply, thread_sensitive=False)(message, is_premium, reply, knowledge_hash)
+
+            await arecord_turn(user.id, message, reply)
+            return JsonResponse({"reply": reply}, status=200)
+
+        except Exception as e:
+            traceback.print_exc()
+            return JsonResponse({"error": str(e)}, status=500)
+
+class ChatStreamView(ChatView):
+    """
+    Streaming variant of ChatView for AI answers (text/event-stream).
+    Cancellation and booking requests get ChatView's normal JSON response.
+    """
+
+    def post(self, request):
+        message = request.data.get("message", "").strip()
+        if not message or is_cancel_request(message) or is_meeting_request(message):
+            return super().post(request)
+
+        response = StreamingHttpResponse(
+            stream_ai_reply(message, request.is_premium, request.user.id), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # stop nginx from buffering the stream
+        return response
+
 # Add new endpoint to get mentors by domain
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -2618,31 +2833,21 @@ def get_mentors_by_domain(request):
     try:
         domain = request.GET.get('domain', 'general')
         
-        profile = UserProfile.objects.filter(user=request.user).first()
-        if not profile or not profile.is_premium:
+        attach_profile(request)
+        if not request.is_premium:
             return Response({"error": "Only Plus users can access mentors"}, status=403)
         
         if domain == 'general':
-            mentors = Mentor.objects.filter(is_active=True).select_related("user")
+            mentors = active_mentors()
         else:
-            # Filter by domain keywords
-            mentors = Mentor.objects.filter(is_active=True).select_related("user")
-            domain_mentors = []
-            
-            for mentor in mentors:
-                expertise_lower = mentor.expertise.lower() if mentor.expertise else ""
-                keywords = DOMAIN_KEYWORDS.get(domain, [])
-                
-                if any(keyword in expertise_lower for keyword in keywords):
-                    domain_mentors.append(mentor)
-            
-            mentors = domain_mentors
+            # Precomputed domain tags, best match first
+            mentors = active_mentors().in_domain(domain)
 
         mentor_list = [
             {
                 "id": m.id,
-                "username": m.user.username,
-                "email": m.user.email,
+                "username": m.username,
+                "email": m.email,
                 "expertise": m.expertise,
                 "domain": domain
             }
@@ -0,0 +1,329 @@
+# chatbot/write_behind.py
+"""
+In-process write-behind buffer for append-only rows (chat history, audit log).
+
+Request threads hand unsaved model instances to add() and return immediately.
+A background thread writes them with bulk_create, one batch per model, whenever
+BATCH_SIZE records are waiting or FLUSH_INTERVAL_MS has passed since the oldest
+one arrived. Pending records are flushed when the process exits normally
+(atexit, gunicorn worker_exit). A hard crash loses at most what was pending.
+
+Memory is capped at MAX_PENDING records. When the buffer is full, the OVERFLOW
+policy applies:
+    "block"        wait up to BLOCK_TIMEOUT_MS for room, then drop the new record
+    "drop_newest"  drop the new record
+    "drop_oldest"  drop the oldest pending record to make room
+Callers that must not wait (async views, on the event loop) pass block=False
+and get "drop_newest" instead of "block".
+
+A batch that fails on a constraint (IntegrityError, DataError) is retried row
+by row, and only the offending rows are dropped. A batch that fails on an
+OperationalError ("database is locked", a dropped connection) goes back to the
+front of the queue and is retried after RETRY_DELAY_MS, doubling each time; a
+row is dropped after MAX_RETRIES such attempts. Any other error (a
+ProgrammingError, a driver bug) is treated like a constraint failure: each row
+is tried on its own and only the ones that still fail are dropped. If the
+writer thread dies anyway, the next add() starts a new one.
+
+Configured through settings.WRITE_BEHIND. With AUTOSTART off no background
+thread is started and rows are written only by flush()/close() (tests).
+"""
+
+import atexit
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+DEFAULT_CONFIG = {
+    "BATCH_SIZE": 100,
+    "FLUSH_INTERVAL_MS": 200,
+    "MAX_PENDING": 10000,
+    "OVERFLOW": "block",
+    "BLOCK_TIMEOUT_MS": 100,
+    "MAX_RETRIES": 5,
+    "RETRY_DELAY_MS": 50,
+    "AUTOSTART": True,
+}
+
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+
+class WriteBehindBuffer:
+    """Batches model instances into bulk_create calls on a background thread"""
+
+    def __init__(self, batch_size: int = 100, flush_interval_ms: float = 200, max_pending: int = 10000,
+                 overflow: str = "block", block_timeout_ms: float = 100, max_retries: int = 5,
+                 retry_delay_ms: float = 50, autostart: bool = True):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self.block_timeout = block_timeout_ms / 1000
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay_ms / 1000
+        self.autostart = autostart
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.retries = 0
+
+        self._pending = deque()
+        self._oldest_at = None
+        self._retry_at = 0.0  # no write before this (back-off after an OperationalError)
+        self._attempts = {}  # id(obj) -> failed attempts, for rows put back in the queue
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # one bulk write at a time, in arrival order
+        self._thread = None
+        self._pid = None
+        self._closing = False
+        _buffers.add(self)
+
+    # --- producer side ---
+
+    def add(self, obj, block: bool = True) -> bool:
+        """Queue an unsaved model instance; False if it was dropped by the overflow policy"""
+        self._ensure_thread()
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                if self.overflow == "drop_oldest":
+                    self._pending.popleft()
+                    self.dropped += 1
+                elif self.overflow == "block" and block:
+                    self._cond.notify_all()
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._pending) >= self.max_pending:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self._cond.wait(remaining):
+                            break
+                if len(self._pending) >= self.max_pending:
+                    self.dropped += 1
+                    return False
+
+            if not self._pending:
+                self._oldest_at = time.monotonic()
+            self._pending.append(obj)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "retries": self.retries,
+            }
+
+    # --- consumer side ---
+
+    def flush(self) -> int:
+        """Write everything pending now, on the calling thread; returns rows written"""
+        total = 0
+        while True:
+            backoff = self._retry_at - time.monotonic()
+            if backoff > 0:
+                time.sleep(backoff)
+            written = self._write_batch()
+            if written is None:
+                return total
+            total += written
+
+    def close(self, timeout: float = 5.0):
+        """Stop the background thread and flush what is left"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+        self.flush()
+
+    def _take_batch(self):
+        with self._cond:
+            if not self._pending:
+                return []
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            self._oldest_at = time.monotonic() if self._pending else None
+            self._cond.notify_all()  # wake producers blocked on a full buffer
+            return batch
+
+    def _write_batch(self):
+        """Write one batch; None when nothing was pending"""
+        with self._flush_lock:
+            batch = self._take_batch()
+            if not batch:
+                return None
+
+            by_model = {}
+            for obj in batch:
+                by_model.setdefault(type(obj), []).append(obj)
+
+            written = 0
+            for model, objs in by_model.items():
+                try:
+                    model.objects.bulk_create(objs)
+                    written += len(objs)
+                except OperationalError as e:
+                    self._requeue(model, objs, e)
+                    continue
+                except Exception:
+                    # One bad row must not take the whole batch with it
+                    written += self._write_one_by_one(model, objs)
+                self._forget(objs)
+
+            with self._cond:
+                self.written += written
+                self.batches += 1
+            return written
+
+    def _write_one_by_one(self, model, objs) -> int:
+        written = 0
+        for i, obj in enumerate(objs):
+            try:
+                model.objects.bulk_create([obj])
+                written += 1
+            except OperationalError as e:
+                self._requeue(model, objs[i:], e)
+                return written
+            except Exception as e:
+                print(f"⚠️ Write-behind: {model.__name__} row lost: {e!r}")
+                with self._cond:
+                    self.failed += 1
+        return written
+
+    def _requeue(self, model, objs, error):
+        """Put rows that hit a transient error back at the front of the queue, with back-off"""
+        retry = []
+        for obj in objs:
+            attempts = self._attempts.get(id(obj), 0) + 1
+            if attempts > self.max_retries:
+                self._attempts.pop(id(obj), None)
+                print(f"⚠️ Write-behind: {model.__name__} row lost after {self.max_retries} retries: {error}")
+                with self._cond:
+                    self.failed += 1
+            else:
+                self._attempts[id(obj)] = attempts
+                retry.append((obj, attempts))
+        if not retry:
+            return
+        with self._cond:
+            self._pending.extendleft(obj for obj, _ in reversed(retry))
+            self._oldest_at = time.monotonic()
+            self._retry_at = time.monotonic() + self.retry_delay * 2 ** (max(n for _, n in retry) - 1)
+            self.retries += 1
+
+    def _forget(self, objs):
+        if self._attempts:
+            for obj in objs:
+                self._attempts.pop(id(obj), None)
+
+    def _due(self) -> bool:
+        if time.monotonic() < self._retry_at:
+            return False
+        return len(self._pending) >= self.batch_size or (
+            self._pending and time.monotonic() - self._oldest_at >= self.flush_interval
+        )
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    while not self._closing and not self._due():
+                        if self._pending:
+                            wait = max(self._oldest_at + self.flush_interval, self._retry_at) - time.monotonic()
+                        else:
+                            wait = None
+                        self._cond.wait(wait)
+                    if self._closing:
+                        return
+                try:
+                    self._write_batch()
+                except Exception as e:
+                    print(f"⚠️ Write-behind: batch write failed: {e!r}")
+        finally:
+            connection.close()
+
+    def _running(self) -> bool:
+        return self._pid == os.getpid() and (self._closing or self._thread.is_alive())
+
+    def _ensure_thread(self):
+        # Started lazily, again in a forked child (threads don't survive fork),
+        # and again if the thread died
+        if not self.autostart or self._running():
+            return
+        with self._cond:
+            if self._running():
+                return
+            if self._pid == os.getpid():
+                print("⚠️ Write-behind: writer thread died, starting a new one")
+            self._pid = os.getpid()
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+
+# Every live buffer is flushed on interpreter exit
+_buffers = weakref.WeakSet()
+
+
+def flush_all():
+    """Close and flush every buffer (process shutdown)"""
+    for buffer in list(_buffers):
+        try:
+            buffer.close()
+        except Exception as e:
+            print(f"⚠️ Write-behind flush on shutdown failed: {e}")
+
+
+atexit.register(flush_all)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_write_behind() -> WriteBehindBuffer:
+    """Process-wide buffer built from settings.WRITE_BEHIND"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = {**DEFAULT_CONFIG, **getattr(settings, 'WRITE_BEHIND', {})}
+                _buffer = WriteBehindBuffer(
+                    batch_size=config["BATCH_SIZE"],
+                    flush_interval_ms=config["FLUSH_INTERVAL_MS"],
+                    max_pending=config["MAX_PENDING"],
+                    overflow=config["OVERFLOW"],
+                    block_timeout_ms=config["BLOCK_TIMEOUT_MS"],
+                    max_retries=config["MAX_RETRIES"],
+                    retry_delay_ms=config["RETRY_DELAY_MS"],
+                    autostart=config["AUTOSTART"],
+                )
+    return _buffer
+
+
+def reset_write_behind():
+    """Flush and drop the process-wide buffer so the next call rebuilds it from settings"""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is not None:
+            _buffer.close()
+            _buffers.discard(_buffer)
+        _buffer = None
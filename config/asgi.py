@@ -2,6 +2,8 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with e.g. ``uvicorn config.asgi:application`` to get the non-blocking
+/api/chat/async/ endpoint (chatbot.views.AsyncChatView).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -29,7 +29,7 @@ ALLOWED_HOSTS = ["13.60.12.71","chatbot.ukjobsinsider.com","ukjobsinsider.com",
 
 
 # Email Configuration (use environment variables in production)
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_BACKEND = "chatbot.metrics.TimedEmailBackend"  # Django's SMTP backend, timed for /metrics
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -65,6 +65,8 @@ CORS_ALLOW_HEADERS = [
     'ngrok-skip-browser-warning',
 ]
 MIDDLEWARE = [
+    'chatbot.metrics.MetricsMiddleware',  # first, so it times everything below
+    'chatbot.profiling.ProfilingMiddleware',  # no-op unless PROFILING['ENABLED']
     "corsheaders.middleware.CorsMiddleware",
     
     'django.middleware.security.SecurityMiddleware',
@@ -100,7 +102,7 @@ CORS_ALLOW_ALL_ORIGINS = False
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'chatbot.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -169,6 +171,18 @@ DATABASES = {
 #         }
 #     }
 # }
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    # Seen by every worker process on the host: version stamps that carry token revocations
+    # and mentor / taxonomy edits between workers (see chatbot/version_stamp.py).
+    # Use Redis or Memcached (SHARED_CACHE_BACKEND / SHARED_CACHE_LOCATION) across hosts.
+    'shared': {
+        'BACKEND': os.getenv('SHARED_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('SHARED_CACHE_LOCATION', str(BASE_DIR / 'cache' / 'shared')),
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -224,7 +238,141 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 # Token Configuration
-TOKEN_EXPIRY_TIME = 86400
+TOKEN_EXPIRY_TIME = 86400  # seconds; enforced by chatbot.authentication.CachedTokenAuthentication
+
+# Token -> user/profile lookups cached per process (see chatbot/authentication.py)
+TOKEN_AUTH_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 60,
+    # Logout / token deletion / user deactivation reach other workers within CHECK_INTERVAL;
+    # without the stamp (or with a per-process CACHE_ALIAS) token caching is turned off
+    'VERSION_STAMP': os.getenv('TOKEN_AUTH_VERSION_STAMP', '1') == '1',
+    'CACHE_ALIAS': 'shared',
+    'CHECK_INTERVAL': 1.0,
+}
+
+# Per-endpoint latency / query / external-call histograms on /metrics (see chatbot/metrics.py)
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', '1') == '1',
+    'TOKEN': os.getenv('METRICS_TOKEN', ''),  # scrapers send "Authorization: Bearer <token>"; unset = 403
+}
+
+# Google Calendar clients reused per thread (see chatbot/calendar_pool.py)
+CALENDAR_SERVICE = {
+    'API_ENDPOINT': os.getenv('CALENDAR_API_ENDPOINT', ''),  # empty = Google
+    'TIMEOUT': 30,
+}
+
+# Parallel calls to several mentor calendars, with timeouts and per-calendar circuit breakers
+# (see chatbot/fanout.py)
+CALENDAR_FANOUT = {
+    'MAX_WORKERS': 8,
+    'CALL_TIMEOUT': 10,  # seconds, per calendar
+    'DEADLINE': 15,  # seconds, whole lookup
+    'BREAKER_FAILURES': 3,
+    'BREAKER_COOLDOWN': 60,
+}
+
+# Local copy of mentor calendar events for the 7-day gap check (see chatbot/calendar_mirror.py);
+# keep `manage.py sync_calendar_mirror --interval=60` running when enabled
+CALENDAR_MIRROR = {
+    'ENABLED': os.getenv('CALENDAR_MIRROR_ENABLED', '0') == '1',
+    'MAX_AGE': 900,  # seconds; calendars not synced since are checked live
+    'WINDOW_DAYS': 180,
+    'PAGE_SIZE': 250,
+}
+
+# Sampled / X-Profile request profiles written to profiles/ (see chatbot/profiling.py)
+PROFILING = {
+    'ENABLED': os.getenv('PROFILING_ENABLED', '0') == '1',
+    'SAMPLE_RATE': float(os.getenv('PROFILING_SAMPLE_RATE', '0')),  # e.g. 0.01 profiles 1% of requests
+    'SECRET': os.getenv('PROFILING_SECRET', ''),
+    'DIRECTORY': 'profiles',
+    'FORMAT': 'collapsed',  # collapsed | speedscope
+    'MAX_FILES': 200,
+}
+
+# JSON log lines on stderr for the chatbot app (see chatbot/logs.py); DEBUG adds per-slot lines
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'chatbot.logs.JsonFormatter'},
+        'text': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': os.getenv('LOG_FORMAT', 'json'),
+        },
+    },
+    'loggers': {
+        'chatbot': {
+            'handlers': ['console'],
+            'level': os.getenv('CHATBOT_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Chat reply cache (see chatbot/response_cache.py)
+CHAT_RESPONSE_CACHE = {
+    'BACKEND': os.getenv('CHAT_RESPONSE_CACHE_BACKEND', 'memory'),  # memory | django | file
+    'TTL': 6 * 60 * 60,
+    'MAX_ENTRIES': 1000,
+}
+
+# Reuse replies for near-duplicate questions (see chatbot/semantic_cache.py; off until
+# the threshold has been checked against real traffic with eval_semantic_cache)
+CHAT_SEMANTIC_CACHE = {
+    'ENABLED': os.getenv('CHAT_SEMANTIC_CACHE', '0') == '1',
+    'THRESHOLD': float(os.getenv('CHAT_SEMANTIC_THRESHOLD', '0.7')),
+    'MAX_ENTRIES': 1000,
+}
+
+# Batched background inserts for chat history and audit rows (see chatbot/write_behind.py)
+WRITE_BEHIND = {
+    'BATCH_SIZE': 100,
+    'FLUSH_INTERVAL_MS': 200,
+    'MAX_PENDING': 10000,
+    'OVERFLOW': 'block',  # block | drop_newest | drop_oldest
+    'BLOCK_TIMEOUT_MS': 100,
+    'MAX_RETRIES': 5,  # attempts for rows hitting a transient OperationalError (database locked)
+    'RETRY_DELAY_MS': 50,  # doubles with each attempt
+    'AUTOSTART': True,
+}
+
+# Signup allow-list / plan by email (see chatbot/entitlements.py)
+ENTITLEMENTS = {
+    'BACKEND': os.getenv('ENTITLEMENTS_BACKEND', 'file'),  # file | db (after `manage.py import_entitlements`)
+    'FILES': [
+        {'PATH': BASE_DIR / 'users.csv', 'TYPE': None},
+        # Not used for signups yet:
+        # {'PATH': BASE_DIR / 'premium_users.csv', 'TYPE': 'premium'},
+        # {'PATH': BASE_DIR / 'registeredemail.csv', 'TYPE': 'standard'},
+    ],
+    'CHECK_INTERVAL': 2.0,
+}
+
+# Active-mentor snapshot used by the mentor listings (see chatbot/mentor_registry.py)
+MENTOR_REGISTRY = {
+    # Share invalidations between worker processes; needs a cache all workers share
+    'VERSION_STAMP': os.getenv('MENTOR_REGISTRY_VERSION_STAMP', '1') == '1',
+    'CACHE_ALIAS': 'shared',
+    'CHECK_INTERVAL': 1.0,
+    # Rebuild a snapshot this old even without a version change (a missed or evicted stamp)
+    'MAX_AGE': float(os.getenv('MENTOR_REGISTRY_MAX_AGE', '5')),
+}
+
+# Domain table used to classify chat messages (see chatbot/taxonomy.py)
+TAXONOMY = {
+    # Share Domain edits between worker processes; needs a cache all workers share
+    'VERSION_STAMP': os.getenv('TAXONOMY_VERSION_STAMP', '1') == '1',
+    'CACHE_ALIAS': 'shared',
+    'CHECK_INTERVAL': 1.0,
+    # Reload a table this old even without a version change (a missed or evicted stamp)
+    'MAX_AGE': float(os.getenv('TAXONOMY_MAX_AGE', '5')),
+}
 
 # --- SQLite concurrency tuning (launch safe) ---
 if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
@@ -0,0 +1,39 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings for the chatbot backend.
+Usage: gunicorn   (picked up automatically from the project root)
+
+Warming happens here rather than at import time so that manage.py commands,
+migrations and tests never pay for the Gemini SDK or the training corpus.
+"""
+
+import os
+
+wsgi_app = os.getenv("GUNICORN_APP", "config.wsgi:application")
+# For the async chat view: GUNICORN_APP=config.asgi:application GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "3"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Load Django once in the master so workers share its memory copy-on-write
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    """Master, after the app is preloaded: build the fork-safe corpus once for all workers"""
+    if preload_app:
+        from chatbot.gemini_client import warm_corpus
+        warm_corpus()
+
+
+def post_worker_init(worker):
+    """Each worker, after loading the app: configure the Gemini SDK before the first request"""
+    from chatbot.gemini_client import warm_up
+    warm_up()
+
+
+def worker_exit(server, worker):
+    """Each worker, on shutdown: write out queued chat-history and audit rows"""
+    from chatbot.write_behind import flush_all
+    flush_all()